@@ -0,0 +1,221 @@
+"""Executive Dashboard aggregates.
+
+The dashboard only renders a handful of small tables. They are computed once
+per dataset version (see dataset_fingerprint) so reruns never touch the full
+lead frame, and the frame itself is never modified.
+"""
+import hashlib
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Lead score distribution buckets
+SCORE_BINS = [0, 40, 70, 100]
+SCORE_LABELS = ['Cold (0-40)', 'Warm (41-70)', 'Hot (71-100)']
+HIGH_QUALITY_SCORE = 70
+
+# Industries with fewer leads are left off the conversion chart
+MIN_INDUSTRY_LEADS = 10
+
+
+@dataclass(frozen=True)
+class DashboardAggregates:
+    total_leads: int
+    high_quality_leads: int
+    converted_leads: int
+    total_pipeline_value: float
+    score_distribution: pd.Series
+    source_performance: pd.DataFrame
+    industry_conversion: pd.DataFrame
+
+    @property
+    def avg_conversion_rate(self):
+        return self.converted_leads / self.total_leads * 100 if self.total_leads else 0.0
+
+
+def _update_digest(digest, values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        digest.update(repr(list(values.cat.categories)).encode())
+        values = values.cat.codes
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind != 'O':
+        digest.update(np.ascontiguousarray(values.to_numpy()).view(np.uint8))
+        return
+    # Strings and nullable columns: hash the Arrow buffers instead of
+    # hashing one Python object per row
+    import pyarrow as pa
+    array = pa.array(values, from_pandas=True)
+    for chunk in getattr(array, 'chunks', [array]):
+        for buffer in chunk.buffers():
+            if buffer is not None:
+                digest.update(buffer)
+
+
+def dataset_fingerprint(df):
+    # Content hash of the whole frame; compute it once when the data is loaded
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((df.shape, list(df.columns), [str(dtype) for dtype in df.dtypes])).encode())
+    _update_digest(digest, df.index.to_series())
+    for column in df.columns:
+        _update_digest(digest, df[column])
+    return digest.hexdigest()
+
+
+def score_categories(scores):
+    return pd.cut(scores, bins=SCORE_BINS, labels=SCORE_LABELS)
+
+
+def source_performance_table(df):
+    source_performance = df.groupby('lead_source', observed=True).agg(
+        avg_score=('lead_score', 'mean'),
+        conversion_rate=('converted', 'mean'),
+        lead_count=('lead_score', 'size'),
+    ).round(2)
+    source_performance.columns = ['Avg Score', 'Conversion Rate', 'Lead Count']
+    source_performance['Conversion Rate'] *= 100
+    return source_performance
+
+
+def industry_conversion_table(df):
+    industry_conv = df.groupby('industry', observed=True).agg(
+        converted=('converted', 'mean'),
+        lead_count=('converted', 'size'),
+    )
+    industry_conv['Conversion Rate'] = industry_conv['converted'] * 100
+    return industry_conv[industry_conv['lead_count'] >= MIN_INDUSTRY_LEADS]
+
+
+def compute_dashboard_aggregates(df):
+    scores = df['lead_score']
+    return DashboardAggregates(
+        total_leads=len(df),
+        high_quality_leads=int((scores >= HIGH_QUALITY_SCORE).sum()),
+        converted_leads=int(df['converted'].sum()),
+        total_pipeline_value=df['estimated_deal_value'].sum(),
+        score_distribution=score_categories(scores).value_counts(),
+        source_performance=source_performance_table(df),
+        industry_conversion=industry_conversion_table(df),
+    )
+
+
+class _GroupSums:
+    # Running per-group sums, with groups assigned slots on first sight
+    def __init__(self, name, n_values):
+        self.name = name
+        self.slots = {}
+        self.sums = np.zeros((0, n_values))
+
+    def add(self, keys, values, sign):
+        uniques = pd.unique(np.asarray(keys, dtype=object))
+        for key in uniques:
+            if key not in self.slots:
+                self.slots[key] = len(self.slots)
+        if len(self.slots) > len(self.sums):
+            self.sums = np.vstack([self.sums, np.zeros((len(self.slots) - len(self.sums), self.sums.shape[1]))])
+        codes = pd.Index(list(self.slots)).get_indexer(keys)
+        for column, weights in enumerate(values):
+            self.sums[:, column] += sign * np.bincount(codes, weights=weights, minlength=len(self.sums))
+
+    def frame(self, columns):
+        table = pd.DataFrame(self.sums, index=pd.Index(list(self.slots), name=self.name), columns=columns)
+        # Groups whose leads were all deleted disappear, as in a groupby
+        return table[table[columns[0]] > 0].sort_index()
+
+
+class IncrementalAggregates:
+    # Dashboard aggregates maintained from append/update/delete deltas in
+    # O(delta) time. Deletes and updates must pass the rows as they were
+    # last appended so their contribution can be subtracted exactly
+    def __init__(self):
+        self.total_leads = 0
+        self.high_quality_leads = 0
+        self.converted_leads = 0
+        self.total_pipeline_value = 0.0
+        self.score_counts = np.zeros(len(SCORE_LABELS), dtype=np.int64)
+        self.sources = _GroupSums('lead_source', 3)   # count, score sum, converted sum
+        self.industries = _GroupSums('industry', 2)   # count, converted sum
+
+    @classmethod
+    def from_frame(cls, df):
+        store = cls()
+        store.append(df)
+        return store
+
+    def append(self, df):
+        self._apply(df, 1)
+
+    def delete(self, df):
+        self._apply(df, -1)
+
+    def update(self, old, new):
+        self._apply(old, -1)
+        self._apply(new, 1)
+
+    def _apply(self, df, sign):
+        scores = df['lead_score'].to_numpy()
+        converted = df['converted'].to_numpy(dtype=np.float64)
+        ones = np.ones(len(df))
+
+        self.total_leads += sign * len(df)
+        self.high_quality_leads += sign * int((scores >= HIGH_QUALITY_SCORE).sum())
+        self.converted_leads += sign * int(converted.sum())
+        self.total_pipeline_value += sign * float(df['estimated_deal_value'].sum())
+
+        # Same right-closed buckets as pd.cut; scores outside the bins are not counted
+        buckets = np.digitize(scores, SCORE_BINS, right=True)
+        inside = (buckets >= 1) & (buckets <= len(SCORE_LABELS))
+        self.score_counts += sign * np.bincount(buckets[inside] - 1, minlength=len(SCORE_LABELS))
+
+        self.sources.add(df['lead_source'], [ones, scores.astype(np.float64), converted], sign)
+        self.industries.add(df['industry'], [ones, converted], sign)
+
+    def snapshot(self):
+        score_distribution = pd.Series(self.score_counts, index=pd.CategoricalIndex(SCORE_LABELS, name='lead_score'), name='count')
+        score_distribution = score_distribution.sort_values(ascending=False, kind='stable')
+
+        sources = self.sources.frame(['Lead Count', 'score_sum', 'converted_sum'])
+        source_performance = pd.DataFrame({
+            'Avg Score': sources['score_sum'] / sources['Lead Count'],
+            'Conversion Rate': sources['converted_sum'] / sources['Lead Count'],
+            'Lead Count': sources['Lead Count'].astype(np.int64),
+        }).round(2)
+        source_performance['Conversion Rate'] *= 100
+
+        industries = self.industries.frame(['lead_count', 'converted_sum'])
+        industry_conv = pd.DataFrame({
+            'converted': industries['converted_sum'] / industries['lead_count'],
+            'lead_count': industries['lead_count'].astype(np.int64),
+        })
+        industry_conv['Conversion Rate'] = industry_conv['converted'] * 100
+
+        return DashboardAggregates(
+            total_leads=self.total_leads,
+            high_quality_leads=self.high_quality_leads,
+            converted_leads=self.converted_leads,
+            total_pipeline_value=self.total_pipeline_value,
+            score_distribution=score_distribution,
+            source_performance=source_performance,
+            industry_conversion=industry_conv[industry_conv['lead_count'] >= MIN_INDUSTRY_LEADS],
+        )
+
+    def mismatches(self, df):
+        # Compare against a full recompute over df; returns the names of the
+        # aggregates that disagree (empty when consistent)
+        expected = compute_dashboard_aggregates(df)
+        actual = self.snapshot()
+        problems = [
+            name for name in ('total_leads', 'high_quality_leads', 'converted_leads')
+            if getattr(expected, name) != getattr(actual, name)
+        ]
+        if not np.isclose(expected.total_pipeline_value, actual.total_pipeline_value):
+            problems.append('total_pipeline_value')
+        distribution = expected.score_distribution.reindex(SCORE_LABELS, fill_value=0)
+        if not np.array_equal(distribution.to_numpy(), actual.score_distribution.reindex(SCORE_LABELS).to_numpy()):
+            problems.append('score_distribution')
+        for name in ('source_performance', 'industry_conversion'):
+            left = getattr(expected, name)
+            left = left.set_axis(left.index.astype(object)).sort_index()
+            right = getattr(actual, name)
+            if not (left.index.equals(right.index) and np.allclose(left.to_numpy(dtype=float), right[left.columns].to_numpy(dtype=float))):
+                problems.append(name)
+        return problems
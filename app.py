@@ -4,10 +4,25 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import datetime as dt
-from datetime import datetime, timedelta
+import os
 import random
 
+from aggregates import compute_dashboard_aggregates, dataset_fingerprint
+from display_format import FormattedView
+from engagement_window import WINDOW_DAYS
+from figure_cache import FigureCache, data_key
+from followup_scheduler import SLA_SECONDS, follow_up_times
+from chart_data import density_figure, density_grid, downsample_line, histogram, histogram_figure, line_figure
+from conversion_analytics import compute_conversion_analytics
+from conversion_model import ConversionModel
+from lead_store import LeadStore
+from lead_routing import DAILY_CAPACITY, generate_roster, simulate
+from lead_table import SORT_COLUMNS, LeadTable
+from model_registry import DEFAULT_MODEL, default_registry
+from pipeline_rollup import GRANULARITIES, PipelineRollup
+from render_profile import RenderProfiler
+from scoring import RECOMMENDATIONS, TIERS, classify
+
 # Page configuration
 st.set_page_config(
     page_title="Intelligent Sales AI Platform",
@@ -62,71 +77,128 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Generate mock data
+# Load the lead store once per process; pages must treat its frame as
+# read-only. With LEAD_DATASET_PATH set (see `python lead_store.py --save`)
+# the saved store is memory-mapped, so startup does not depend on its size
+# and replicas on one host share its pages; otherwise mock data is generated
+@st.cache_resource
+def generate_mock_data(n_leads=500, seed=42):
+    path = os.environ.get('LEAD_DATASET_PATH')
+    store = LeadStore.open(path) if path else LeadStore.generate(n_leads=n_leads, seed=seed)
+    return store, store.fingerprint or dataset_fingerprint(store.frame)
+
+# Dashboard tables are computed once per dataset version, not on every rerun
 @st.cache_data
-def generate_mock_data():
-    np.random.seed(42)
-    
-    # Lead sources
-    lead_sources = ['Website', 'LinkedIn', 'Email Campaign', 'Referral', 'Trade Show', 'Cold Outreach', 'Content Marketing', 'Webinar']
-    
-    # Industries
-    industries = ['Technology', 'Healthcare', 'Finance', 'Manufacturing', 'Retail', 'Education', 'Real Estate', 'Consulting']
-    
-    # Company sizes
-    company_sizes = ['1-10', '11-50', '51-200', '201-1000', '1000+']
-    
-    # Job titles
-    job_titles = ['CEO', 'VP Sales', 'Sales Manager', 'Director', 'VP Marketing', 'IT Manager', 'CFO', 'Operations Manager']
-    
-    # Generate 500 leads
-    leads = []
-    for i in range(500):
-        # Base scoring factors
-        company_size_score = np.random.choice([10, 20, 30, 40, 50], p=[0.2, 0.3, 0.25, 0.15, 0.1])
-        industry_score = np.random.randint(10, 40)
-        engagement_score = np.random.randint(0, 30)
-        title_score = np.random.choice([10, 15, 20, 25, 30], p=[0.15, 0.2, 0.3, 0.2, 0.15])
-        
-        # Calculate total score with some randomness
-        base_score = company_size_score + industry_score + engagement_score + title_score
-        final_score = min(100, max(0, base_score + np.random.randint(-15, 15)))
-        
-        # Determine conversion based on score
-        conversion_prob = final_score / 100 * 0.6 + 0.1  # 10-70% based on score
-        converted = np.random.random() < conversion_prob
-        
-        # Lead age
-        lead_age = np.random.randint(1, 90)
-        
-        lead = {
-            'lead_id': f'LEAD-{1000 + i}',
-            'company_name': f'Company {chr(65 + i % 26)}{i}',
-            'contact_name': f'Contact {i}',
-            'email': f'contact{i}@company{i}.com',
-            'phone': f'+1-555-{random.randint(1000, 9999)}',
-            'lead_source': np.random.choice(lead_sources),
-            'industry': np.random.choice(industries),
-            'company_size': np.random.choice(company_sizes),
-            'job_title': np.random.choice(job_titles),
-            'lead_score': final_score,
-            'conversion_probability': round(conversion_prob * 100, 1),
-            'estimated_deal_value': np.random.randint(5000, 150000),
-            'lead_age_days': lead_age,
-            'last_contact': datetime.now() - timedelta(days=np.random.randint(0, 30)),
-            'email_opens': np.random.randint(0, 15),
-            'website_visits': np.random.randint(0, 25),
-            'content_downloads': np.random.randint(0, 8),
-            'converted': converted,
-            'time_to_close': np.random.randint(15, 120) if converted else None,
-            'actual_deal_value': np.random.randint(3000, 180000) if converted else None
-        }
-        leads.append(lead)
-    
-    return pd.DataFrame(leads)
+def get_dashboard_aggregates(data_version, _df):
+    return compute_dashboard_aggregates(_df)
+
+# Lead-level chart series, reduced on the server once per dataset version so
+# figure payloads stay small however many leads there are
+@st.cache_data
+def get_lead_chart_series(data_version, _df):
+    order = np.argsort(_df['last_contact'].to_numpy(), kind='stable')
+    return {
+        'score_histogram': histogram(_df['lead_score'].to_numpy(), bins=50, value_range=(0, 100)),
+        'score_conversion': density_grid(
+            _df['lead_score'].to_numpy(), _df['conversion_probability'].to_numpy(),
+            x_range=(0, 100), y_range=(0, 100),
+        ),
+        'pipeline_by_contact': downsample_line(
+            _df['last_contact'].to_numpy()[order],
+            np.cumsum(_df['estimated_deal_value'].to_numpy(dtype=np.float64)[order]),
+        ),
+    }
+
+# Per-day cumulative deal values behind the "Monthly Sales Pipeline" chart;
+# any date range and granularity is then answered without touching the leads
+@st.cache_resource
+def get_pipeline_rollup(data_version, _df):
+    return PipelineRollup(_df)
+
+# Conversion Analytics tables from one bincount pass over the leads
+@st.cache_data
+def get_conversion_analytics(data_version, _df):
+    return compute_conversion_analytics(_df)
+
+# Sort orders for the paginated lead tables, built once per dataset version
+@st.cache_resource
+def get_lead_table(data_version, _df):
+    return LeadTable(_df)
+
+# Formatted display columns, filled in on first use per dataset version
+@st.cache_resource
+def get_formatted_view(data_version, _store):
+    return FormattedView(_store)
+
+# The dataset replayed as one day of arrivals through the lead router, with
+# a generated team sized to take it
+@st.cache_data
+def get_routing_simulation(data_version, _df):
+    n_reps = max(10, -(-len(_df) * 11 // (10 * DAILY_CAPACITY)))
+    return simulate(_df, generate_roster(n_reps))
+
+# Scoring models, loaded once per process in a background thread so the
+# first scored lead does not wait for training
+@st.cache_resource
+def get_model_registry():
+    registry = default_registry()
+    registry.warm()
+    return registry
+
+# Built figures shared by all sessions, keyed by page, chart and data
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+# Section timings of every page, shared by all sessions
+@st.cache_resource
+def get_profiler():
+    return RenderProfiler()
+
+def plot_cached(chart_id, key, build):
+    with profiler.section(page, chart_id):
+        st.plotly_chart(figure_cache.figure(page, chart_id, key, build), use_container_width=True)
+
+SORT_LABELS = {'lead_score': 'Lead Score', 'priority_score': 'Priority', 'estimated_deal_value': 'Deal Value'}
+PAGE_SIZES = [10, 25, 50, 100]
+
+def lead_table_page(key, columns, default_sort='lead_score', default_min_score=0, tier_filter=False):
+    # Sort, filter and page controls for one lead table; returns the display
+    # frame of the selected page. Only that page is ever fetched, unless the
+    # whole list is exported
+    col_a, col_b, col_c, col_d = st.columns(4)
+    with col_a:
+        sort_by = st.selectbox("Sort by", SORT_COLUMNS, index=SORT_COLUMNS.index(default_sort),
+                               format_func=SORT_LABELS.get, key=f'{key}_sort')
+        ascending = st.checkbox("Ascending", key=f'{key}_ascending')
+    with col_b:
+        min_score = st.slider("Minimum score", 0, 100, default_min_score, key=f'{key}_min_score')
+        tier = st.selectbox("Tier", ['All'] + TIERS[::-1], key=f'{key}_tier') if tier_filter else 'All'
+    
+    view = lead_table.query(sort_by, ascending, min_score=min_score or None, tier=None if tier == 'All' else tier)
+    with col_c:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, key=f'{key}_page_size')
+    n_pages = LeadTable.n_pages(view, page_size)
+    # Narrower filters can leave the remembered page past the end
+    if st.session_state.get(f'{key}_page', 1) > n_pages:
+        st.session_state[f'{key}_page'] = n_pages
+    with col_d:
+        page_number = st.number_input("Page", min_value=1, max_value=n_pages, key=f'{key}_page')
+    st.caption(f"{len(view):,} leads · page {page_number:,} of {n_pages:,}")
+    if st.button(f"Export all {len(view):,} leads", key=f'{key}_export'):
+        st.download_button("Download CSV", formatted_view.to_csv(view, columns), file_name=f'{key}_leads.csv',
+                           mime='text/csv', key=f'{key}_download')
+    return formatted_view.frame(LeadTable.page(view, page_number, page_size), columns)
 
 # Load data
-df_leads = generate_mock_data()
+profiler = get_profiler()
+with profiler.section('All pages', 'data_load'):
+    lead_store, data_version = generate_mock_data()
+df_leads = lead_store.frame
+figure_cache = get_figure_cache()
+model_registry = get_model_registry()
+lead_table = get_lead_table(data_version, df_leads)
+formatted_view = get_formatted_view(data_version, lead_store)
 
 # Sidebar navigation
 st.sidebar.title("🎯 Navigation")
@@ -138,6 +210,14 @@ page = st.sidebar.selectbox("Select Module", [
     "ROI Analysis"
 ])
 
+cache_stats = figure_cache.stats()
+st.sidebar.caption(
+    f"Figure cache: {cache_stats['hit_rate']:.0%} hit rate "
+    f"({cache_stats['hits']:,} hits, {cache_stats['entries']} figures, {cache_stats['bytes'] / 1024:,.0f} KB)"
+)
+
+page_timer = profiler.timer(page, 'total')
+
 # Header
 st.markdown("""
 <div class="main-header">
@@ -150,12 +230,14 @@ if page == "Executive Dashboard":
     st.header("📊 Executive Sales Dashboard")
     
     # Key metrics
+    kpi_timer = profiler.timer(page, 'kpi_metrics')
     col1, col2, col3, col4 = st.columns(4)
     
-    total_leads = len(df_leads)
-    high_quality_leads = len(df_leads[df_leads['lead_score'] >= 70])
-    avg_conversion_rate = (df_leads['converted'].sum() / total_leads) * 100
-    total_pipeline_value = df_leads['estimated_deal_value'].sum()
+    aggregates = get_dashboard_aggregates(data_version, df_leads)
+    total_leads = aggregates.total_leads
+    high_quality_leads = aggregates.high_quality_leads
+    avg_conversion_rate = aggregates.avg_conversion_rate
+    total_pipeline_value = aggregates.total_pipeline_value
     
     with col1:
         st.metric(
@@ -184,6 +266,7 @@ if page == "Executive Dashboard":
             value=f"${total_pipeline_value/1000000:.1f}M",
             delta=f"+${random.randint(100, 500)}K this month"
         )
+    kpi_timer.stop()
     
     # Charts row 1
     col1, col2 = st.columns(2)
@@ -191,43 +274,37 @@ if page == "Executive Dashboard":
     with col1:
         st.subheader("Lead Score Distribution")
         
-        # Create score categories
-        df_leads['score_category'] = pd.cut(df_leads['lead_score'], 
-                                          bins=[0, 40, 70, 100], 
-                                          labels=['Cold (0-40)', 'Warm (41-70)', 'Hot (71-100)'])
-        
-        score_dist = df_leads['score_category'].value_counts()
+        def build_score_distribution():
+            score_dist = aggregates.score_distribution
+            
+            fig_score = px.pie(
+                values=score_dist.values,
+                names=score_dist.index,
+                color_discrete_sequence=['#f44336', '#ff9800', '#4CAF50'],
+                title="Lead Quality Distribution"
+            )
+            fig_score.update_traces(textposition='inside', textinfo='percent+label')
+            return fig_score
         
-        fig_score = px.pie(
-            values=score_dist.values,
-            names=score_dist.index,
-            color_discrete_sequence=['#f44336', '#ff9800', '#4CAF50'],
-            title="Lead Quality Distribution"
-        )
-        fig_score.update_traces(textposition='inside', textinfo='percent+label')
-        st.plotly_chart(fig_score, use_container_width=True)
+        plot_cached('score_distribution', data_version, build_score_distribution)
     
     with col2:
         st.subheader("Lead Sources Performance")
         
-        source_performance = df_leads.groupby('lead_source').agg({
-            'lead_score': 'mean',
-            'converted': 'mean',
-            'lead_id': 'count'
-        }).round(2)
-        source_performance.columns = ['Avg Score', 'Conversion Rate', 'Lead Count']
-        source_performance['Conversion Rate'] *= 100
-        
-        fig_sources = px.scatter(
-            source_performance.reset_index(),
-            x='Avg Score',
-            y='Conversion Rate',
-            size='Lead Count',
-            hover_name='lead_source',
-            title="Lead Source Quality vs Conversion",
-            labels={'Avg Score': 'Average Lead Score', 'Conversion Rate': 'Conversion Rate (%)'}
-        )
-        st.plotly_chart(fig_sources, use_container_width=True)
+        def build_source_performance():
+            source_performance = aggregates.source_performance
+            
+            return px.scatter(
+                source_performance.reset_index(),
+                x='Avg Score',
+                y='Conversion Rate',
+                size='Lead Count',
+                hover_name='lead_source',
+                title="Lead Source Quality vs Conversion",
+                labels={'Avg Score': 'Average Lead Score', 'Conversion Rate': 'Conversion Rate (%)'}
+            )
+        
+        plot_cached('source_performance', data_version, build_source_performance)
     
     # Charts row 2
     col1, col2 = st.columns(2)
@@ -235,65 +312,96 @@ if page == "Executive Dashboard":
     with col1:
         st.subheader("Monthly Sales Pipeline")
         
-        # Generate monthly data
-        months = pd.date_range(start='2024-01-01', end='2024-12-31', freq='ME')
-        monthly_pipeline = []
-        
-        for month in months:
-            pipeline_value = random.randint(800000, 1500000)
-            closed_deals = random.randint(150000, 400000)
-            monthly_pipeline.append({
-                'Month': month.strftime('%b %Y'),
-                'Pipeline Value': pipeline_value,
-                'Closed Deals': closed_deals
-            })
-        
-        df_monthly = pd.DataFrame(monthly_pipeline)
-        
-        fig_pipeline = go.Figure()
-        fig_pipeline.add_trace(go.Scatter(
-            x=df_monthly['Month'],
-            y=df_monthly['Pipeline Value'],
-            mode='lines+markers',
-            name='Pipeline Value',
-            line=dict(color='#667eea', width=3)
-        ))
-        fig_pipeline.add_trace(go.Scatter(
-            x=df_monthly['Month'],
-            y=df_monthly['Closed Deals'],
-            mode='lines+markers',
-            name='Closed Deals',
-            line=dict(color='#4CAF50', width=3)
-        ))
+        pipeline_rollup = get_pipeline_rollup(data_version, df_leads)
+        date_range = pipeline_rollup.date_range or (pd.Timestamp.now().normalize(),) * 2
+        
+        col_a, col_b = st.columns(2)
+        with col_a:
+            granularity = st.selectbox("Granularity", list(GRANULARITIES), index=1)
+        with col_b:
+            selected_range = st.date_input(
+                "Date range",
+                value=(date_range[0].date(), date_range[1].date()),
+                min_value=date_range[0].date(),
+                max_value=date_range[1].date(),
+            )
+        # The picker returns a single date while a range is half selected
+        range_start, range_end = selected_range if len(selected_range) == 2 else date_range
+        
+        def build_pipeline():
+            df_periods = pipeline_rollup.frame(range_start, range_end, granularity)
+            
+            fig_pipeline = go.Figure()
+            fig_pipeline.add_trace(go.Scatter(
+                x=df_periods.index,
+                y=df_periods['Pipeline Value'],
+                mode='lines+markers',
+                name='Pipeline Value',
+                line=dict(color='#667eea', width=3)
+            ))
+            fig_pipeline.add_trace(go.Scatter(
+                x=df_periods.index,
+                y=df_periods['Closed Deals'],
+                mode='lines+markers',
+                name='Closed Deals',
+                line=dict(color='#4CAF50', width=3)
+            ))
+            
+            fig_pipeline.update_layout(
+                title="Sales Pipeline Trends",
+                xaxis_title=granularity.capitalize(),
+                yaxis_title="Value ($)",
+                hovermode='x'
+            )
+            return fig_pipeline
         
-        fig_pipeline.update_layout(
-            title="Sales Pipeline Trends",
-            xaxis_title="Month",
-            yaxis_title="Value ($)",
-            hovermode='x'
-        )
-        st.plotly_chart(fig_pipeline, use_container_width=True)
+        plot_cached('monthly_pipeline', (data_version, granularity, str(range_start), str(range_end)), build_pipeline)
     
     with col2:
         st.subheader("Conversion Rate by Industry")
         
-        industry_conv = df_leads.groupby('industry').agg({
-            'converted': 'mean',
-            'lead_id': 'count'
-        })
-        industry_conv['Conversion Rate'] = industry_conv['converted'] * 100
-        industry_conv = industry_conv[industry_conv['lead_id'] >= 10]  # Filter industries with at least 10 leads
-        
-        fig_industry = px.bar(
-            industry_conv.reset_index(),
-            x='industry',
-            y='Conversion Rate',
-            title="Industry Conversion Rates",
-            color='Conversion Rate',
-            color_continuous_scale='Viridis'
-        )
-        fig_industry.update_layout(xaxis_tickangle=45)
-        st.plotly_chart(fig_industry, use_container_width=True)
+        def build_industry_conversion():
+            industry_conv = aggregates.industry_conversion
+            
+            fig_industry = px.bar(
+                industry_conv.reset_index(),
+                x='industry',
+                y='Conversion Rate',
+                title="Industry Conversion Rates",
+                color='Conversion Rate',
+                color_continuous_scale='Viridis'
+            )
+            fig_industry.update_layout(xaxis_tickangle=45)
+            return fig_industry
+        
+        plot_cached('industry_conversion', data_version, build_industry_conversion)
+    
+    # Charts row 3: lead-level views, binned or downsampled on the server
+    chart_series = get_lead_chart_series(data_version, df_leads)
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("Lead Score Histogram")
+        
+        score_histogram = chart_series['score_histogram']
+        plot_cached('score_histogram', data_version,
+                    lambda: histogram_figure(score_histogram, "Leads by Score", "Lead Score"))
+        st.caption(score_histogram.caption())
+    
+    with col2:
+        st.subheader("Score vs Conversion Probability")
+        
+        score_conversion = chart_series['score_conversion']
+        plot_cached('score_conversion', data_version,
+                    lambda: density_figure(score_conversion, "Lead Density", "Lead Score", "Conversion Probability (%)"))
+        st.caption(score_conversion.caption())
+    
+    st.subheader("Pipeline Build-up by Last Contact")
+    
+    pipeline_by_contact = chart_series['pipeline_by_contact']
+    plot_cached('pipeline_by_contact', data_version,
+                lambda: line_figure(pipeline_by_contact, "Cumulative Pipeline Value", "Last Contact", "Value ($)"))
+    st.caption(pipeline_by_contact.caption())
 
 elif page == "Lead Scoring Engine":
     st.header("🎯 AI Lead Scoring Engine")
@@ -318,53 +426,45 @@ elif page == "Lead Scoring Engine":
             with col_b:
                 job_title = st.selectbox("Job Title", ['CEO', 'VP Sales', 'Sales Manager', 'Director', 'VP Marketing', 'IT Manager'])
                 lead_source = st.selectbox("Lead Source", ['Website', 'LinkedIn', 'Email Campaign', 'Referral', 'Trade Show'])
-                email_opens = st.slider("Email Opens (last 30 days)", 0, 20, 5)
-                website_visits = st.slider("Website Visits (last 30 days)", 0, 30, 8)
+                email_opens = st.slider(f"Email Opens (last {WINDOW_DAYS} days)", 0, 20, 5)
+                website_visits = st.slider(f"Website Visits (last {WINDOW_DAYS} days)", 0, 30, 8)
             
             budget_range = st.selectbox("Budget Range", ['<$10K', '$10K-$50K', '$50K-$100K', '$100K-$500K', '$500K+'])
             urgency = st.selectbox("Purchase Urgency", ['Not urgent', 'Within 6 months', 'Within 3 months', 'Within 1 month', 'Immediate'])
+            model_name = st.selectbox("Scoring Model", model_registry.names(), index=model_registry.names().index(DEFAULT_MODEL))
             
             submitted = st.form_submit_button("Calculate Lead Score", type="primary")
         
         if submitted:
-            # Calculate score based on inputs
-            score = 0
-            
-            # Company size scoring
-            size_scores = {'1-10': 10, '11-50': 20, '51-200': 30, '201-1000': 40, '1000+': 50}
-            score += size_scores[company_size]
-            
-            # Title scoring
-            title_scores = {'CEO': 30, 'VP Sales': 25, 'VP Marketing': 25, 'Sales Manager': 20, 'Director': 20, 'IT Manager': 15}
-            score += title_scores[job_title]
-            
-            # Engagement scoring
-            score += min(email_opens * 2, 20)  # Max 20 points
-            score += min(website_visits * 1, 15)  # Max 15 points
-            
-            # Budget scoring
-            budget_scores = {'<$10K': 5, '$10K-$50K': 10, '$50K-$100K': 15, '$100K-$500K': 20, '$500K+': 25}
-            score += budget_scores[budget_range]
-            
-            # Urgency scoring
-            urgency_scores = {'Not urgent': 0, 'Within 6 months': 5, 'Within 3 months': 10, 'Within 1 month': 15, 'Immediate': 20}
-            score += urgency_scores[urgency]
+            # Score the submitted lead as a batch of one with the chosen model
+            lead = pd.DataFrame([{
+                'company_size': company_size,
+                'industry': industry,
+                'job_title': job_title,
+                'lead_source': lead_source,
+                'email_opens': email_opens,
+                'website_visits': website_visits,
+                'budget_range': budget_range,
+                'urgency': urgency,
+            }])
+            with profiler.section(page, 'lead_scoring'):
+                score = int(model_registry.predict(model_name, lead)[0])
+            tier = classify([score]).iloc[0]
+            recommendation = RECOMMENDATIONS[tier]
             
             # Display results
             st.markdown("### 📊 Lead Score Results")
             
-            if score >= 70:
+            if tier == 'Hot':
                 st.markdown(f'<div class="lead-score-high">🔥 HOT LEAD: {score}/100</div>', unsafe_allow_html=True)
-                recommendation = "🚨 **IMMEDIATE ACTION REQUIRED** - Assign to senior sales rep within 1 hour"
-                conversion_prob = 65 + random.randint(0, 20)
-            elif score >= 40:
+            elif tier == 'Warm':
                 st.markdown(f'<div class="lead-score-medium">🟡 WARM LEAD: {score}/100</div>', unsafe_allow_html=True)
-                recommendation = "📞 Contact within 24 hours - High potential for conversion"
-                conversion_prob = 35 + random.randint(0, 25)
             else:
                 st.markdown(f'<div class="lead-score-low">❄️ COLD LEAD: {score}/100</div>', unsafe_allow_html=True)
-                recommendation = "📧 Add to nurturing campaign - Educational content focus"
-                conversion_prob = 10 + random.randint(0, 20)
+            
+            # Whichever model scored the lead, the probability comes from the
+            # conversion model trained on past outcomes
+            conversion_prob = int(model_registry.predict(ConversionModel.name, lead)[0])
             
             st.success(recommendation)
             
@@ -415,42 +515,49 @@ elif page == "Lead Scoring Engine":
         - **❄️ Cold Leads (0-39)**: Nurturing campaign
         """)
     
-    # Recent leads table
-    st.subheader("Recent High-Score Leads")
+    # Qualified leads, sorted and paged on the server
+    st.subheader("High-Score Leads")
     
-    high_score_leads = df_leads[df_leads['lead_score'] >= 60].sort_values('lead_score', ascending=False).head(10)
-    
-    display_leads = high_score_leads[['company_name', 'contact_name', 'lead_source', 'industry', 'lead_score', 'conversion_probability', 'estimated_deal_value']].copy()
-    display_leads['estimated_deal_value'] = display_leads['estimated_deal_value'].apply(lambda x: f"${x:,}")
-    display_leads['conversion_probability'] = display_leads['conversion_probability'].apply(lambda x: f"{x}%")
-    display_leads.columns = ['Company', 'Contact', 'Source', 'Industry', 'Score', 'Conv. Prob.', 'Est. Value']
+    table_timer = profiler.timer(page, 'high_score_table')
+    display_leads = lead_table_page('high_score', {
+        'Company': 'company_name',
+        'Contact': 'contact_name',
+        'Source': 'lead_source',
+        'Industry': 'industry',
+        'Score': 'lead_score',
+        'Conv. Prob.': 'conversion_percent',
+        'Est. Value': 'deal_value',
+    }, 'lead_score', default_min_score=60)
     
     st.dataframe(display_leads, use_container_width=True)
+    table_timer.stop()
 
 elif page == "Conversion Analytics":
     st.header("📈 Conversion Analytics & Insights")
     
+    with profiler.section(page, 'conversion_analytics'):
+        conversion = get_conversion_analytics(data_version, df_leads)
+    
     # Conversion funnel
     st.subheader("Sales Conversion Funnel")
     
-    # Create funnel data
-    funnel_stages = ['Leads Generated', 'Qualified Leads', 'Opportunities', 'Proposals Sent', 'Closed Won']
-    funnel_values = [500, 300, 180, 120, 85]
-    funnel_colors = ['#E8F4FD', '#B8E6B8', '#87CEEB', '#FFA07A', '#90EE90']
+    funnel_colors = ['#E8F4FD', '#B8E6B8', '#87CEEB', '#90EE90']
     
-    fig_funnel = go.Figure(go.Funnel(
-        y=funnel_stages,
-        x=funnel_values,
-        textinfo="value+percent initial",
-        marker=dict(color=funnel_colors)
-    ))
-    
-    fig_funnel.update_layout(
-        title="Sales Conversion Funnel Analysis",
-        font_size=12,
-    )
+    def build_funnel():
+        fig_funnel = go.Figure(go.Funnel(
+            y=conversion.funnel.index,
+            x=conversion.funnel.values,
+            textinfo="value+percent initial",
+            marker=dict(color=funnel_colors)
+        ))
+        
+        fig_funnel.update_layout(
+            title="Sales Conversion Funnel Analysis",
+            font_size=12,
+        )
+        return fig_funnel
     
-    st.plotly_chart(fig_funnel, use_container_width=True)
+    plot_cached('funnel', data_version, build_funnel)
     
     # Conversion metrics by lead score
     col1, col2 = st.columns(2)
@@ -458,35 +565,33 @@ elif page == "Conversion Analytics":
     with col1:
         st.subheader("Conversion Rate by Lead Score Range")
         
-        score_ranges = ['0-30', '31-50', '51-70', '71-85', '86-100']
-        conversion_rates = [8, 22, 45, 68, 85]
+        by_score_range = conversion.by_score_range
         
-        fig_conversion = px.bar(
-            x=score_ranges,
-            y=conversion_rates,
+        plot_cached('conversion_by_score', data_version, lambda: px.bar(
+            x=by_score_range.index,
+            y=by_score_range['Conversion Rate'],
             title="Lead Score vs Conversion Rate",
             labels={'x': 'Lead Score Range', 'y': 'Conversion Rate (%)'},
-            color=conversion_rates,
+            color=by_score_range['Conversion Rate'],
             color_continuous_scale='RdYlGn'
-        )
-        
-        st.plotly_chart(fig_conversion, use_container_width=True)
+        ))
     
     with col2:
         st.subheader("Average Deal Size by Score")
         
-        avg_deal_sizes = [12000, 28000, 45000, 72000, 95000]
-        
-        fig_deal_size = px.line(
-            x=score_ranges,
-            y=avg_deal_sizes,
-            title="Lead Score vs Average Deal Size",
-            labels={'x': 'Lead Score Range', 'y': 'Average Deal Size ($)'},
-            markers=True
-        )
+        def build_deal_size():
+            fig_deal_size = px.line(
+                x=by_score_range.index,
+                y=by_score_range['Avg Deal Size'],
+                title="Lead Score vs Average Deal Size",
+                labels={'x': 'Lead Score Range', 'y': 'Average Deal Size ($)'},
+                markers=True
+            )
+            
+            fig_deal_size.update_traces(line=dict(color='#667eea', width=4))
+            return fig_deal_size
         
-        fig_deal_size.update_traces(line=dict(color='#667eea', width=4))
-        st.plotly_chart(fig_deal_size, use_container_width=True)
+        plot_cached('deal_size_by_score', data_version, build_deal_size)
     
     # Time to close analysis
     st.subheader("Time to Close Analysis")
@@ -494,40 +599,40 @@ elif page == "Conversion Analytics":
     col1, col2 = st.columns(2)
     
     with col1:
-        # Create sample data for time to close by score
-        score_categories = ['Hot (70-100)', 'Warm (40-69)', 'Cold (0-39)']
-        avg_time_to_close = [35, 65, 95]
+        by_tier = conversion.by_tier
         
-        fig_time = px.bar(
-            x=score_categories,
-            y=avg_time_to_close,
+        plot_cached('time_to_close', data_version, lambda: px.bar(
+            x=by_tier.index,
+            y=by_tier['Avg Time to Close'],
             title="Average Time to Close by Lead Quality",
             labels={'x': 'Lead Category', 'y': 'Days to Close'},
-            color=avg_time_to_close,
+            color=by_tier['Avg Time to Close'],
             color_continuous_scale='RdYlGn_r'
-        )
-        
-        st.plotly_chart(fig_time, use_container_width=True)
+        ))
     
     with col2:
         # Win rate by lead source
-        source_win_rates = df_leads.groupby('lead_source')['converted'].mean() * 100
-        
-        fig_source_win = px.bar(
-            x=source_win_rates.index,
-            y=source_win_rates.values,
-            title="Win Rate by Lead Source",
-            labels={'x': 'Lead Source', 'y': 'Win Rate (%)'},
-            color=source_win_rates.values,
-            color_continuous_scale='Viridis'
-        )
+        def build_source_win_rates():
+            source_win_rates = conversion.source_win_rates
+            
+            fig_source_win = px.bar(
+                x=source_win_rates.index,
+                y=source_win_rates.values,
+                title="Win Rate by Lead Source",
+                labels={'x': 'Lead Source', 'y': 'Win Rate (%)'},
+                color=source_win_rates.values,
+                color_continuous_scale='Viridis'
+            )
+            
+            fig_source_win.update_layout(xaxis_tickangle=45)
+            return fig_source_win
         
-        fig_source_win.update_layout(xaxis_tickangle=45)
-        st.plotly_chart(fig_source_win, use_container_width=True)
+        plot_cached('source_win_rates', data_version, build_source_win_rates)
     
     # Predictive analytics
     st.subheader("Predictive Analytics")
     
+    kpi_timer = profiler.timer(page, 'kpi_metrics')
     col1, col2, col3 = st.columns(3)
     
     with col1:
@@ -553,6 +658,7 @@ elif page == "Conversion Analytics":
             f"${forecasted_pipeline:,}",
             f"+{random.randint(15, 35)}% vs current"
         )
+    kpi_timer.stop()
 
 elif page == "Sales Automation":
     st.header("🚀 Sales Automation & Optimization")
@@ -605,28 +711,63 @@ elif page == "Sales Automation":
         - 📱 SMS for urgent hot leads
         - 🎥 Video messages for key accounts
         """)
+        
+        # When a lead scored right now would be followed up, per tier
+        scored_now = np.datetime64(pd.Timestamp.now().floor('min'))
+        next_follow_up = follow_up_times([2, 1, 0], scored_now)
+        st.dataframe(pd.DataFrame({
+            'Tier': TIERS[::-1],
+            'SLA': [f"{hours:,} h" for hours in SLA_SECONDS[::-1] // 3600],
+            'Next Follow-up': pd.to_datetime(next_follow_up).strftime('%a %d %b, %H:%M'),
+        }), hide_index=True, use_container_width=True)
     
-    # Lead prioritization
-    st.subheader("Daily Lead Prioritization")
+    # Routing simulation
+    st.subheader("Lead Routing Simulation")
+    
+    routing_timer = profiler.timer(page, 'routing_simulation')
+    routing = get_routing_simulation(data_version, df_leads)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Leads Routed to Reps", f"{routing.leads - routing.rules['nurture'] - routing.rules['unassigned']:,}")
+    with col2:
+        st.metric("Nurture / Unassigned", f"{routing.rules['nurture']:,} / {routing.rules['unassigned']:,}")
+    with col3:
+        st.metric("Routing Throughput", f"{routing.leads_per_second:,.0f} leads/s")
+    with col4:
+        st.metric("Load Fairness", f"{routing.fairness:.2f}")
     
-    # Generate priority list
-    priority_leads = df_leads.copy()
-    priority_leads['priority_score'] = (
-        priority_leads['lead_score'] * 0.5 + 
-        (100 - priority_leads['lead_age_days']) * 0.3 + 
-        priority_leads['email_opens'] * 2
-    )
+    col1, col2 = st.columns(2)
+    with col1:
+        rules = routing.rules.rename_axis('Rule').reset_index(name='Leads')
+        plot_cached('routing_rules', data_key(data_version), lambda: px.bar(
+            rules, x='Rule', y='Leads', title="Leads by Routing Rule"
+        ))
+    with col2:
+        st.dataframe(
+            routing.by_territory.assign(Utilization=routing.by_territory['Utilization'] * 100),
+            column_config={'Utilization': st.column_config.NumberColumn(format='%.0f%%')},
+            use_container_width=True,
+        )
+    routing_timer.stop()
     
-    top_priority = priority_leads.nlargest(15, 'priority_score')
+    # Lead prioritization
+    st.subheader("Daily Lead Prioritization")
     
-    display_priority = top_priority[['company_name', 'contact_name', 'lead_score', 'lead_age_days', 'conversion_probability', 'estimated_deal_value']].copy()
-    display_priority['Action Required'] = display_priority['lead_score'].apply(
-        lambda x: '🔥 Call Now' if x >= 70 else '📧 Email Today' if x >= 40 else '📬 Add to Campaign'
-    )
-    display_priority['estimated_deal_value'] = display_priority['estimated_deal_value'].apply(lambda x: f"${x:,}")
-    display_priority.columns = ['Company', 'Contact', 'Score', 'Age (Days)', 'Conv. Prob.', 'Est. Value', 'Action Required']
+    # Whole lead list by priority, sorted and paged on the server
+    table_timer = profiler.timer(page, 'priority_table')
+    display_priority = lead_table_page('priority', {
+        'Company': 'company_name',
+        'Contact': 'contact_name',
+        'Score': 'lead_score',
+        'Priority': 'priority_score',
+        'Age (Days)': 'lead_age_days',
+        'Conv. Prob.': 'conversion_probability',
+        'Est. Value': 'deal_value',
+        'Action Required': 'action',
+    }, 'priority_score', tier_filter=True)
     
     st.dataframe(display_priority, use_container_width=True)
+    table_timer.stop()
     
     # Automation performance
     col1, col2 = st.columns(2)
@@ -651,13 +792,11 @@ elif page == "Sales Automation":
         task_types = ['Lead Assignment', 'Follow-up Scheduling', 'Email Sequences', 'CRM Updates', 'Report Generation']
         task_counts = [45, 38, 28, 22, 15]
         
-        fig_tasks = px.pie(
+        plot_cached('task_distribution', data_key(task_types, task_counts), lambda: px.pie(
             values=task_counts,
             names=task_types,
             title="Daily Automated Tasks"
-        )
-        
-        st.plotly_chart(fig_tasks, use_container_width=True)
+        ))
     
     # Workflow optimization
     st.subheader("Workflow Optimization Recommendations")
@@ -697,6 +836,7 @@ elif page == "ROI Analysis":
     # Key ROI metrics
     st.subheader("Platform ROI Overview")
     
+    kpi_timer = profiler.timer(page, 'kpi_metrics')
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
@@ -726,6 +866,7 @@ elif page == "ROI Analysis":
             "3.2 months",
             "Faster than projected"
         )
+    kpi_timer.stop()
     
     # Before vs After comparison
     st.subheader("Performance Transformation")
@@ -797,14 +938,12 @@ elif page == "ROI Analysis":
         investment_categories = ['Platform License', 'Integration', 'Training', 'Maintenance']
         investment_amounts = [48000, 15000, 8000, 12000]
         
-        fig_investment = px.pie(
+        plot_cached('investment', data_key(investment_categories, investment_amounts), lambda: px.pie(
             values=investment_amounts,
             names=investment_categories,
             title="Investment Breakdown",
             color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        
-        st.plotly_chart(fig_investment, use_container_width=True)
+        ))
     
     with col2:
         st.markdown("""
@@ -828,16 +967,18 @@ elif page == "ROI Analysis":
         benefit_categories = ['Conversion Increase', 'Faster Cycles', 'Higher Values', 'Cost Reduction', 'Time Savings', 'Productivity']
         benefit_amounts = [1240000, 430000, 320000, 180000, 400000, 340000]
         
-        fig_benefits = px.bar(
-            x=benefit_categories,
-            y=benefit_amounts,
-            title="Annual Benefits Breakdown",
-            color=benefit_amounts,
-            color_continuous_scale='Greens'
-        )
-        fig_benefits.update_layout(xaxis_tickangle=45, showlegend=False)
+        def build_benefits():
+            fig_benefits = px.bar(
+                x=benefit_categories,
+                y=benefit_amounts,
+                title="Annual Benefits Breakdown",
+                color=benefit_amounts,
+                color_continuous_scale='Greens'
+            )
+            fig_benefits.update_layout(xaxis_tickangle=45, showlegend=False)
+            return fig_benefits
         
-        st.plotly_chart(fig_benefits, use_container_width=True)
+        plot_cached('benefits', data_key(benefit_categories, benefit_amounts), build_benefits)
     
     # Monthly ROI tracking
     st.subheader("Monthly ROI Progression")
@@ -846,26 +987,28 @@ elif page == "ROI Analysis":
     cumulative_roi = [15, 35, 68, 105, 148, 195, 238, 275, 305, 325, 340, 355]
     monthly_revenue_impact = [85000, 125000, 180000, 220000, 245000, 265000, 280000, 295000, 310000, 320000, 330000, 340000]
     
-    fig_roi_progression = make_subplots(specs=[[{"secondary_y": True}]])
-    
-    fig_roi_progression.add_trace(
-        go.Scatter(x=months, y=cumulative_roi, name="Cumulative ROI (%)", line=dict(color='#667eea', width=3)),
-        secondary_y=False,
-    )
-    
-    fig_roi_progression.add_trace(
-        go.Bar(x=months, y=monthly_revenue_impact, name="Monthly Revenue Impact", opacity=0.7, marker_color='#4CAF50'),
-        secondary_y=True,
-    )
-    
-    fig_roi_progression.update_layout(
-        title_text="ROI Growth & Revenue Impact Over Time",
-        xaxis_title="Month"
-    )
-    fig_roi_progression.update_yaxes(title_text="ROI (%)", secondary_y=False)
-    fig_roi_progression.update_yaxes(title_text="Revenue Impact ($)", secondary_y=True)
+    def build_roi_progression():
+        fig_roi_progression = make_subplots(specs=[[{"secondary_y": True}]])
+        
+        fig_roi_progression.add_trace(
+            go.Scatter(x=months, y=cumulative_roi, name="Cumulative ROI (%)", line=dict(color='#667eea', width=3)),
+            secondary_y=False,
+        )
+        
+        fig_roi_progression.add_trace(
+            go.Bar(x=months, y=monthly_revenue_impact, name="Monthly Revenue Impact", opacity=0.7, marker_color='#4CAF50'),
+            secondary_y=True,
+        )
+        
+        fig_roi_progression.update_layout(
+            title_text="ROI Growth & Revenue Impact Over Time",
+            xaxis_title="Month"
+        )
+        fig_roi_progression.update_yaxes(title_text="ROI (%)", secondary_y=False)
+        fig_roi_progression.update_yaxes(title_text="Revenue Impact ($)", secondary_y=True)
+        return fig_roi_progression
     
-    st.plotly_chart(fig_roi_progression, use_container_width=True)
+    plot_cached('roi_progression', data_key(months, cumulative_roi, monthly_revenue_impact), build_roi_progression)
     
     # Industry benchmarks
     st.subheader("Industry Performance Comparison")
@@ -881,27 +1024,29 @@ elif page == "ROI Analysis":
         
         metrics = ['Conversion Rate (%)', 'Sales Cycle (Days)', 'Qualification Rate (%)', 'Cost per Lead ($)']
         
-        fig_benchmark = go.Figure()
-        
-        for company, values in benchmarks.items():
-            fig_benchmark.add_trace(go.Scatterpolar(
-                r=values,
-                theta=metrics,
-                fill='toself',
-                name=company
-            ))
-        
-        fig_benchmark.update_layout(
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    range=[0, 150]
-                )),
-            showlegend=True,
-            title="Performance vs Industry Benchmarks"
-        )
-        
-        st.plotly_chart(fig_benchmark, use_container_width=True)
+        def build_benchmark():
+            fig_benchmark = go.Figure()
+            
+            for company, values in benchmarks.items():
+                fig_benchmark.add_trace(go.Scatterpolar(
+                    r=values,
+                    theta=metrics,
+                    fill='toself',
+                    name=company
+                ))
+            
+            fig_benchmark.update_layout(
+                polar=dict(
+                    radialaxis=dict(
+                        visible=True,
+                        range=[0, 150]
+                    )),
+                showlegend=True,
+                title="Performance vs Industry Benchmarks"
+            )
+            return fig_benchmark
+        
+        plot_cached('benchmark', data_key(benchmarks, metrics), build_benchmark)
     
     with col2:
         st.markdown("""
@@ -933,30 +1078,32 @@ elif page == "ROI Analysis":
     projected_revenue = [2.1, 3.2, 4.8, 8.5]
     projected_savings = [0.48, 0.75, 1.2, 2.1]
     
-    fig_projections = go.Figure()
-    
-    fig_projections.add_trace(go.Bar(
-        name='Revenue Increase (M$)',
-        x=years,
-        y=projected_revenue,
-        marker_color='#4CAF50'
-    ))
-    
-    fig_projections.add_trace(go.Bar(
-        name='Cost Savings (M$)',
-        x=years,
-        y=projected_savings,
-        marker_color='#2196F3'
-    ))
-    
-    fig_projections.update_layout(
-        title='5-Year Revenue & Savings Projection',
-        xaxis_title='Year',
-        yaxis_title='Value (Million $)',
-        barmode='group'
-    )
+    def build_projections():
+        fig_projections = go.Figure()
+        
+        fig_projections.add_trace(go.Bar(
+            name='Revenue Increase (M$)',
+            x=years,
+            y=projected_revenue,
+            marker_color='#4CAF50'
+        ))
+        
+        fig_projections.add_trace(go.Bar(
+            name='Cost Savings (M$)',
+            x=years,
+            y=projected_savings,
+            marker_color='#2196F3'
+        ))
+        
+        fig_projections.update_layout(
+            title='5-Year Revenue & Savings Projection',
+            xaxis_title='Year',
+            yaxis_title='Value (Million $)',
+            barmode='group'
+        )
+        return fig_projections
     
-    st.plotly_chart(fig_projections, use_container_width=True)
+    plot_cached('projections', data_key(years, projected_revenue, projected_savings), build_projections)
     
     # Success stories
     st.subheader("Success Stories & Use Cases")
@@ -1020,3 +1167,15 @@ st.markdown("""
     <p><strong>Contact:</strong> kwasrarajab@gmail.com</p>
 </div>
 """, unsafe_allow_html=True)
+
+page_timer.stop()
+
+# Optional debug panel: section timings over recent reruns of this page
+with st.sidebar.expander("🔧 Render profile"):
+    if st.checkbox("Show section timings"):
+        st.dataframe(
+            profiler.stats(page).drop(columns=['page', 'total_s']).set_index('section').round(2),
+            use_container_width=True,
+        )
+        st.download_button("Prometheus metrics", profiler.prometheus_text(), file_name="render_profile.prom")
+        st.download_button("JSON lines", profiler.json_lines(), file_name="render_profile.jsonl")
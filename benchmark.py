@@ -0,0 +1,243 @@
+"""Benchmark suite for scoring, page aggregations and figure building.
+
+Generates leads with the app's own distributions (LeadStore.generate, as
+generate_mock_data does) at each size and times:
+
+- single-lead scoring latency (a batch of one through score_batch)
+- batch scoring throughput (score_batch over every lead)
+- Executive Dashboard aggregates, pipeline rollup and lead-level chart series
+- Sales Automation prioritization (LeadTable build, then the first page of
+  the priority-sorted query, as the page renders it)
+- Conversion Analytics (funnel, score ranges, tiers, source win rates)
+- figure construction for the dashboard charts
+
+Each run is appended to a JSON history file. With --baseline, every timing is
+compared against the same benchmark in the baseline run, and the exit status
+is 1 when one is slower by more than its threshold.
+
+    python benchmark.py --sizes 10000 100000 1000000
+    python benchmark.py --sizes 1000000 --save-baseline bench_baseline.json
+    python benchmark.py --sizes 1000000 --baseline bench_baseline.json --threshold 0.15 --threshold-for batch_scoring=0.3
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from aggregates import compute_dashboard_aggregates
+from chart_data import density_figure, density_grid, downsample_line, histogram, histogram_figure, line_figure
+from conversion_analytics import compute_conversion_analytics
+from lead_store import LeadStore
+from lead_table import LeadTable
+from pipeline_rollup import PipelineRollup
+from scoring import score_batch
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_HISTORY = 'bench_history.json'
+# Allowed slowdown against the baseline before a timing counts as a regression
+DEFAULT_THRESHOLD = 0.10
+
+SINGLE_LEAD = pd.DataFrame([{
+    'company_size': '201-1000',
+    'job_title': 'VP Sales',
+    'email_opens': 6,
+    'website_visits': 9,
+    'budget_range': '$50K-$100K',
+    'urgency': 'Within 3 months',
+}])
+
+
+def best_of(function, repeats):
+    # Minimum wall time of `repeats` calls, the least noisy estimate
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def median_latency(function, calls):
+    timings = np.empty(calls)
+    for call in range(calls):
+        start = time.perf_counter()
+        function()
+        timings[call] = time.perf_counter() - start
+    return float(np.median(timings))
+
+
+def _dashboard_figures(df):
+    aggregates = compute_dashboard_aggregates(df)
+    score_dist = aggregates.score_distribution
+    px.pie(values=score_dist.values, names=score_dist.index, title="Lead Quality Distribution")
+    source_performance = aggregates.source_performance.reset_index()
+    px.scatter(source_performance, x='Avg Score', y='Conversion Rate', size='Lead Count', hover_name='lead_source')
+    industry_conv = aggregates.industry_conversion.reset_index()
+    px.bar(industry_conv, x='industry', y='Conversion Rate', color='Conversion Rate')
+    return aggregates
+
+
+def _pipeline_by_month(df):
+    rollup = PipelineRollup(df)
+    return rollup.frame(*rollup.date_range, 'month')
+
+
+def _lead_chart_series(df):
+    order = np.argsort(df['last_contact'].to_numpy(), kind='stable')
+    return {
+        'score_histogram': histogram(df['lead_score'].to_numpy(), bins=50, value_range=(0, 100)),
+        'score_conversion': density_grid(df['lead_score'].to_numpy(), df['conversion_probability'].to_numpy(),
+                                         x_range=(0, 100), y_range=(0, 100)),
+        'pipeline_by_contact': downsample_line(df['last_contact'].to_numpy()[order],
+                                               np.cumsum(df['estimated_deal_value'].to_numpy(dtype=np.float64)[order])),
+    }
+
+
+def _lead_chart_figures(series):
+    histogram_figure(series['score_histogram'], "Leads by Score", "Lead Score")
+    density_figure(series['score_conversion'], "Lead Density", "Lead Score", "Conversion Probability (%)")
+    line_figure(series['pipeline_by_contact'], "Cumulative Pipeline Value", "Last Contact", "Value ($)")
+
+
+def run_size(n_leads, seed=42):
+    # Timings in seconds for one dataset size, keyed by benchmark name
+    repeats = 1 if n_leads >= 5_000_000 else 3
+    start = time.perf_counter()
+    df = LeadStore.generate(n_leads=n_leads, seed=seed).frame
+    results = {'generate': time.perf_counter() - start}
+
+    results['single_lead_latency'] = median_latency(lambda: score_batch(SINGLE_LEAD), 500)
+    results['batch_scoring'] = best_of(lambda: score_batch(df), repeats)
+    results['dashboard_aggregates'] = best_of(lambda: compute_dashboard_aggregates(df), repeats)
+    results['pipeline_rollup'] = best_of(lambda: _pipeline_by_month(df), repeats)
+    results['lead_chart_series'] = best_of(lambda: _lead_chart_series(df), repeats)
+    results['prioritization'] = best_of(lambda: LeadTable.page(LeadTable(df).query('priority_score'), 1, 15), repeats)
+    # No cached views, so every call runs the filtered query
+    table = LeadTable(df, max_cached_views=0)
+    results['prioritization_query'] = median_latency(
+        lambda: LeadTable.page(table.query('priority_score', tier='Hot'), 1, 15), 200)
+    results['conversion_analytics'] = best_of(lambda: compute_conversion_analytics(df), repeats)
+    results['dashboard_figures'] = best_of(lambda: _dashboard_figures(df), repeats)
+    series = _lead_chart_series(df)
+    results['lead_chart_figures'] = best_of(lambda: _lead_chart_figures(series), 3)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, seed=42, log=print):
+    results = {}
+    for n_leads in sizes:
+        for name, seconds in run_size(n_leads, seed).items():
+            results[f'{name}@{n_leads}'] = seconds
+            log(f"{n_leads:>12,} {name:<24} {seconds * 1000:>12.3f} ms")
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json(path, payload):
+    # Written beside the target and renamed, so a crash never truncates it
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix='.bench-', suffix='.json', dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(payload, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _threshold_for(name, threshold, overrides):
+    # Overrides match a benchmark by name, with or without the @size suffix
+    return overrides.get(name, overrides.get(name.split('@')[0], threshold))
+
+
+def compare(run, baseline, threshold=DEFAULT_THRESHOLD, overrides=None):
+    # Rows (name, baseline s, current s, relative change, regressed) for the
+    # benchmarks present in both runs
+    overrides = overrides or {}
+    rows = []
+    for name, seconds in run['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        change = seconds / before - 1 if before else 0.0
+        rows.append((name, before, seconds, change, change > _threshold_for(name, threshold, overrides)))
+    return rows
+
+
+def _parse_overrides(pairs):
+    overrides = {}
+    for pair in pairs:
+        name, _, value = pair.partition('=')
+        if not value:
+            raise argparse.ArgumentTypeError(f"expected NAME=FRACTION, got '{pair}'")
+        overrides[name] = float(value)
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time scoring, page aggregations and figures, and track regressions")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="lead counts to benchmark")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help="JSON file every run is appended to")
+    parser.add_argument('--baseline', help="run (JSON) to compare against; exit 1 on regression")
+    parser.add_argument('--save-baseline', metavar='PATH', help="also write this run as a baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, e.g. 0.1 for 10%%")
+    parser.add_argument('--threshold-for', action='append', default=[], metavar='NAME=FRACTION',
+                        help="per-benchmark threshold, e.g. batch_scoring=0.3 or batch_scoring@1000000=0.3")
+    args = parser.parse_args()
+    overrides = _parse_overrides(args.threshold_for)
+
+    run = run_suite(args.sizes, args.seed)
+    history = load_history(args.history)
+    history.append(run)
+    write_json(args.history, history)
+    print(f"Appended run to {args.history} ({len(history)} runs)")
+    if args.save_baseline:
+        write_json(args.save_baseline, run)
+        print(f"Saved baseline {args.save_baseline}")
+
+    if not args.baseline:
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(run, baseline, args.threshold, overrides)
+    regressions = [row for row in rows if row[4]]
+    print(f"\nAgainst baseline {args.baseline} ({baseline.get('commit') or 'unknown commit'}, {baseline.get('timestamp')}):")
+    for name, before, seconds, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<36} {before * 1000:>12.3f} ms -> {seconds * 1000:>12.3f} ms {change:>+8.1%}{flag}")
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed beyond their threshold", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
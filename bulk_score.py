@@ -0,0 +1,355 @@
+"""Headless bulk scoring for CRM exports larger than memory.
+
+Reads CSV in chunks or Parquet in record batches, scores each chunk with the
+same engine as the "Lead Scoring Engine" page and appends the results to the
+output file as it goes, so memory use is set by --chunk-size rather than the
+input size.
+
+    python bulk_score.py leads.parquet scores.csv
+    python bulk_score.py leads.csv changes.csv --state tiers.npz --changed-only
+
+With --state, each run remembers every lead's tier (a 64-bit id hash plus one
+byte per lead) and --changed-only writes just the leads whose Hot/Warm/Cold
+tier differs from the previous run.
+
+--workers N spreads chunks over a process pool. Each chunk's rule columns are
+handed to a worker as an Arrow IPC stream in shared memory and the scores come
+back through a second shared block, so nothing is pickled. Results are
+consumed in input order, so output is identical to a serial run.
+
+--dedup first reads the identity columns (company, contact, email) and the
+deal value of the whole export, merges duplicate leads with lead_dedup, and
+scores only the first row of each; the merge statistics, including the
+pipeline value before and after merging, go to stderr.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+from lead_dedup import IDENTITY_COLUMNS, find_duplicates, merge_stats
+from scoring import LOOKUP_TABLES, SCORING_COLUMNS, TIERS, score_batch, tier_codes
+
+DEFAULT_CHUNK_SIZE = 250_000
+NO_TIER = -1
+
+
+def _is_parquet(path):
+    return path.endswith(('.parquet', '.pq'))
+
+
+def _input_columns(path):
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).schema_arrow.names
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def iter_chunks(path, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        # Parse the rule columns straight into categoricals
+        dtype = {table.column: 'category' for table in LOOKUP_TABLES if table.column in columns}
+        yield from pd.read_csv(path, usecols=columns, dtype=dtype, chunksize=chunk_size)
+
+
+class ResultWriter:
+    # Appends scored chunks to a CSV or Parquet file without holding them
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._started = False
+        self._parquet = None
+
+    def write(self, frame):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='a' if self._started else 'w', header=not self._started, index=False)
+        self._started = True
+        self.rows += len(frame)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        elif not self._started:
+            # Empty input still leaves a valid result file behind
+            if _is_parquet(self.path):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                schema = pa.schema([('lead_id', pa.string()), ('lead_score', pa.int32()), ('tier', pa.string())])
+                pq.write_table(schema.empty_table(), self.path)
+            else:
+                pd.DataFrame(columns=['lead_id', 'lead_score', 'tier']).to_csv(self.path, index=False)
+
+
+class TierState:
+    # Last known tier per lead, as sorted uint64 id hashes and int8 tier codes
+    def __init__(self, keys=None, tiers=None):
+        self.keys = np.empty(0, dtype=np.uint64) if keys is None else keys
+        self.tiers = np.empty(0, dtype=np.int8) if tiers is None else tiers
+        self._seen_keys = []
+        self._seen_tiers = []
+
+    @classmethod
+    def load(cls, path):
+        if not path or not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            return cls(data['keys'], data['tiers'])
+
+    @staticmethod
+    def hash_ids(ids):
+        return pd.util.hash_array(np.asarray(ids, dtype=object))
+
+    def previous(self, keys):
+        if not len(self.keys):
+            return np.full(len(keys), NO_TIER, dtype=np.int8)
+        pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        found = self.keys[pos] == keys
+        return np.where(found, self.tiers[pos], NO_TIER).astype(np.int8)
+
+    def record(self, keys, tiers):
+        self._seen_keys.append(keys)
+        self._seen_tiers.append(tiers)
+
+    def save(self, path):
+        # The newest tier per lead wins: reverse so np.unique's first
+        # occurrence is the latest one. Leads absent from this run keep
+        # their previous tier
+        keys = np.concatenate([self.keys, *self._seen_keys])[::-1]
+        tiers = np.concatenate([self.tiers, *self._seen_tiers])[::-1]
+        keys, first = np.unique(keys, return_index=True)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, keys=keys, tiers=tiers[first])
+        os.replace(tmp, path)
+
+
+# Tier labels indexed by code; NO_TIER (-1) picks the trailing empty label
+_TIER_LABELS = np.array(TIERS + [''], dtype=object)
+
+
+def read_identity(path, columns):
+    # Identity columns as text; any other column (the deal value) as parsed
+    if _is_parquet(path):
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns, dtype={column: str for column in columns if column in IDENTITY_COLUMNS})
+
+
+def _iter_scored(path, id_column, columns, chunk_size, keep=None):
+    offset = 0
+    for chunk in iter_chunks(path, columns, chunk_size):
+        if keep is not None:
+            offset += len(chunk)
+            chunk = chunk[keep[offset - len(chunk):offset]]
+        yield chunk[id_column].to_numpy(), score_batch(chunk).to_numpy()
+
+
+# Parallel mode
+
+# pyarrow reads CSV in byte blocks; size them to roughly chunk_size rows
+_CSV_BYTES_PER_ROW = 200
+
+
+def iter_record_batches(path, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        yield from pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns)
+    else:
+        import pyarrow.csv as pacsv
+        reader = pacsv.open_csv(
+            path,
+            read_options=pacsv.ReadOptions(block_size=chunk_size * _CSV_BYTES_PER_ROW),
+            convert_options=pacsv.ConvertOptions(include_columns=columns, auto_dict_encode=True),
+        )
+        yield from reader
+
+
+def _to_shared_memory(batch):
+    import pyarrow as pa
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    shm = SharedMemory(create=True, size=max(sink.size(), 1))
+    with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf)), batch.schema) as writer:
+        writer.write_batch(batch)
+    return shm
+
+
+def _score_into(batch_buf, scores_buf):
+    import pyarrow as pa
+    frame = pa.ipc.open_stream(pa.py_buffer(batch_buf)).read_pandas()
+    scores = np.ndarray(len(frame), dtype=np.int32, buffer=scores_buf)
+    scores[:] = score_batch(frame).to_numpy()
+
+
+def _score_shared(batch_name, scores_name):
+    # Worker side: both blocks are only borrowed; the parent unlinks them
+    batch_shm = SharedMemory(name=batch_name)
+    scores_shm = SharedMemory(name=scores_name)
+    try:
+        _score_into(batch_shm.buf, scores_shm.buf)
+    finally:
+        batch_shm.close()
+        scores_shm.close()
+
+
+def _iter_scored_parallel(path, id_column, columns, chunk_size, workers, keep=None):
+    import pyarrow as pa
+    rule_columns = [column for column in columns if column != id_column]
+    pending = deque()
+
+    def collect():
+        future, ids, batch_shm, scores_shm = pending.popleft()
+        try:
+            future.result()
+            scores = np.ndarray(len(ids), dtype=np.int32, buffer=scores_shm.buf).copy()
+        finally:
+            for shm in (batch_shm, scores_shm):
+                shm.close()
+                shm.unlink()
+        return ids, scores
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            offset = 0
+            for batch in iter_record_batches(path, columns, chunk_size):
+                if keep is not None:
+                    offset += batch.num_rows
+                    batch = batch.filter(pa.array(keep[offset - batch.num_rows:offset]))
+                ids = batch.column(id_column).to_numpy(zero_copy_only=False)
+                batch_shm = _to_shared_memory(batch.select(rule_columns))
+                scores_shm = SharedMemory(create=True, size=max(len(ids), 1) * 4)
+                future = pool.submit(_score_shared, batch_shm.name, scores_shm.name)
+                pending.append((future, ids, batch_shm, scores_shm))
+                # Bound the chunks in flight and yield strictly in input order
+                if len(pending) >= 2 * workers:
+                    yield collect()
+            while pending:
+                yield collect()
+        finally:
+            while pending:
+                _, _, batch_shm, scores_shm = pending.popleft()
+                for shm in (batch_shm, scores_shm):
+                    shm.close()
+                    shm.unlink()
+
+
+def score_file(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, id_column='lead_id',
+               state_path=None, changed_only=False, workers=1, dedup=False):
+    available = _input_columns(input_path)
+    if id_column not in available:
+        raise ValueError(f"Input has no '{id_column}' column")
+    columns = [id_column] + [column for column in SCORING_COLUMNS if column in available]
+
+    keep = None
+    dedup_stats = None
+    if dedup:
+        identity = [column for column in IDENTITY_COLUMNS if column in available]
+        if not identity:
+            raise ValueError(f"Deduplication needs one of the columns {', '.join(IDENTITY_COLUMNS)}")
+        # The deal value comes along so the stats show the pipeline value
+        # the duplicates inflated
+        value = [column for column in ['estimated_deal_value'] if column in available]
+        leads = read_identity(input_path, identity + value)
+        result = find_duplicates(leads)
+        keep = result.keep
+        dedup_stats = merge_stats(leads, result)
+
+    track_tiers = state_path is not None
+    state = TierState.load(state_path) if track_tiers else None
+    writer = ResultWriter(output_path)
+    if workers > 1:
+        scored = _iter_scored_parallel(input_path, id_column, columns, chunk_size, workers, keep)
+    else:
+        scored = _iter_scored(input_path, id_column, columns, chunk_size, keep)
+
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for ids, scores in scored:
+            tiers = tier_codes(scores)
+            result = pd.DataFrame({
+                'lead_id': ids,
+                'lead_score': scores,
+                'tier': _TIER_LABELS[tiers],
+            })
+            if track_tiers:
+                keys = TierState.hash_ids(result['lead_id'])
+                previous = state.previous(keys)
+                state.record(keys, tiers)
+                # New leads have no previous tier
+                result['previous_tier'] = _TIER_LABELS[previous]
+                if changed_only:
+                    result = result[previous != tiers]
+            writer.write(result)
+            rows += len(ids)
+    finally:
+        writer.close()
+
+    if track_tiers:
+        state.save(state_path)
+    elapsed = time.perf_counter() - start
+    return {'rows': rows, 'written': writer.rows, 'seconds': elapsed, 'rows_per_sec': rows / elapsed if elapsed else 0.0,
+            'dedup': dedup_stats}
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet lead export in bounded memory")
+    parser.add_argument('input', help="lead export (.csv or .parquet)")
+    parser.add_argument('output', help="scored output (.csv or .parquet)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="rows scored per chunk")
+    parser.add_argument('--id-column', default='lead_id')
+    parser.add_argument('--state', help="tier state file (.npz) carried between runs")
+    parser.add_argument('--changed-only', action='store_true', help="only write leads whose tier changed since the last run")
+    parser.add_argument('--workers', type=int, default=1, help="scoring processes; 0 uses every core")
+    parser.add_argument('--dedup', action='store_true', help="merge duplicate leads and score each once")
+    args = parser.parse_args()
+
+    if args.changed_only and not args.state:
+        parser.error("--changed-only requires --state")
+
+    workers = args.workers or os.cpu_count() or 1
+    stats = score_file(args.input, args.output, args.chunk_size, args.id_column, args.state, args.changed_only, workers,
+                       args.dedup)
+    if stats['dedup'] is not None:
+        dedup = stats['dedup']
+        print(f"Merged {dedup['duplicates']:,} duplicate leads into {dedup['merged_clusters']:,} "
+              f"(largest cluster {dedup['largest_cluster']}); matched pairs: email {dedup['email_pairs']:,}, "
+              f"name {dedup['name_pairs']:,}, similar name {dedup['similar_name_pairs']:,}", file=sys.stderr)
+        if 'pipeline_value' in dedup:
+            print(f"Pipeline value ${dedup['pipeline_value']:,.0f} -> ${dedup['unique_pipeline_value']:,.0f}",
+                  file=sys.stderr)
+    print(f"Scored {stats['rows']:,} leads in {stats['seconds']:.2f}s ({stats['rows_per_sec']:,.0f} rows/s), "
+          f"wrote {stats['written']:,} rows to {args.output}", file=sys.stderr)
+    peak = _peak_rss_mb()
+    if peak is not None:
+        print(f"Peak memory: {peak:,.0f} MB", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
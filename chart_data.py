@@ -0,0 +1,166 @@
+"""Server-side chart data for lead-level charts.
+
+Plotly serializes every point of a figure into the page, so a chart over a
+million leads would ship a million points to the browser. The helpers here
+reduce a series on the server before any figure is built: histograms and
+density grids send bin counts instead of leads, and line charts are thinned
+with Largest-Triangle-Three-Buckets (LTTB), which keeps the points that shape
+the line. Every trace is capped at MAX_POINTS, and each result records how
+many source points it stands for so the chart can say what was left out.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Most values a single trace may send to the browser
+MAX_POINTS = 2000
+
+
+@dataclass(frozen=True)
+class ChartSeries:
+    data: pd.DataFrame
+    source_points: int
+    sent_points: int
+
+    @property
+    def dropped_points(self):
+        return max(self.source_points - self.sent_points, 0)
+
+    def caption(self):
+        if not self.dropped_points:
+            return f"All {self.source_points:,} points plotted"
+        return (f"{self.source_points:,} points shown as {self.sent_points:,} "
+                f"({self.dropped_points:,} not sent to the browser)")
+
+
+def _finite(*arrays):
+    keep = np.ones(len(arrays[0]), dtype=bool)
+    for values in arrays:
+        keep &= np.isfinite(values)
+    return [values[keep] for values in arrays]
+
+
+def _uniform_codes(values, edges):
+    # Like np.histogram: bins are half-open except the last, which is closed
+    n_bins = len(edges) - 1
+    codes = ((values - edges[0]) * (n_bins / (edges[-1] - edges[0]))).astype(np.intp)
+    return np.minimum(codes, n_bins - 1)
+
+
+def histogram(values, bins=50, value_range=None, max_points=MAX_POINTS):
+    # One row per bin: left and right edge and the count of values in it
+    values = np.asarray(values, dtype=np.float64)
+    n_source = len(values)
+    (values,) = _finite(values)
+    counts, edges = np.histogram(values, bins=min(bins, max_points), range=value_range)
+    data = pd.DataFrame({'left': edges[:-1], 'right': edges[1:], 'count': counts})
+    return ChartSeries(data, n_source, len(data))
+
+
+def density_grid(x, y, x_bins=40, y_bins=40, x_range=None, y_range=None, max_points=MAX_POINTS):
+    # Counts on an x_bins by y_bins grid (rows are y bin centres, columns x bin
+    # centres), shrunk evenly when the grid would exceed max_points cells
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n_source = len(x)
+    if x_bins * y_bins > max_points:
+        shrink = np.sqrt(max_points / (x_bins * y_bins))
+        x_bins, y_bins = max(int(x_bins * shrink), 1), max(int(y_bins * shrink), 1)
+    x, y = _finite(x, y)
+    x_edges = np.histogram_bin_edges(x, x_bins, x_range)
+    y_edges = np.histogram_bin_edges(y, y_bins, y_range)
+
+    # Bin index per point straight from the uniform edges, then one bincount
+    # over the flattened grid
+    inside = (x >= x_edges[0]) & (x <= x_edges[-1]) & (y >= y_edges[0]) & (y <= y_edges[-1])
+    x_codes = _uniform_codes(x[inside], x_edges)
+    y_codes = _uniform_codes(y[inside], y_edges)
+    cells = np.bincount(y_codes * x_bins + x_codes, minlength=x_bins * y_bins)
+
+    data = pd.DataFrame(
+        cells.reshape(y_bins, x_bins),
+        index=pd.Index((y_edges[:-1] + y_edges[1:]) / 2, name='y'),
+        columns=pd.Index((x_edges[:-1] + x_edges[1:]) / 2, name='x'),
+    )
+    return ChartSeries(data, n_source, data.size)
+
+
+def lttb_indices(x, y, n_out):
+    # Positions of the points LTTB keeps: always the first and last, then the
+    # point of each bucket forming the largest triangle with the point kept
+    # before it and the mean of the next bucket. x must be sorted
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        raise ValueError("LTTB needs at least 3 output points")
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    # Mean of every bucket up front; the last "next bucket" is the final point
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    next_x = np.append(sums_x[1:] / sizes[1:], x[-1])
+    next_y = np.append(sums_y[1:] / sizes[1:], y[-1])
+
+    kept = np.empty(n_out, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        area = np.abs((ax - next_x[bucket]) * (y[start:stop] - ay) - (ax - x[start:stop]) * (next_y[bucket] - ay))
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def downsample_line(x, y, max_points=MAX_POINTS):
+    # x may be datetimes; the triangle areas are taken on their int64 values
+    x = pd.Series(x).reset_index(drop=True)
+    y = np.asarray(y, dtype=np.float64)
+    if pd.api.types.is_datetime64_any_dtype(x.dtype):
+        x_numeric = x.to_numpy().astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    else:
+        x_numeric = x.to_numpy(dtype=np.float64)
+    kept = lttb_indices(x_numeric, y, max_points)
+    data = pd.DataFrame({'x': x.to_numpy()[kept], 'y': y[kept]})
+    return ChartSeries(data, len(y), len(data))
+
+
+def histogram_figure(series, title, x_title, color='#667eea'):
+    data = series.data
+    fig = go.Figure(go.Bar(
+        x=(data['left'] + data['right']) / 2,
+        y=data['count'],
+        width=data['right'] - data['left'],
+        marker_color=color,
+        hovertemplate='%{x}: %{y:,}<extra></extra>',
+    ))
+    fig.update_layout(title=title, xaxis_title=x_title, yaxis_title="Leads", bargap=0.05)
+    return fig
+
+
+def density_figure(series, title, x_title, y_title):
+    data = series.data
+    # Empty cells stay transparent instead of the colour scale's minimum
+    counts = data.to_numpy()
+    counts = np.where(counts > 0, counts, np.nan)
+    fig = go.Figure(go.Heatmap(
+        x=data.columns.to_numpy(),
+        y=data.index.to_numpy(),
+        z=counts,
+        colorscale='Viridis',
+        colorbar=dict(title='Leads'),
+        hovertemplate=f'{x_title} %{{x:.0f}}, {y_title} %{{y:.0f}}: %{{z:,}} leads<extra></extra>',
+    ))
+    fig.update_layout(title=title, xaxis_title=x_title, yaxis_title=y_title)
+    return fig
+
+
+def line_figure(series, title, x_title, y_title, color='#667eea'):
+    data = series.data
+    fig = go.Figure(go.Scatter(x=data['x'], y=data['y'], mode='lines', line=dict(color=color, width=3)))
+    fig.update_layout(title=title, xaxis_title=x_title, yaxis_title=y_title)
+    return fig
@@ -0,0 +1,116 @@
+"""Conversion Analytics aggregates, computed from the leads in one pass.
+
+Every lead gets one cell code combining its score range, Hot/Warm/Cold tier
+and lead source. One np.bincount per measure over those codes yields lead
+count, conversions, closed deal value and time to close for every cell at
+once; the funnel and the per-range, per-tier and per-source tables are then
+sums over the (at most a few hundred) cells, never over the leads again.
+Leads are read in fixed-size chunks so temporaries stay small for memory-
+mapped datasets with tens of millions of rows.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from scoring import HOT_THRESHOLD, TIERS, WARM_THRESHOLD, tier_codes
+
+# Right-closed score ranges: 0-30, 31-50, 51-70, 71-85, 86-100
+SCORE_RANGE_EDGES = [30, 50, 70, 85]
+SCORE_RANGES = ['0-30', '31-50', '51-70', '71-85', '86-100']
+TIER_LABELS = {
+    'Hot': f'Hot ({HOT_THRESHOLD}-100)',
+    'Warm': f'Warm ({WARM_THRESHOLD}-{HOT_THRESHOLD - 1})',
+    'Cold': f'Cold (0-{WARM_THRESHOLD - 1})',
+}
+FUNNEL_STAGES = ['Leads Generated', 'Qualified Leads', 'Opportunities', 'Closed Won']
+
+CHUNK_ROWS = 1 << 20
+
+# Per-cell measures, in the order of the last axis of the cell array
+_MEASURES = ['leads', 'converted', 'deal_sum', 'deals', 'close_days_sum', 'closes']
+
+
+@dataclass(frozen=True)
+class ConversionAnalytics:
+    funnel: pd.Series
+    by_score_range: pd.DataFrame
+    by_tier: pd.DataFrame
+    source_win_rates: pd.Series
+
+
+def _float_values(values):
+    return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _source_codes(sources):
+    if isinstance(sources.dtype, pd.CategoricalDtype):
+        return sources.cat.codes.to_numpy(), list(sources.cat.categories)
+    codes, uniques = pd.factorize(sources)
+    return codes, list(uniques)
+
+
+def _cell_sums(df, n_sources, source_codes):
+    # (score range, tier, source, measure) totals; leads with an unknown
+    # source (code -1) still count towards the range and tier tables
+    n_ranges, n_tiers, n_cells_per_source = len(SCORE_RANGES), len(TIERS), n_sources + 1
+    n_cells = n_ranges * n_tiers * n_cells_per_source
+    sums = np.zeros((len(_MEASURES), n_cells))
+    for start in range(0, len(df), CHUNK_ROWS):
+        stop = start + CHUNK_ROWS
+        scores = df['lead_score'].iloc[start:stop].to_numpy()
+        cells = (np.digitize(scores, SCORE_RANGE_EDGES, right=True) * n_tiers + tier_codes(scores)).astype(np.intp)
+        cells = cells * n_cells_per_source + source_codes[start:stop] + 1
+
+        converted = df['converted'].iloc[start:stop].to_numpy(dtype=np.float64)
+        deal_values = _float_values(df['actual_deal_value'].iloc[start:stop])
+        close_days = _float_values(df['time_to_close'].iloc[start:stop])
+        has_deal = np.isfinite(deal_values)
+        has_close = np.isfinite(close_days)
+        for measure, weights in enumerate([
+            None,
+            converted,
+            np.where(has_deal, deal_values, 0.0),
+            has_deal,
+            np.where(has_close, close_days, 0.0),
+            has_close,
+        ]):
+            sums[measure] += np.bincount(cells, weights=weights, minlength=n_cells)
+    return sums.reshape(len(_MEASURES), n_ranges, n_tiers, n_cells_per_source)
+
+
+def _rates(sums, index):
+    # sums: (measure, group) totals -> per-group rates
+    leads, converted, deal_sum, deals, close_days_sum, closes = sums
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return pd.DataFrame({
+            'Leads': leads.astype(np.int64),
+            'Conversion Rate': converted / leads * 100,
+            'Avg Deal Size': deal_sum / deals,
+            'Avg Time to Close': close_days_sum / closes,
+        }, index=index)
+
+
+def compute_conversion_analytics(df):
+    source_codes, sources = _source_codes(df['lead_source'])
+    cells = _cell_sums(df, len(sources), source_codes)
+
+    by_range = _rates(cells.sum(axis=(2, 3)), pd.Index(SCORE_RANGES, name='score_range'))
+    # Hot first, as the page lists them
+    tier_order = TIERS[::-1]
+    by_tier = _rates(cells.sum(axis=(1, 3))[:, ::-1], pd.Index([TIER_LABELS[tier] for tier in tier_order], name='tier'))
+
+    by_source = cells.sum(axis=(1, 2))[:, 1:]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        source_win_rates = pd.Series(by_source[1] / by_source[0] * 100, index=pd.Index(sources, name='lead_source'), name='Win Rate')
+    source_win_rates = source_win_rates[by_source[0] > 0]
+
+    tier_leads = cells[0].sum(axis=(0, 2))
+    funnel = pd.Series([
+        tier_leads.sum(),
+        tier_leads[TIERS.index('Warm'):].sum(),
+        tier_leads[TIERS.index('Hot')],
+        cells[1].sum(),
+    ], index=FUNNEL_STAGES, name='Leads').astype(np.int64)
+
+    return ConversionAnalytics(funnel=funnel, by_score_range=by_range, by_tier=by_tier, source_win_rates=source_win_rates)
@@ -0,0 +1,117 @@
+"""Vectorized display formatting for lead tables.
+
+Formats whole columns with numpy string operations instead of one Python
+f-string per row. Series in give Series out on the same index, so results
+can be assembled into a new display frame without touching the source.
+
+FormattedView holds the display columns of a whole dataset version. Each is
+formatted on first use and kept as a categorical: every distinct value is
+formatted once (deal values, probabilities and tiers repeat heavily), and a
+full-list export only gathers codes. Tables and exports build new frames
+from it; the lead frame itself is never copied or modified.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from lead_table import lead_priority_scores
+from scoring import HOT_THRESHOLD, WARM_THRESHOLD
+
+ACTIONS = ['📬 Add to Campaign', '📧 Email Today', '🔥 Call Now']
+
+
+def _like(values, formatted):
+    if isinstance(values, pd.Series):
+        return pd.Series(formatted, index=values.index, dtype=object)
+    return formatted
+
+
+def thousands(values):
+    # Integers with comma separators: every 3-digit group zero-padded, then
+    # the leading zeros and commas stripped
+    integers = np.asarray(values, dtype=np.int64)
+    magnitude = np.abs(integers)
+    n_groups = max(len(str(int(magnitude.max()))) if len(magnitude) else 1, 1)
+    n_groups = -(-n_groups // 3)
+    text = np.char.zfill((magnitude % 1000).astype(str), 3)
+    for group in range(1, n_groups):
+        digits = np.char.zfill((magnitude // 1000 ** group % 1000).astype(str), 3)
+        text = np.char.add(np.char.add(digits, ','), text)
+    text = np.char.lstrip(text, '0,')
+    text = np.where(text == '', '0', text)
+    return np.where(integers < 0, np.char.add('-', text), text)
+
+
+def currency(values):
+    # 12500 -> '$12,500', as f"${x:,}" did
+    return _like(values, np.char.add('$', thousands(values)))
+
+
+def percent(values):
+    # 52.3 -> '52.3%', as f"{x}%" did
+    return _like(values, np.char.add(np.asarray(values).astype(str), '%'))
+
+
+def action_labels(scores):
+    # Next step per lead from its Hot/Warm/Cold tier
+    values = np.asarray(scores)
+    return _like(scores, np.select([values >= HOT_THRESHOLD, values >= WARM_THRESHOLD], ACTIONS[:0:-1], ACTIONS[0]))
+
+
+# Display fields computed from the lead frame: name -> (source column, formatter)
+FORMATTED_FIELDS = {
+    'deal_value': ('estimated_deal_value', currency),
+    'conversion_percent': ('conversion_probability', percent),
+    'action': ('lead_score', action_labels),
+}
+
+
+def format_distinct(values, formatter):
+    # formatter applied to each distinct value once, as a categorical
+    uniques, inverse = np.unique(np.asarray(values), return_inverse=True)
+    formatted = np.asarray(formatter(uniques))
+    # Distinct values could format alike (e.g. floats rounded for display)
+    categories, remap = np.unique(formatted, return_inverse=True)
+    return pd.Categorical.from_codes(remap[inverse.reshape(-1)], categories)
+
+
+class FormattedView:
+    # Display columns of one lead store; fields are FORMATTED_FIELDS,
+    # 'priority_score', or any stored or derived (identity) column
+    def __init__(self, store):
+        self.store = store
+        self._fields = {}
+        self._lock = threading.Lock()
+
+    def field(self, name):
+        with self._lock:
+            values = self._fields.get(name)
+        if values is None:
+            frame = self.store.frame
+            if name == 'priority_score':
+                values = lead_priority_scores(frame).round(1)
+            else:
+                column, formatter = FORMATTED_FIELDS[name]
+                values = format_distinct(frame[column].to_numpy(), formatter)
+            with self._lock:
+                self._fields[name] = values
+        return values
+
+    def frame(self, positions, columns):
+        # Display frame for the rows at positions; columns maps display name
+        # -> field. Stored columns are fetched for these rows only
+        positions = np.asarray(positions, dtype=np.intp)
+        labels = self.store.frame.index[positions]
+        stored = [field for field in columns.values() if field not in FORMATTED_FIELDS and field != 'priority_score']
+        rows = self.store.rows(labels) if stored else None
+        data = {}
+        for name, field in columns.items():
+            if field in FORMATTED_FIELDS or field == 'priority_score':
+                data[name] = self.field(field)[positions]
+            else:
+                data[name] = rows[field].to_numpy()
+        return pd.DataFrame(data, index=labels)
+
+    def to_csv(self, positions, columns):
+        return self.frame(positions, columns).to_csv(index=False).encode()
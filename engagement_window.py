@@ -0,0 +1,128 @@
+"""Sliding-window engagement counts, e.g. "Email Opens (last 30 days)".
+
+WindowedCounters keeps one slice of counts per day for the last `days` days
+in a ring: a (days, event types, leads) uint16 array, plus running totals
+over the whole window. Recording an event is one array increment (events
+are grouped per batch with np.unique). Moving to a new day subtracts the
+expiring day's slice from the totals and clears it, once per day for the
+whole population, so the full-window counts are always a plain read and a
+shorter window ("last 7 days") sums that many day slices with whole-array
+adds. decayed() weighs the same slices by an exponential half-life instead.
+
+Days are whole days since the epoch (UTC for event timestamps, the calendar
+date for datetime columns). A day slice saturates at 65,535 events of one
+type per lead.
+"""
+import time
+
+import numpy as np
+
+WINDOW_DAYS = 30
+DAY_SECONDS = 86400
+# Event times may run this far ahead of the local clock; later ones are
+# invalid, as a single one would move the window into the future
+MAX_CLOCK_SKEW_SECONDS = 300
+_MAX_COUNT = np.iinfo(np.uint16).max
+_MAX_DAYS = 1 << 40
+
+
+def current_day():
+    return int(time.time() // DAY_SECONDS)
+
+
+def day_numbers(times):
+    # Datetimes (or datetime64) -> int64 days since the epoch
+    return np.asarray(times, dtype='datetime64[D]').astype(np.int64)
+
+
+def valid_timestamps(timestamps, now=None):
+    # Event times in epoch seconds that can be placed: missing (NaN, meaning
+    # now) or finite, not before the epoch and not past the clock's skew
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    latest = (time.time() if now is None else now) + MAX_CLOCK_SKEW_SECONDS
+    return np.isnan(timestamps) | ((timestamps >= 0) & (timestamps <= latest))
+
+
+def event_days(timestamps, today):
+    # Event times in epoch seconds -> days; missing (NaN) means today. Check
+    # them with valid_timestamps first: infinities also map to today
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    days = np.floor(timestamps / DAY_SECONDS)
+    # Clipped so huge values cannot overflow int64
+    return np.where(np.isfinite(days), np.clip(days, -_MAX_DAYS, _MAX_DAYS), today).astype(np.int64)
+
+
+class WindowedCounters:
+    # Per-lead, per-type event counts over the last `days` days up to and
+    # including today. Leads and types are positions 0..n-1
+    def __init__(self, n_leads, n_types, days=WINDOW_DAYS, today=None):
+        self.days = days
+        self.today = today if today is not None else current_day()
+        self.ring = np.zeros((days, n_types, n_leads), dtype=np.uint16)
+        self.totals = np.zeros((n_types, n_leads), dtype=np.int32)
+
+    @property
+    def n_leads(self):
+        return self.ring.shape[2]
+
+    def advance(self, day):
+        # Moves the window to end on day; returns whether it moved
+        if day <= self.today:
+            return False
+        for expired in range(self.today + 1, self.today + 1 + min(day - self.today, self.days)):
+            # The slice day `expired` will use still holds day expired - days
+            row = self.ring[expired % self.days]
+            self.totals -= row
+            row[:] = 0
+        self.today = day
+        return True
+
+    def add(self, positions, types, days=None, counts=None):
+        # One event per (position, type, day), or counts of them. Events after
+        # today move the window first; events before the window are dropped
+        positions = np.asarray(positions, dtype=np.int64)
+        types = np.asarray(types, dtype=np.int64)
+        days = np.full(len(positions), self.today, dtype=np.int64) if days is None else np.asarray(days, dtype=np.int64)
+        if len(days) and days.max() > self.today:
+            self.advance(int(days.max()))
+        keep = days > self.today - self.days
+        n_types, n_leads = self.ring.shape[1:]
+        keys = ((days[keep] % self.days) * n_types + types[keep]) * n_leads + positions[keep]
+        if counts is None:
+            keys, added = np.unique(keys, return_counts=True)
+        else:
+            keys, inverse = np.unique(keys, return_inverse=True)
+            added = np.bincount(inverse.reshape(-1), weights=np.asarray(counts)[keep], minlength=len(keys)).astype(np.int64)
+
+        flat = self.ring.reshape(-1)
+        before = flat[keys].astype(np.int64)
+        after = np.minimum(before + added, _MAX_COUNT)
+        flat[keys] = after
+        # Several days of one (type, lead) can be in the batch
+        np.add.at(self.totals.reshape(-1), keys % (n_types * n_leads), (after - before).astype(np.int32))
+
+    def _rows(self, days):
+        if not 1 <= days <= self.days:
+            raise ValueError(f"Window must be 1 to {self.days} days, got {days}")
+        return [(self.today - back) % self.days for back in range(days)]
+
+    def window(self, days=None, positions=None):
+        # (types, leads) counts over the last `days` days, for every lead or
+        # those at positions
+        positions = slice(None) if positions is None else positions
+        if days is None or days == self.days:
+            return self.totals[:, positions]
+        counts = None
+        for row in self._rows(days):
+            day = self.ring[row][:, positions].astype(np.int32)
+            counts = day if counts is None else counts + day
+        return counts
+
+    def decayed(self, half_life_days, positions=None):
+        # (types, leads) counts with each day weighted by 0.5 ** (age / half_life)
+        positions = slice(None) if positions is None else positions
+        counts = None
+        for back, row in enumerate(self._rows(self.days)):
+            day = self.ring[row][:, positions] * 0.5 ** (back / half_life_days)
+            counts = day if counts is None else counts + day
+        return counts
@@ -0,0 +1,77 @@
+"""LRU cache of built Plotly figures.
+
+Building a figure with plotly.express takes tens of milliseconds even for a
+five-bar chart, and the app used to do it for every chart on every rerun.
+Figures are cached per (page, chart id, data key), where the data key is
+the dataset version for charts over leads or a hash of the literal inputs
+for static charts, so editing a chart's numbers still shows the new figure.
+
+Entries hold the figure's JSON rather than the figure object: a cached
+figure is shared by every session, and a JSON string cannot be mutated by
+the page that received it. Rehydrating it skips plotly's validation, which
+is most of the remaining cost.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+
+MAX_ENTRIES = 256
+
+
+def data_key(*inputs):
+    # Stable key for small literal chart inputs (lists, dicts, strings)
+    return hashlib.blake2b(repr(inputs).encode(), digest_size=8).hexdigest()
+
+
+class FigureCache:
+    # Shared by all sessions of a process, hence the lock
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def spec(self, page, chart_id, key, build):
+        # JSON of the figure build() returns, built only on a miss
+        cache_key = (page, chart_id, key)
+        with self._lock:
+            spec = self._entries.get(cache_key)
+            if spec is not None:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return spec
+            self.misses += 1
+        # Built outside the lock; two sessions missing together both build
+        spec = build().to_json()
+        with self._lock:
+            self._entries[cache_key] = spec
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return spec
+
+    def figure(self, page, chart_id, key, build):
+        return go.Figure(json.loads(self.spec(page, chart_id, key, build)), _validate=False)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        with self._lock:
+            size = sum(len(spec) for spec in self._entries.values())
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hit_rate,
+                'bytes': size,
+            }
@@ -0,0 +1,268 @@
+"""Follow-up scheduler behind the "Smart Follow-up Scheduling" rules.
+
+Every lead gets one pending follow-up, due at the start of the next contact
+window (9-11 AM or 2-4 PM, Tuesday to Thursday) after it was scored. When
+the next window would miss the lead's tier SLA (Hot within an hour, Warm
+within a day, Cold within a week) the follow-up is due right away instead.
+follow_up_times() computes this for whole arrays of leads: each time is
+placed within the week with one searchsorted over the window table.
+
+Pending follow-ups live in columnar arrays, one slot per lead, and are
+filed into buckets by due second; a heap holds the bucket keys. A tick pops
+only the buckets that are due, so it costs O(due + due buckets * log
+buckets) however many follow-ups are pending. Rescheduling a lead moves
+its slot to a new bucket and leaves the old entry to be skipped when it
+comes due.
+
+State is saved to a local .npz file (written beside it and renamed, so a
+crash never leaves a partial file). run() drives the scheduler from an
+asyncio loop, e.g. inside the scoring service, and checkpoints once fired
+follow-ups have been handled: after a crash, follow-ups fired since the
+last checkpoint fire again rather than being lost.
+
+    python followup_scheduler.py --leads 1000000
+"""
+import argparse
+import asyncio
+import heapq
+import inspect
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from mock_data import generate_leads
+from scoring import TIERS, tier_codes
+
+# Contact windows as (start hour, end hour), on Monday=0 weekdays
+CONTACT_WINDOWS = [(9, 11), (14, 16)]
+CONTACT_DAYS = [1, 2, 3]
+# Longest wait for a window per tier (Cold, Warm, Hot), in seconds
+SLA_SECONDS = np.array([7 * 86400, 86400, 3600], dtype=np.int64)
+
+DAY = 86400
+WEEK = 7 * DAY
+# 1970-01-01, day zero of datetime64, was a Thursday
+_EPOCH_WEEKDAY = 3
+_WINDOW_STARTS = np.array([day * DAY + start * 3600 for day in CONTACT_DAYS for start, _ in CONTACT_WINDOWS], dtype=np.int64)
+_WINDOW_ENDS = np.array([day * DAY + end * 3600 for day in CONTACT_DAYS for _, end in CONTACT_WINDOWS], dtype=np.int64)
+
+CHECKPOINT_SECONDS = 30.0
+
+
+def _seconds(times):
+    # Naive local datetimes -> int64 seconds since the epoch
+    return np.asarray(times, dtype='datetime64[s]').astype(np.int64)
+
+
+def _tier_codes(tiers):
+    tiers = np.asarray(tiers)
+    if tiers.dtype.kind in 'iu':
+        if ((tiers < 0) | (tiers >= len(TIERS))).any():
+            raise ValueError(f"Tier codes must be 0 to {len(TIERS) - 1}")
+        return tiers.astype(np.int8)
+    codes = pd.Index(TIERS).get_indexer(tiers)
+    if (codes < 0).any():
+        raise ValueError(f"Unknown tier; expected one of {', '.join(TIERS)}")
+    return codes.astype(np.int8)
+
+
+def next_window_start(times):
+    # Earliest moment at or after each time that falls in a contact window
+    seconds = _seconds(times)
+    of_week = (seconds + _EPOCH_WEEKDAY * DAY) % WEEK
+    window = np.searchsorted(_WINDOW_ENDS, of_week, side='right')
+    # Past the last window of the week: the first one of next week
+    starts = np.where(window < len(_WINDOW_STARTS), _WINDOW_STARTS[window % len(_WINDOW_STARTS)], _WINDOW_STARTS[0] + WEEK)
+    return (seconds + np.maximum(starts - of_week, 0)).astype('datetime64[s]')
+
+
+def follow_up_times(tiers, ready):
+    # Due time per lead: the next contact window, or `ready` itself when that
+    # window would break the tier's SLA. tiers are codes or TIERS names
+    ready = np.broadcast_to(_seconds(ready), np.shape(tiers))
+    window = _seconds(next_window_start(ready))
+    in_sla = window - ready <= SLA_SECONDS[_tier_codes(tiers)]
+    return np.where(in_sla, window, ready).astype('datetime64[s]')
+
+
+class FollowUpScheduler:
+    # One pending follow-up per lead id (stored as str). Not thread-safe:
+    # drive it from one thread or one event loop
+    def __init__(self, path=None, capacity=1024):
+        self.path = path
+        self._ids = np.empty(capacity, dtype=object)
+        self._due = np.zeros(capacity, dtype=np.int64)
+        self._tiers = np.zeros(capacity, dtype=np.int8)
+        self._live = np.zeros(capacity, dtype=bool)
+        self._slot_of = {}
+        self._free = []
+        self._size = 0
+        self._buckets = {}
+        self._heap = []
+
+    @classmethod
+    def open(cls, path):
+        # The scheduler saved at path, or an empty one that will save there
+        scheduler = cls(path)
+        if os.path.exists(path):
+            with np.load(path, allow_pickle=False) as state:
+                scheduler._insert(state['ids'].tolist(), state['due'], state['tiers'])
+        return scheduler
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def _slots(self, lead_ids):
+        slots = np.empty(len(lead_ids), dtype=np.intp)
+        for position, lead_id in enumerate(lead_ids):
+            slot = self._slot_of.get(lead_id)
+            if slot is None:
+                slot = self._free.pop() if self._free else self._grow()
+                self._slot_of[lead_id] = slot
+                self._ids[slot] = lead_id
+            slots[position] = slot
+        return slots
+
+    def _grow(self):
+        if self._size == len(self._due):
+            capacity = max(1, 2 * len(self._due))
+            for name in ('_ids', '_due', '_tiers', '_live'):
+                old = getattr(self, name)
+                new = np.zeros(capacity, dtype=old.dtype) if old.dtype != object else np.empty(capacity, dtype=object)
+                new[:len(old)] = old
+                setattr(self, name, new)
+        self._size += 1
+        return self._size - 1
+
+    def _insert(self, lead_ids, due, tiers):
+        slots = self._slots([str(lead_id) for lead_id in lead_ids])
+        self._due[slots] = due
+        self._tiers[slots] = tiers
+        self._live[slots] = True
+        keys, inverse = np.unique(due, return_inverse=True)
+        order = np.argsort(inverse.reshape(-1), kind='stable')
+        bounds = np.searchsorted(inverse.reshape(-1)[order], np.arange(len(keys) + 1))
+        for position, key in enumerate(keys.tolist()):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = []
+                heapq.heappush(self._heap, key)
+            bucket.append(slots[order[bounds[position]:bounds[position + 1]]])
+
+    def schedule(self, lead_ids, tiers, ready=None):
+        # Schedules (or reschedules) each lead's follow-up; returns the due
+        # times. ready defaults to now
+        tiers = _tier_codes(tiers)
+        ready = np.datetime64(pd.Timestamp.now().floor('s')) if ready is None else ready
+        due = follow_up_times(tiers, ready)
+        self._insert(lead_ids, due.astype(np.int64), tiers)
+        return due
+
+    def cancel(self, lead_ids):
+        # Cancelled entries stay in their bucket and are skipped when due
+        for lead_id in lead_ids:
+            slot = self._slot_of.pop(str(lead_id), None)
+            if slot is not None:
+                self._live[slot] = False
+                self._ids[slot] = None
+                self._free.append(slot)
+
+    def next_due(self):
+        # Earliest bucket key; may belong only to cancelled follow-ups
+        return np.datetime64(self._heap[0], 's') if self._heap else None
+
+    def fire(self, now=None):
+        # Removes and returns the follow-ups due at or before now, as a frame
+        # of lead_id, tier and due, earliest first
+        now = _seconds(now if now is not None else pd.Timestamp.now()).item()
+        fired = []
+        while self._heap and self._heap[0] <= now:
+            key = heapq.heappop(self._heap)
+            slots = np.unique(np.concatenate(self._buckets.pop(key)))
+            # Skip entries cancelled or rescheduled since they were filed
+            slots = slots[self._live[slots] & (self._due[slots] == key)]
+            fired.append(slots)
+        slots = np.concatenate(fired) if fired else np.empty(0, dtype=np.intp)
+        frame = pd.DataFrame({
+            'lead_id': self._ids[slots],
+            'tier': pd.Categorical.from_codes(self._tiers[slots], TIERS),
+            'due': self._due[slots].astype('datetime64[s]'),
+        })
+        self.cancel(frame['lead_id'].tolist())
+        return frame
+
+    def snapshot(self):
+        # Live follow-ups as plain arrays, cheap enough to take on the loop
+        slots = np.flatnonzero(self._live[:self._size])
+        return {'ids': self._ids[slots].astype(str), 'due': self._due[slots], 'tiers': self._tiers[slots]}
+
+    def save(self, path=None, snapshot=None):
+        path = path or self.path
+        snapshot = snapshot if snapshot is not None else self.snapshot()
+        tmp = f'{path}.tmp.npz'
+        np.savez(tmp, **snapshot)
+        os.replace(tmp, path)
+
+    async def run(self, on_due, interval=1.0, checkpoint_seconds=CHECKPOINT_SECONDS):
+        # Fires due follow-ups every interval and hands them to on_due (a
+        # function or coroutine function taking the fired frame). With a
+        # path, state is written off the loop every checkpoint_seconds, and
+        # once more when cancelled
+        loop = asyncio.get_running_loop()
+        last_checkpoint = loop.time()
+        try:
+            while True:
+                fired = self.fire()
+                if len(fired):
+                    result = on_due(fired)
+                    if inspect.isawaitable(result):
+                        await result
+                if self.path and loop.time() - last_checkpoint >= checkpoint_seconds:
+                    await loop.run_in_executor(None, self.save, self.path, self.snapshot())
+                    last_checkpoint = loop.time()
+                await asyncio.sleep(interval)
+        finally:
+            if self.path:
+                self.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schedule follow-ups for generated leads and time the scheduler")
+    parser.add_argument('--leads', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--state', help="save the scheduler state to this .npz file")
+    args = parser.parse_args()
+
+    leads = generate_leads(args.leads, seed=args.seed, include_identity=False)
+    tiers = tier_codes(leads['lead_score'].to_numpy())
+    # Leads arrive over the past week
+    now = pd.Timestamp.now().floor('s')
+    rng = np.random.default_rng(args.seed)
+    ready = np.datetime64(now) - rng.integers(0, WEEK, args.leads).astype('timedelta64[s]')
+
+    start = time.perf_counter()
+    due = follow_up_times(tiers, ready)
+    print(f"Computed {args.leads:,} follow-up times in {time.perf_counter() - start:.3f}s")
+
+    scheduler = FollowUpScheduler(args.state)
+    start = time.perf_counter()
+    scheduler.schedule(np.arange(args.leads), tiers, ready)
+    print(f"Scheduled {len(scheduler):,} follow-ups in {time.perf_counter() - start:.2f}s")
+
+    for horizon, label in [(0, 'now'), (3600, 'in the next hour'), (DAY, 'in the next day')]:
+        start = time.perf_counter()
+        fired = scheduler.fire(np.datetime64(now) + np.timedelta64(horizon, 's'))
+        print(f"Fired {len(fired):,} follow-ups due {label} in {(time.perf_counter() - start) * 1000:.1f} ms; "
+              f"{len(scheduler):,} pending")
+    print(f"Next follow-up due {scheduler.next_due()}; latest {due.max()}")
+
+    if args.state:
+        start = time.perf_counter()
+        scheduler.save()
+        print(f"Saved {args.state} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
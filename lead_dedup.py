@@ -0,0 +1,294 @@
+"""Duplicate lead detection for bulk CRM imports.
+
+The same contact imported several times under different lead_ids inflates
+lead counts and pipeline value. Rows are normalized (lower case, no
+punctuation, company legal suffixes and email +tags dropped, name tokens
+sorted) and blocked on email domain plus company name; free-mail domains
+block on the company alone. Two rows are the same lead when they share:
+
+- the normalized email address, or
+- a block and the normalized contact name, or
+- a block and a MinHash LSH band of the contact name's character 3-grams,
+  with estimated Jaccard similarity of at least `similarity` (typos,
+  initials, missing middle names)
+
+Every rule is a hash key, so candidate pairs come from sorting keys rather
+than comparing rows pairwise; matched rows are merged with a vectorized
+union-find. The first row of each cluster is kept. The whole pass is
+O(n log n) in rows.
+
+    python lead_dedup.py leads.csv --output unique.csv --mapping merges.csv
+    python lead_dedup.py --generate 1000000 --duplicate-share 0.1
+"""
+import argparse
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from mock_data import generate_leads
+
+IDENTITY_COLUMNS = ['company_name', 'contact_name', 'email']
+FREE_EMAIL_DOMAINS = {
+    'gmail.com', 'googlemail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'live.com', 'msn.com', 'aol.com',
+    'icloud.com', 'me.com', 'proton.me', 'protonmail.com', 'gmx.com', 'mail.com',
+}
+COMPANY_SUFFIXES = ['inc', 'incorporated', 'llc', 'ltd', 'limited', 'corp', 'corporation', 'co', 'company', 'plc',
+                    'gmbh', 'ag', 'sa', 'bv', 'pty']
+_SUFFIX_PATTERN = r'\b(?:' + '|'.join(COMPANY_SUFFIXES) + r')\b'
+
+# MinHash: NUM_HASHES values per name, in BANDS bands; names sharing a band
+# are candidates, kept when their estimated similarity reaches the threshold
+NUM_HASHES = 16
+BANDS = 4
+NAME_SIMILARITY = 0.7
+SHINGLE = 3
+CHUNK_ROWS = 1 << 16
+_PRIME = (1 << 31) - 1
+_EMPTY = np.iinfo(np.uint32).max
+
+MATCH_RULES = ['email', 'name', 'similar_name']
+
+
+def _text(values):
+    return pd.Series(values, dtype=object).astype('string').str.strip().str.lower()
+
+
+def normalize_email(values):
+    # 'John.Doe+crm@Acme.com ' -> 'john.doe@acme.com'; also returns the domain
+    # (str.partition breaks on a column with no strings at all)
+    parts = _text(values).str.extract(r'^([^@]*)@(.*)$')
+    local = parts[0].str.replace(r'\+.*$', '', regex=True)
+    present = ((local.str.len() > 0) & (parts[1].str.len() > 0)).fillna(False)
+    return (local + '@' + parts[1]).where(present), parts[1].where(present)
+
+
+def normalize_company(values):
+    # 'ACME, Inc.' -> 'acme'
+    company = _text(values).str.replace(r'[^\w\s]', ' ', regex=True).str.replace(_SUFFIX_PATTERN, ' ', regex=True)
+    company = company.str.split().str.join(' ')
+    return company.where((company.str.len() > 0).fillna(False))
+
+
+def normalize_name(values):
+    # 'Doe, John' and 'john doe' -> 'doe john'
+    tokens = _text(values).str.replace(r'[^\w\s]', ' ', regex=True).str.split()
+    name = tokens.map(lambda parts: ' '.join(sorted(parts)) if isinstance(parts, list) else None).astype('string')
+    return name.where((name.str.len() > 0).fillna(False))
+
+
+def _hash(*columns):
+    # uint64 hash per row of the given columns together
+    return pd.util.hash_pandas_object(pd.DataFrame(dict(enumerate(columns))), index=False).to_numpy()
+
+
+def minhash_signatures(names, num_hashes=NUM_HASHES, seed=0):
+    # (rows, num_hashes) uint32 MinHash of each name's character 3-grams,
+    # from the names' code points as one matrix per chunk; names shorter
+    # than a shingle hash as a whole, missing names are all _EMPTY
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, num_hashes, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, num_hashes, dtype=np.uint64)
+    present = names.notna().to_numpy()
+    text = np.asarray(names.fillna('').to_numpy(dtype=object), dtype=str)
+    width = max(text.dtype.itemsize // 4, SHINGLE)
+    text = text.astype(f'U{width}')
+    lengths = np.char.str_len(text)
+    signatures = np.full((len(text), num_hashes), _EMPTY, dtype=np.uint32)
+    for start in range(0, len(text), CHUNK_ROWS):
+        chunk = slice(start, start + CHUNK_ROWS)
+        chars = text[chunk].view(np.uint32).reshape(-1, width).astype(np.uint64)
+        # Code points fit in 21 bits, so a 3-gram packs into 63
+        grams = (chars[:, :-2] << np.uint64(42)) | (chars[:, 1:-1] << np.uint64(21)) | chars[:, 2:]
+        grams %= np.uint64(_PRIME)
+        valid = np.arange(width - SHINGLE + 1) < np.maximum(lengths[chunk] - SHINGLE + 1, 1)[:, None]
+        valid &= present[chunk, None]
+        for k in range(num_hashes):
+            hashed = (a[k] * grams + b[k]) % np.uint64(_PRIME)
+            signatures[chunk, k] = np.where(valid, hashed, _EMPTY).min(axis=1)
+    return signatures
+
+
+def _pairs(keys, valid):
+    # (row, first row with the same key) for every valid row whose key was
+    # seen before; sorting keys stands in for comparing rows
+    rows = np.flatnonzero(valid)
+    if not len(rows):
+        return rows, rows
+    order = rows[np.argsort(keys[rows], kind='stable')]
+    sorted_keys = keys[order]
+    starts = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+    first = order[np.flatnonzero(starts)[np.cumsum(starts) - 1]]
+    repeat = ~starts
+    return order[repeat], first[repeat]
+
+
+def _components(n_rows, left, right):
+    # Vectorized union-find: hook the larger root onto the smaller, then
+    # jump pointers until every row points at its root, the lowest row of
+    # its cluster
+    parent = np.arange(n_rows)
+    while True:
+        low = np.minimum(parent[left], parent[right])
+        high = np.maximum(parent[left], parent[right])
+        merge = low != high
+        if not merge.any():
+            return parent
+        np.minimum.at(parent, high[merge], low[merge])
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+
+@dataclass(frozen=True)
+class DedupResult:
+    canonical: np.ndarray    # position of the row each row merges into
+    matches: pd.Series       # linked row pairs per rule in MATCH_RULES
+
+    @property
+    def keep(self):
+        return self.canonical == np.arange(len(self.canonical))
+
+    @property
+    def n_unique(self):
+        return int(self.keep.sum())
+
+    def cluster_sizes(self):
+        return np.bincount(self.canonical, minlength=len(self.canonical))[self.keep]
+
+
+def find_duplicates(df, similarity=NAME_SIMILARITY):
+    # df needs at least one of IDENTITY_COLUMNS; absent ones match nothing
+    n_rows = len(df)
+    missing = pd.Series(pd.NA, index=df.index, dtype='string')
+    email, domain = normalize_email(df['email']) if 'email' in df else (missing, missing)
+    company = normalize_company(df['company_name']) if 'company_name' in df else missing
+    name = normalize_name(df['contact_name']) if 'contact_name' in df else missing
+
+    # Free-mail domains say nothing about the employer
+    block_domain = domain.where(~domain.isin(FREE_EMAIL_DOMAINS), '').fillna('')
+    block = _hash(block_domain, company.fillna(''))
+    # Rows with neither a company domain nor a company name have no block
+    named = ((block_domain.str.len() > 0).to_numpy(dtype=bool) | company.notna().to_numpy()) & name.notna().to_numpy()
+
+    links = {}
+    links['email'] = _pairs(_hash(email.fillna('')), email.notna().to_numpy())
+    links['name'] = _pairs(_hash(block, name.fillna('')), named)
+
+    signatures = minhash_signatures(name)
+    rows_per_band = NUM_HASHES // BANDS
+    similar_left, similar_right = [], []
+    for band in range(BANDS):
+        values = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        left, right = _pairs(_hash(block, np.full(n_rows, band), *values.T), named)
+        close = (signatures[left] == signatures[right]).mean(axis=1) >= similarity
+        similar_left.append(left[close])
+        similar_right.append(right[close])
+    # A pair can share several bands; count it once
+    similar = np.unique(np.stack([np.concatenate(similar_left), np.concatenate(similar_right)]), axis=1)
+    links['similar_name'] = (similar[0], similar[1])
+
+    left = np.concatenate([pair[0] for pair in links.values()])
+    right = np.concatenate([pair[1] for pair in links.values()])
+    return DedupResult(
+        canonical=_components(n_rows, left, right),
+        matches=pd.Series({rule: len(links[rule][0]) for rule in MATCH_RULES}, name='pairs'),
+    )
+
+
+def merge_stats(df, result):
+    sizes = result.cluster_sizes()
+    stats = {
+        'rows': len(df),
+        'unique': result.n_unique,
+        'duplicates': len(df) - result.n_unique,
+        'merged_clusters': int((sizes > 1).sum()),
+        'largest_cluster': int(sizes.max()) if len(sizes) else 0,
+        **{f'{rule}_pairs': int(count) for rule, count in result.matches.items()},
+    }
+    if 'estimated_deal_value' in df:
+        values = df['estimated_deal_value'].to_numpy(dtype=np.float64, na_value=0)
+        stats['pipeline_value'] = float(values.sum())
+        stats['unique_pipeline_value'] = float(values[result.keep].sum())
+    return stats
+
+
+def dedupe(df, similarity=NAME_SIMILARITY):
+    # The first row of every cluster, and the DedupResult
+    result = find_duplicates(df, similarity)
+    return df[result.keep], result
+
+
+def inject_duplicates(df, share, seed=42):
+    # Appends re-imports of `share` of the rows: case and spacing changes,
+    # email +tags, legal suffixes, swapped or shortened names
+    rng = np.random.default_rng(seed)
+    copies = df.iloc[rng.choice(len(df), int(len(df) * share))].copy()
+    n_copies = len(copies)
+    variant = rng.integers(0, 4, n_copies)
+    company = copies['company_name'].astype(str)
+    contact = copies['contact_name'].astype(str)
+    email = copies['email'].astype(str)
+    copies['company_name'] = np.where(variant == 0, company.str.upper() + ', Inc.', company + ' LLC')
+    parts = contact.str.split(' ', n=1)
+    copies['contact_name'] = np.select(
+        [variant == 1, variant == 2],
+        [parts.str[1] + ', ' + parts.str[0], contact.str[:-1]],
+        contact.str.title(),
+    )
+    copies['email'] = np.where(variant == 3, email.str.replace('@', '+import@', n=1), email.str.upper())
+    if 'lead_id' in copies:
+        copies['lead_id'] = [f'IMPORT-{k}' for k in range(n_copies)]
+    return pd.concat([df, copies], ignore_index=True)
+
+
+def _read(path, columns=None):
+    if path.endswith(('.parquet', '.pq')):
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and merge duplicate leads in an import")
+    parser.add_argument('input', nargs='?', help="lead export (.csv or .parquet)")
+    parser.add_argument('--generate', type=int, metavar='N', help="use N generated leads instead of an input file")
+    parser.add_argument('--duplicate-share', type=float, default=0.1, help="re-imported share added to generated leads")
+    parser.add_argument('--similarity', type=float, default=NAME_SIMILARITY, help="minimum contact name similarity")
+    parser.add_argument('--output', help="write the unique leads to this .csv or .parquet file")
+    parser.add_argument('--mapping', help="write lead -> kept lead for every merged row to this CSV")
+    args = parser.parse_args()
+    if (args.input is None) == (args.generate is None):
+        parser.error("pass an input file or --generate N")
+
+    if args.generate:
+        df = inject_duplicates(generate_leads(args.generate), args.duplicate_share)
+    else:
+        df = _read(args.input)
+    start = time.perf_counter()
+    unique, result = dedupe(df, args.similarity)
+    elapsed = time.perf_counter() - start
+
+    stats = merge_stats(df, result)
+    print(f"Deduplicated {stats['rows']:,} leads in {elapsed:.2f}s ({stats['rows'] / elapsed:,.0f} rows/s): "
+          f"{stats['unique']:,} unique, {stats['duplicates']:,} duplicates in {stats['merged_clusters']:,} clusters "
+          f"(largest {stats['largest_cluster']})")
+    print("Matched pairs: " + ', '.join(f"{rule} {stats[f'{rule}_pairs']:,}" for rule in MATCH_RULES))
+    if 'pipeline_value' in stats:
+        print(f"Pipeline value ${stats['pipeline_value']:,.0f} -> ${stats['unique_pipeline_value']:,.0f}")
+
+    if args.output:
+        if args.output.endswith(('.parquet', '.pq')):
+            unique.to_parquet(args.output, index=False)
+        else:
+            unique.to_csv(args.output, index=False)
+    if args.mapping:
+        merged = np.flatnonzero(~result.keep)
+        ids = df['lead_id'].to_numpy() if 'lead_id' in df else df.index.to_numpy()
+        pd.DataFrame({'lead_id': ids[merged], 'kept_lead_id': ids[result.canonical[merged]]}).to_csv(args.mapping, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Feature encoding shared by the learned scoring models.
+
+Every feature is turned into a small integer bin: categorical columns go
+through lookup tables (category codes, never one Python string per lead),
+and engagement counts are capped. Tree models split on the bins directly;
+linear models expand them with design_matrix().
+"""
+import numpy as np
+import pandas as pd
+
+from mock_data import COMPANY_SIZES, INDUSTRIES, JOB_TITLES, LEAD_SOURCES
+from scoring import LookupTable
+
+# Categorical features are coded through lookup tables; the code after the
+# last category stands for unknown or missing values
+CATEGORICAL_FEATURES = [
+    LookupTable('company_size', dict.fromkeys(COMPANY_SIZES, 0)),
+    LookupTable('industry', dict.fromkeys(INDUSTRIES, 0)),
+    LookupTable('job_title', dict.fromkeys(JOB_TITLES, 0)),
+    LookupTable('lead_source', dict.fromkeys(LEAD_SOURCES, 0)),
+]
+# Engagement counts: (column, cap); counts above the cap share its bin
+COUNT_FEATURES = [
+    ('email_opens', 20),
+    ('website_visits', 30),
+    ('content_downloads', 10),
+]
+FEATURE_COLUMNS = [table.column for table in CATEGORICAL_FEATURES] + [column for column, _ in COUNT_FEATURES]
+FEATURE_BINS = [len(table.categories) + 1 for table in CATEGORICAL_FEATURES] + [cap + 1 for _, cap in COUNT_FEATURES]
+
+# Column offsets of each categorical block in the design matrix; the scaled
+# counts follow, then the intercept
+_ONE_HOT_OFFSETS = np.concatenate([[0], np.cumsum(FEATURE_BINS[:len(CATEGORICAL_FEATURES)])]).astype(np.intp)
+DESIGN_WIDTH = int(_ONE_HOT_OFFSETS[-1]) + len(COUNT_FEATURES) + 1
+
+
+def _count_values(values):
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype=np.float64, na_value=0)
+    return np.array([0 if value is None else value for value in values], dtype=np.float64)
+
+
+def feature_bins(columns, n_rows):
+    # int16 matrix with one column per feature: category code or capped count
+    bins = np.empty((n_rows, len(FEATURE_BINS)), dtype=np.int16)
+    for position, table in enumerate(CATEGORICAL_FEATURES):
+        unknown = len(table.categories)
+        if table.column in columns:
+            codes = table.codes(columns[table.column])
+            bins[:, position] = np.where(codes < 0, unknown, codes)
+        else:
+            bins[:, position] = unknown
+    for position, (column, cap) in enumerate(COUNT_FEATURES, start=len(CATEGORICAL_FEATURES)):
+        counts = _count_values(columns[column]) if column in columns else np.zeros(n_rows)
+        bins[:, position] = np.clip(counts, 0, cap)
+    return bins
+
+
+def design_matrix(bins, dtype=np.float64):
+    # One-hot categories, counts scaled by their cap, and an intercept column
+    n_categorical = len(CATEGORICAL_FEATURES)
+    X = np.zeros((len(bins), DESIGN_WIDTH), dtype=dtype)
+    rows = np.arange(len(bins))
+    for position in range(n_categorical):
+        X[rows, _ONE_HOT_OFFSETS[position] + bins[:, position]] = 1
+    caps = np.array([cap for _, cap in COUNT_FEATURES], dtype=dtype)
+    X[:, _ONE_HOT_OFFSETS[-1]:-1] = bins[:, n_categorical:] / caps
+    X[:, -1] = 1
+    return X
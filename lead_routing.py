@@ -0,0 +1,316 @@
+"""Capacity-aware lead routing behind the "Intelligent Lead Routing Rules".
+
+Hot leads go to senior reps, Warm leads to reps by territory and industry
+expertise, Cold leads to the nurture campaign. Each tier walks a chain of
+rep pools and takes the least loaded rep of the first pool that still has
+capacity:
+
+- Hot: senior reps in the lead's territory, any senior rep, any rep
+- Warm: territory reps with the lead's industry, any territory rep, any rep
+  with the industry, any rep
+
+Every pool is a heap of its reps keyed by utilization (leads assigned today
+/ daily capacity). A rep sits in a handful of pools; assigning a lead pushes
+the rep's new load into each of them, and outdated entries are dropped when
+they reach the top. Routing a batch of N leads across R reps is therefore
+O(N log R), never a scan over the reps per lead. Within a batch, Hot leads
+are routed first, highest score first, so they get capacity before Warm ones.
+
+simulate() replays a day of leads in arrival batches and reports routing
+throughput and how evenly the load was spread across reps.
+
+    python lead_routing.py --leads 200000 --reps 400
+"""
+import argparse
+import heapq
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from mock_data import INDUSTRIES, TERRITORIES, TERRITORY_WEIGHTS, generate_leads
+from scoring import LookupTable, tier_codes
+
+# Daily leads per rep for generated rosters
+DAILY_CAPACITY = 50
+SENIOR_SHARE = 0.3
+EXPERTISE_PER_REP = 2
+# A day of leads arrives in this many batches (one per minute of 8 hours)
+DAY_BATCHES = 480
+
+# How each lead was routed; the pool chains below refer to these codes
+RULES = ['senior', 'senior_overflow', 'expertise', 'territory', 'expertise_overflow', 'overflow', 'nurture', 'unassigned']
+_SENIOR, _SENIOR_OVERFLOW, _EXPERTISE, _TERRITORY, _EXPERTISE_OVERFLOW, _OVERFLOW, _NURTURE, _UNASSIGNED = range(len(RULES))
+
+# Lead codes; -1 marks a value outside the list (or a missing column)
+_TERRITORY_TABLE = LookupTable('territory', dict.fromkeys(TERRITORIES, 0))
+_INDUSTRY_TABLE = LookupTable('industry', dict.fromkeys(INDUSTRIES, 0))
+
+
+class Roster:
+    # Reps as parallel arrays: territory code, senior flag, daily capacity
+    # and a (reps, industries) expertise matrix
+    def __init__(self, names, territories, senior, capacity, expertise):
+        self.names = list(names)
+        self.territories = np.asarray(territories, dtype=np.intp)
+        self.senior = np.asarray(senior, dtype=bool)
+        self.capacity = np.asarray(capacity, dtype=np.int64)
+        self.expertise = np.asarray(expertise, dtype=bool).reshape(len(self.names), len(INDUSTRIES))
+        if (self.capacity <= 0).any():
+            raise ValueError("Every rep needs a daily capacity of at least one lead")
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_frame(cls, df):
+        # Columns: rep, territory, senior (bool), capacity, expertise
+        # (industries separated by ';')
+        territories = _TERRITORY_TABLE.codes(df['territory'])
+        if (territories < 0).any():
+            raise ValueError(f"Unknown territory; expected one of {', '.join(TERRITORIES)}")
+        expertise = np.zeros((len(df), len(INDUSTRIES)), dtype=bool)
+        for rep, industries in enumerate(df['expertise'].fillna('')):
+            for industry in filter(None, (name.strip() for name in industries.split(';'))):
+                if industry not in INDUSTRIES:
+                    raise ValueError(f"Unknown industry '{industry}' for rep '{df['rep'].iloc[rep]}'")
+                expertise[rep, INDUSTRIES.index(industry)] = True
+        return cls(df['rep'], territories, df['senior'].astype(bool), df['capacity'], expertise)
+
+    def frame(self):
+        expertise = [';'.join(np.array(INDUSTRIES)[row]) for row in self.expertise]
+        return pd.DataFrame({
+            'rep': self.names,
+            'territory': pd.Categorical.from_codes(self.territories, TERRITORIES),
+            'senior': self.senior,
+            'capacity': self.capacity,
+            'expertise': expertise,
+        })
+
+
+def generate_roster(n_reps=100, seed=42, capacity=DAILY_CAPACITY, senior_share=SENIOR_SHARE,
+                    expertise_per_rep=EXPERTISE_PER_REP):
+    # Reps spread over territories like the leads, each expert in a few
+    # distinct industries
+    rng = np.random.default_rng(seed)
+    territories = rng.choice(len(TERRITORIES), size=n_reps, p=TERRITORY_WEIGHTS)
+    senior = rng.random(n_reps) < senior_share
+    picks = np.argsort(rng.random((n_reps, len(INDUSTRIES))), axis=1)[:, :expertise_per_rep]
+    expertise = np.zeros((n_reps, len(INDUSTRIES)), dtype=bool)
+    np.put_along_axis(expertise, picks, True, axis=1)
+    names = [f'Rep {rep + 1:0{len(str(n_reps))}d}' for rep in range(n_reps)]
+    return Roster(names, territories, senior, np.full(n_reps, capacity), expertise)
+
+
+class LeadRouter:
+    # Routes leads to the reps of a roster, tracking each rep's load for the
+    # day. Not thread-safe; give each routing worker its own router or lock
+    def __init__(self, roster):
+        self.roster = roster
+        self._capacity = roster.capacity.tolist()
+        self.load = [0] * len(roster)
+        self._pools = [self._pools_of(rep) for rep in range(len(roster))]
+        self._chains = {}
+        self._rebuild()
+
+    def _pools_of(self, rep):
+        # Pool keys: ('senior', territory or -1), ('expert', territory or
+        # -1, industry), ('territory', territory), ('all',). Warm pools hold
+        # standard reps only, keeping seniors free for Hot leads
+        roster = self.roster
+        territory = int(roster.territories[rep])
+        if roster.senior[rep]:
+            return [('senior', territory), ('senior', -1), ('all',)]
+        pools = [('territory', territory), ('all',)]
+        for industry in np.flatnonzero(roster.expertise[rep]).tolist():
+            pools += [('expert', territory, industry), ('expert', -1, industry)]
+        return pools
+
+    def _entry(self, rep):
+        load = self.load[rep]
+        return (load / self._capacity[rep], rep, load)
+
+    def _rebuild(self):
+        self._heaps = {}
+        for rep, pools in enumerate(self._pools):
+            for pool in pools:
+                heap = self._heaps.setdefault(pool, [])
+                if self.load[rep] < self._capacity[rep]:
+                    heap.append(self._entry(rep))
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+        self._chains.clear()
+
+    def _chain(self, tier, territory, industry):
+        # (rule, heap) pairs a lead of this kind tries in order; pools that
+        # no rep belongs to are left out
+        key = (tier, territory, industry)
+        chain = self._chains.get(key)
+        if chain is None:
+            # A lead without a territory starts at the overflow pools, and is
+            # recorded under their rules
+            if tier == 2:
+                pools = [(_SENIOR, ('senior', territory))] if territory >= 0 else []
+                pools.append((_SENIOR_OVERFLOW, ('senior', -1)))
+            else:
+                pools = [
+                    (_EXPERTISE, ('expert', territory, industry)),
+                    (_TERRITORY, ('territory', territory)),
+                ] if territory >= 0 else []
+                pools.append((_EXPERTISE_OVERFLOW, ('expert', -1, industry)))
+            pools.append((_OVERFLOW, ('all',)))
+            chain = self._chains[key] = [(rule, self._heaps[pool]) for rule, pool in pools if pool in self._heaps]
+        return chain
+
+    def _take(self, heap):
+        # Least loaded rep with capacity left, or None. Reps at capacity are
+        # never pushed, so any entry matching the rep's current load is live
+        while heap:
+            _, rep, load = heap[0]
+            if load == self.load[rep]:
+                return rep
+            heapq.heappop(heap)
+        return None
+
+    def _assign(self, rep, count=1):
+        self.load[rep] += count
+        if self.load[rep] < self._capacity[rep]:
+            entry = self._entry(rep)
+            for pool in self._pools[rep]:
+                heapq.heappush(self._heaps[pool], entry)
+
+    def route(self, leads):
+        # DataFrame on the leads' index: 'rep' (NaN when not assigned to a
+        # rep) and 'rule', one of RULES. Needs lead_score; leads without a
+        # territory or industry skip the pools that match on it
+        n_leads = len(leads)
+        tiers = tier_codes(leads['lead_score'].to_numpy())
+        territories = _TERRITORY_TABLE.codes(leads['territory']) if 'territory' in leads else np.full(n_leads, -1)
+        industries = _INDUSTRY_TABLE.codes(leads['industry']) if 'industry' in leads else np.full(n_leads, -1)
+        reps = np.full(n_leads, -1, dtype=np.intp)
+        rules = np.full(n_leads, _NURTURE, dtype=np.int8)
+
+        # Hot before Warm, highest score first; Cold leads stay in nurture
+        order = np.lexsort((-leads['lead_score'].to_numpy(), -tiers))
+        order = order[tiers[order] > 0]
+        keys = zip(order.tolist(), tiers[order].tolist(), territories[order].tolist(), industries[order].tolist())
+        for position, tier, territory, industry in keys:
+            for rule, heap in self._chain(tier, territory, industry):
+                rep = self._take(heap)
+                if rep is not None:
+                    self._assign(rep)
+                    reps[position] = rep
+                    rules[position] = rule
+                    break
+            else:
+                rules[position] = _UNASSIGNED
+
+        return pd.DataFrame({
+            'rep': pd.Categorical.from_codes(reps, self.roster.names),
+            'rule': pd.Categorical.from_codes(rules, RULES),
+        }, index=leads.index)
+
+    def release(self, rep, count=1):
+        # Frees capacity when leads are handed back or closed
+        rep = self.roster.names.index(rep) if isinstance(rep, str) else int(rep)
+        self._assign(rep, -min(count, self.load[rep]))
+
+    def start_day(self):
+        self.load = [0] * len(self.roster)
+        self._rebuild()
+
+    def utilization(self):
+        return pd.Series(np.array(self.load) / self.roster.capacity, index=self.roster.names, name='utilization')
+
+
+def jain_fairness(values):
+    # 1.0 when every value is equal, 1/n when one holds everything
+    values = np.asarray(values, dtype=np.float64)
+    squares = np.sum(values ** 2)
+    return float(np.sum(values) ** 2 / (len(values) * squares)) if squares else 1.0
+
+
+@dataclass(frozen=True)
+class SimulationReport:
+    leads: int
+    batches: int
+    seconds: float
+    rules: pd.Series        # leads per routing rule
+    utilization: pd.Series  # per rep, end of day
+    fairness: float         # Jain's index of senior and of standard rep utilization, lead-weighted
+    by_territory: pd.DataFrame
+
+    @property
+    def leads_per_second(self):
+        return self.leads / self.seconds if self.seconds else float('inf')
+
+
+def simulate(leads, roster, batches=DAY_BATCHES):
+    # Routes the leads as one day of arrivals, in `batches` equal slices in
+    # their row order. Only routing is timed
+    router = LeadRouter(roster)
+    routed = []
+    seconds = 0.0
+    for batch in np.array_split(np.arange(len(leads)), max(1, min(batches, len(leads)))):
+        frame = leads.iloc[batch]
+        start = time.perf_counter()
+        routed.append(router.route(frame))
+        seconds += time.perf_counter() - start
+    routes = pd.concat(routed) if routed else pd.DataFrame({'rep': [], 'rule': []})
+
+    utilization = router.utilization()
+    loads = np.array(router.load)
+    groups = [roster.senior, ~roster.senior]
+    fairness = sum(loads[group].sum() * jain_fairness(utilization.to_numpy()[group]) for group in groups if group.any())
+    fairness = fairness / loads.sum() if loads.sum() else 1.0
+
+    territory = pd.Categorical.from_codes(roster.territories, TERRITORIES)
+    by_territory = pd.DataFrame({
+        'Reps': pd.Series(1, index=roster.names).groupby(territory, observed=False).sum(),
+        'Assigned': pd.Series(loads, index=roster.names).groupby(territory, observed=False).sum(),
+        'Capacity': pd.Series(roster.capacity, index=roster.names).groupby(territory, observed=False).sum(),
+    })
+    by_territory['Utilization'] = by_territory['Assigned'] / by_territory['Capacity'].where(by_territory['Capacity'] > 0)
+    return SimulationReport(
+        leads=len(leads),
+        batches=len(routed),
+        seconds=seconds,
+        rules=routes['rule'].value_counts(sort=False).reindex(RULES, fill_value=0),
+        utilization=utilization,
+        fairness=fairness,
+        by_territory=by_territory,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a day of leads through the router and report throughput and fairness")
+    parser.add_argument('--leads', type=int, default=100_000, help="leads arriving in the day")
+    parser.add_argument('--reps', type=int, default=200)
+    parser.add_argument('--capacity', type=int, help="daily leads per rep (default: fits the day with 10%% headroom)")
+    parser.add_argument('--senior-share', type=float, default=SENIOR_SHARE)
+    parser.add_argument('--roster', help="CSV of reps (rep, territory, senior, capacity, expertise) instead of generated ones")
+    parser.add_argument('--batches', type=int, default=DAY_BATCHES)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    leads = generate_leads(args.leads, seed=args.seed, include_identity=False)
+    if args.roster:
+        roster = Roster.from_frame(pd.read_csv(args.roster))
+    else:
+        capacity = args.capacity or -(-args.leads * 11 // (10 * args.reps))
+        roster = generate_roster(args.reps, seed=args.seed, capacity=capacity, senior_share=args.senior_share)
+
+    report = simulate(leads, roster, args.batches)
+    print(f"Routed {report.leads:,} leads to {len(roster):,} reps in {report.batches:,} batches: "
+          f"{report.seconds:.2f}s ({report.leads_per_second:,.0f} leads/s)")
+    print(f"Fairness (Jain, within seniority): {report.fairness:.3f}; "
+          f"utilization {report.utilization.min():.0%} to {report.utilization.max():.0%}")
+    print("\nLeads per rule:")
+    print(report.rules.to_string())
+    print("\nBy territory:")
+    print(report.by_territory.to_string(float_format=lambda value: f'{value:.1%}'))
+
+
+if __name__ == '__main__':
+    main()
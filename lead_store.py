@@ -0,0 +1,280 @@
+"""Compact columnar lead store.
+
+Low-cardinality text (sources, industries, sizes, titles, phone numbers)
+becomes categorical, scores and counts use the narrowest integer dtype that
+holds them, and the conditional outcome columns use nullable integers
+instead of float NaN. For generated data the per-lead id, name and email
+strings are not stored at all: they are derived from the row label for the
+few rows a page displays.
+
+A store can be saved as one .npy file per column plus a JSON manifest and
+opened again memory-mapped: nothing is read until a page touches it, the
+frame's arrays point straight at the mapped files, and every process that
+opens the same directory shares one copy in the OS page cache.
+
+    python lead_store.py --n-leads 1000000
+    python lead_store.py --n-leads 1000000 --save data/leads
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from aggregates import dataset_fingerprint
+from mock_data import generate_leads, identity_columns
+
+# Text columns with at most this share of distinct values become categorical
+CATEGORY_MAX_RATIO = 0.5
+
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# Derived identity columns a saved store can refer to by name
+IDENTITY_FUNCTIONS = {'mock': identity_columns}
+
+
+def _compact_column(values):
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype) \
+            or pd.api.types.is_datetime64_any_dtype(dtype):
+        return values
+    if pd.api.types.is_integer_dtype(dtype):
+        return pd.to_numeric(values, downcast='integer')
+    if pd.api.types.is_float_dtype(dtype):
+        present = values.dropna()
+        if len(present) < len(values) and np.array_equal(present, np.round(present)):
+            # Whole numbers padded with NaN, e.g. time_to_close for open leads
+            return pd.to_numeric(values.astype('Int64'), downcast='integer')
+        return values
+    if pd.api.types.is_string_dtype(dtype) or dtype == object:
+        if values.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(values):
+            return values.astype('category')
+    return values
+
+
+def compact_frame(df):
+    return pd.DataFrame({column: _compact_column(df[column]) for column in df.columns}, index=df.index)
+
+
+def legacy_frame(df):
+    # The layout the per-row generator used to produce: Python str objects
+    # for text, int64 and float64 with NaN for the conditional columns
+    legacy = {}
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(values.dtype):
+            legacy[column] = values.astype(object)
+        elif pd.api.types.is_integer_dtype(values.dtype) and values.isna().any():
+            legacy[column] = values.astype('float64')
+        elif pd.api.types.is_integer_dtype(values.dtype):
+            legacy[column] = values.astype('int64')
+        else:
+            legacy[column] = values
+    return pd.DataFrame(legacy, index=df.index)
+
+
+def _save_array(directory, name, values):
+    np.save(os.path.join(directory, name), np.ascontiguousarray(values), allow_pickle=False)
+    return name
+
+
+def _load_array(directory, name):
+    # A plain ndarray view of the mapping; pandas treats np.memmap oddly
+    return np.asarray(np.load(os.path.join(directory, name), mmap_mode='r', allow_pickle=False))
+
+
+def _save_column(directory, position, values):
+    # Returns the manifest entry that _open_column rebuilds the column from
+    stem = f'{position:03d}'
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return {
+            'kind': 'category',
+            'codes': _save_array(directory, f'{stem}.codes.npy', values.cat.codes.to_numpy()),
+            'categories': values.cat.categories.tolist(),
+            'ordered': bool(dtype.ordered),
+        }
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(dtype):
+        return {
+            'kind': 'nullable',
+            'values': _save_array(directory, f'{stem}.values.npy', values.array._data),
+            'mask': _save_array(directory, f'{stem}.mask.npy', values.array._mask),
+        }
+    if isinstance(dtype, np.dtype) and dtype.kind != 'O':
+        return {'kind': 'numpy', 'values': _save_array(directory, f'{stem}.npy', values.to_numpy())}
+    # High-cardinality text: an Arrow IPC file, mapped the same way
+    import pyarrow as pa
+    name = f'{stem}.arrow'
+    table = pa.table({'values': pa.array(values, type=pa.large_string(), from_pandas=True)})
+    with pa.OSFile(os.path.join(directory, name), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return {'kind': 'arrow', 'values': name}
+
+
+def _open_column(directory, entry):
+    kind = entry['kind']
+    if kind == 'category':
+        dtype = pd.CategoricalDtype(entry['categories'], ordered=entry['ordered'])
+        # validate=False keeps the mapped codes instead of copying them
+        return pd.Categorical.from_codes(_load_array(directory, entry['codes']), dtype=dtype, validate=False)
+    if kind == 'nullable':
+        # The values file keeps its narrow dtype, so Int8 comes back as Int8
+        return pd.arrays.IntegerArray(_load_array(directory, entry['values']), _load_array(directory, entry['mask']))
+    if kind == 'numpy':
+        return _load_array(directory, entry['values'])
+    if kind == 'arrow':
+        import pyarrow as pa
+        source = pa.memory_map(os.path.join(directory, entry['values']))
+        return pd.arrays.ArrowStringArray(pa.ipc.open_file(source).read_all().column('values'))
+    raise ValueError(f"Unknown column kind '{kind}' in lead store manifest")
+
+
+def _save_index(directory, index):
+    if isinstance(index, pd.RangeIndex):
+        return {'kind': 'range', 'start': index.start, 'stop': index.stop, 'step': index.step}
+    return _save_column(directory, 'index', index.to_series())
+
+
+def _open_index(directory, entry):
+    if entry['kind'] == 'range':
+        return pd.RangeIndex(entry['start'], entry['stop'], entry['step'])
+    return pd.Index(_open_column(directory, entry))
+
+
+class LeadStore:
+    # frame holds the stored columns; identity, when set, derives the
+    # remaining per-lead columns from row labels on demand. fingerprint is
+    # the dataset_fingerprint recorded when the store was saved
+    def __init__(self, frame, identity=None, fingerprint=None):
+        self.frame = frame
+        self.identity = identity
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(compact_frame(df))
+
+    @classmethod
+    def generate(cls, n_leads=500, seed=42, now=None):
+        df = generate_leads(n_leads=n_leads, seed=seed, now=now, include_identity=False)
+        return cls(compact_frame(df), identity=identity_columns)
+
+    def save(self, directory):
+        # Written to a sibling temp directory and renamed into place, so a
+        # process opening `directory` never sees a half-written store. A
+        # directory cannot be renamed over a non-empty one, so an existing
+        # store is renamed aside first: for the moment between those two
+        # renames `directory` is missing, and an open() then fails
+        identity = None
+        if self.identity is not None:
+            names = [name for name, function in IDENTITY_FUNCTIONS.items() if function is self.identity]
+            if not names:
+                raise ValueError("Only identity functions listed in IDENTITY_FUNCTIONS can be saved")
+            identity = names[0]
+
+        directory = os.path.abspath(directory)
+        parent = os.path.dirname(directory)
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.lead-store-', dir=parent)
+        aside = None
+        try:
+            manifest = {
+                'version': MANIFEST_VERSION,
+                'rows': len(self.frame),
+                'identity': identity,
+                'fingerprint': self.fingerprint or dataset_fingerprint(self.frame),
+                'index': _save_index(staging, self.frame.index),
+                'columns': [
+                    dict(name=column, **_save_column(staging, position, self.frame[column]))
+                    for position, column in enumerate(self.frame.columns)
+                ],
+            }
+            with open(os.path.join(staging, MANIFEST), 'w') as f:
+                json.dump(manifest, f, indent=1)
+            if os.path.exists(directory):
+                aside = tempfile.mkdtemp(prefix='.lead-store-old-', dir=parent)
+                os.replace(directory, os.path.join(aside, 'store'))
+            try:
+                os.replace(staging, directory)
+            except BaseException:
+                if aside is not None:
+                    os.replace(os.path.join(aside, 'store'), directory)
+                raise
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            if aside is not None:
+                shutil.rmtree(aside, ignore_errors=True)
+            raise
+        if aside is not None:
+            # Readers that mapped the old files keep them until they close
+            shutil.rmtree(aside, ignore_errors=True)
+        self.fingerprint = manifest['fingerprint']
+
+    @classmethod
+    def open(cls, directory):
+        # Memory-mapped and read-only: writing to a column raises
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported lead store version {manifest.get('version')!r} in {directory}")
+        frame = pd.DataFrame(
+            {entry['name']: _open_column(directory, entry) for entry in manifest['columns']},
+            index=_open_index(directory, manifest['index']),
+            copy=False,
+        )
+        identity = IDENTITY_FUNCTIONS[manifest['identity']] if manifest['identity'] else None
+        return cls(frame, identity=identity, fingerprint=manifest['fingerprint'])
+
+    def __len__(self):
+        return len(self.frame)
+
+    def rows(self, labels):
+        # Full records, derived identity columns first, for the rows shown
+        rows = self.frame.loc[labels]
+        if self.identity is None:
+            return rows
+        derived = pd.DataFrame(self.identity(rows.index.to_numpy()), index=rows.index)
+        return pd.concat([derived, rows], axis=1)
+
+    def memory_usage(self):
+        return self.frame.memory_usage(deep=True, index=False)
+
+
+def memory_report(before, after):
+    # Per-column bytes of two layouts; columns missing from `after` are derived
+    report = pd.DataFrame({
+        'before_mb': before.memory_usage(deep=True, index=False) / 2**20,
+        'after_mb': after.memory_usage(deep=True, index=False).reindex(before.columns, fill_value=0) / 2**20,
+        'before_dtype': before.dtypes.astype(str),
+        'after_dtype': after.dtypes.astype(str).reindex(before.columns, fill_value='derived'),
+    })
+    report.loc['total'] = [report['before_mb'].sum(), report['after_mb'].sum(), '', '']
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy and compact lead layouts")
+    parser.add_argument('--n-leads', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save', metavar='DIR', help="also save the compact store for LeadStore.open / LEAD_DATASET_PATH")
+    args = parser.parse_args()
+
+    store = LeadStore.generate(args.n_leads, args.seed)
+    if args.save:
+        store.save(args.save)
+        print(f"Saved {len(store):,} leads to {args.save}")
+    before = legacy_frame(generate_leads(args.n_leads, args.seed))
+    report = memory_report(before, store.frame)
+    with pd.option_context('display.float_format', '{:,.1f}'.format, 'display.width', 120):
+        print(report)
+    total = report.loc['total']
+    print(f"\n{args.n_leads:,} leads: {total['before_mb']:,.0f} MB -> {total['after_mb']:,.0f} MB "
+          f"({total['before_mb'] / total['after_mb']:.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
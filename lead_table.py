@@ -0,0 +1,92 @@
+"""Server-side sorted, filtered and paginated lead listings.
+
+Sorting hundreds of thousands of leads on every rerun, then shipping them
+all to st.dataframe, makes a table unusable. LeadTable argsorts each sortable
+column once per dataset version. A query (sort column, direction, filters)
+is a boolean mask applied to that precomputed order, cached per query, and
+a page is a slice of the result, so only the rows on screen are looked up,
+formatted and sent to the browser.
+
+priority_score changes with lead age, but every lead ages at the same rate,
+so its order is fixed (see priority_index) and can be sorted once too.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from priority_index import priority_scores
+from scoring import TIERS, tier_codes
+
+SORT_COLUMNS = ['lead_score', 'priority_score', 'estimated_deal_value']
+# Filtered views kept per table; each is one intp array of row positions
+MAX_CACHED_VIEWS = 32
+
+
+def lead_priority_scores(df):
+    return priority_scores(
+        df['lead_score'].to_numpy(dtype=np.float64),
+        df['lead_age_days'].to_numpy(dtype=np.float64),
+        df['email_opens'].to_numpy(dtype=np.float64),
+    )
+
+
+class LeadTable:
+    def __init__(self, df, max_cached_views=MAX_CACHED_VIEWS):
+        self.labels = pd.Index(df.index)
+        self.max_cached_views = max_cached_views
+        self._scores = df['lead_score'].to_numpy()
+        self._tiers = tier_codes(self._scores)
+        keys = {
+            'lead_score': self._scores.astype(np.float64),
+            'priority_score': lead_priority_scores(df),
+            'estimated_deal_value': df['estimated_deal_value'].to_numpy(dtype=np.float64),
+        }
+        # Descending row positions per column; ties keep index order
+        self._orders = {column: np.argsort(-values, kind='stable') for column, values in keys.items()}
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.labels)
+
+    def query(self, sort_by='lead_score', ascending=False, min_score=None, tier=None):
+        # Row positions of the matching leads in display order
+        if sort_by not in self._orders:
+            raise KeyError(f"Cannot sort by '{sort_by}'; expected one of {', '.join(SORT_COLUMNS)}")
+        key = (sort_by, ascending, min_score, tier)
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+                return view
+
+        keep = np.ones(len(self.labels), dtype=bool)
+        if min_score is not None:
+            keep &= self._scores >= min_score
+        if tier is not None:
+            keep &= self._tiers == TIERS.index(tier)
+        order = self._orders[sort_by]
+        if ascending:
+            order = order[::-1]
+        view = order[keep[order]]
+
+        with self._lock:
+            self._views[key] = view
+            while len(self._views) > self.max_cached_views:
+                self._views.popitem(last=False)
+        return view
+
+    @staticmethod
+    def n_pages(view, page_size):
+        return max(1, -(-len(view) // page_size))
+
+    @staticmethod
+    def page(view, page_number, page_size):
+        # 1-based page_number; past the end gives an empty page
+        start = (page_number - 1) * page_size
+        return view[start:start + page_size]
+
+    def page_labels(self, view, page_number, page_size):
+        return self.labels[self.page(view, page_number, page_size)]
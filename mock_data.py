@@ -0,0 +1,146 @@
+"""Columnar mock lead generator.
+
+Builds every column as a whole numpy array instead of looping per lead, so
+load-test datasets with millions of leads take seconds. All randomness comes
+from one seeded generator, which makes the output reproducible.
+
+    python mock_data.py --n-leads 1000000 --output leads.parquet
+"""
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+LEAD_SOURCES = ['Website', 'LinkedIn', 'Email Campaign', 'Referral', 'Trade Show', 'Cold Outreach', 'Content Marketing', 'Webinar']
+INDUSTRIES = ['Technology', 'Healthcare', 'Finance', 'Manufacturing', 'Retail', 'Education', 'Real Estate', 'Consulting']
+COMPANY_SIZES = ['1-10', '11-50', '51-200', '201-1000', '1000+']
+JOB_TITLES = ['CEO', 'VP Sales', 'Sales Manager', 'Director', 'VP Marketing', 'IT Manager', 'CFO', 'Operations Manager']
+TERRITORIES = ['NA East', 'NA West', 'EMEA', 'APAC', 'LATAM']
+TERRITORY_WEIGHTS = [0.25, 0.2, 0.3, 0.15, 0.1]
+
+# Weighted base scoring factors
+COMPANY_SIZE_POINTS = [10, 20, 30, 40, 50]
+COMPANY_SIZE_WEIGHTS = [0.2, 0.3, 0.25, 0.15, 0.1]
+TITLE_POINTS = [10, 15, 20, 25, 30]
+TITLE_WEIGHTS = [0.15, 0.2, 0.3, 0.2, 0.15]
+# Job titles at each TITLE_POINTS level, ranked as in the scoring rules;
+# titles the rules do not list sit at the lowest level
+TITLE_GROUPS = [['CFO', 'Operations Manager'], ['IT Manager'], ['Sales Manager', 'Director'], ['VP Sales', 'VP Marketing'], ['CEO']]
+_TITLE_GROUP_SIZES = np.array([len(group) for group in TITLE_GROUPS])
+_TITLE_GROUP_OFFSETS = np.cumsum(_TITLE_GROUP_SIZES) - _TITLE_GROUP_SIZES
+_TITLE_GROUP_CODES = np.array([JOB_TITLES.index(title) for group in TITLE_GROUPS for title in group], dtype=np.int8)
+
+_LETTERS = np.array([chr(65 + k) for k in range(26)])
+
+# Only 9,000 distinct numbers exist, so phones are stored as categories
+PHONE_SUFFIXES = np.arange(1000, 10000)
+_PHONE_NUMBERS = np.char.add('+1-555-', PHONE_SUFFIXES.astype(str))
+
+
+def identity_columns(positions):
+    # Names and contact details are pure functions of the row position
+    positions = np.asarray(positions, dtype=np.int64)
+    numbers = positions.astype(str)
+    return {
+        'lead_id': np.char.add('LEAD-', (positions + 1000).astype(str)),
+        'company_name': np.char.add(np.char.add('Company ', _LETTERS[positions % 26]), numbers),
+        'contact_name': np.char.add('Contact ', numbers),
+        'email': np.char.add(np.char.add(np.char.add('contact', numbers), '@company'), np.char.add(numbers, '.com')),
+    }
+
+
+def _categorical(rng, categories, n_leads):
+    # Uniform draw stored as codes, never as one Python string per lead
+    return pd.Categorical.from_codes(rng.integers(0, len(categories), n_leads).astype(np.int8), categories)
+
+
+def generate_leads(n_leads=500, seed=42, now=None, include_identity=True):
+    rng = np.random.default_rng(seed)
+    now = pd.Timestamp(now if now is not None else datetime.now())
+
+    # Base scoring factors. Company size, job title and the engagement
+    # counts are drawn to match their factor, so conversions can be learned
+    # from the lead's columns
+    size_codes = rng.choice(len(COMPANY_SIZES), size=n_leads, p=COMPANY_SIZE_WEIGHTS).astype(np.int8)
+    company_size_score = np.take(COMPANY_SIZE_POINTS, size_codes)
+    industry_score = rng.integers(10, 40, n_leads)
+    engagement_score = rng.integers(0, 30, n_leads)
+    title_levels = rng.choice(len(TITLE_POINTS), size=n_leads, p=TITLE_WEIGHTS)
+    title_score = np.take(TITLE_POINTS, title_levels)
+
+    # Calculate total score with some randomness
+    base_score = company_size_score + industry_score + engagement_score + title_score
+    final_score = np.clip(base_score + rng.integers(-15, 15, n_leads), 0, 100)
+
+    # Determine conversion based on score
+    conversion_prob = final_score / 100 * 0.6 + 0.1  # 10-70% based on score
+    converted = rng.random(n_leads) < conversion_prob
+
+    # Conditional outcome columns are only populated for converted leads
+    time_to_close = np.where(converted, rng.integers(15, 120, n_leads), np.nan)
+    actual_deal_value = np.where(converted, rng.integers(3000, 180000, n_leads), np.nan)
+
+    contact_days = rng.integers(0, 30, n_leads)
+    # One title uniformly from the lead's title level
+    title_codes = _TITLE_GROUP_CODES[
+        _TITLE_GROUP_OFFSETS[title_levels] + (rng.random(n_leads) * _TITLE_GROUP_SIZES[title_levels]).astype(np.intp)
+    ]
+    engagement = engagement_score / 29
+    phone_suffix = rng.integers(PHONE_SUFFIXES[0], PHONE_SUFFIXES[-1] + 1, n_leads)
+
+    # Per-lead strings dominate build time; numeric-only load tests can skip
+    # them and call identity_columns() for the rows they actually display
+    columns = identity_columns(np.arange(n_leads)) if include_identity else {}
+    columns.update({
+        'phone': pd.Categorical.from_codes(phone_suffix - PHONE_SUFFIXES[0], _PHONE_NUMBERS),
+        'lead_source': _categorical(rng, LEAD_SOURCES, n_leads),
+        'industry': _categorical(rng, INDUSTRIES, n_leads),
+        'company_size': pd.Categorical.from_codes(size_codes, COMPANY_SIZES),
+        'job_title': pd.Categorical.from_codes(title_codes, JOB_TITLES),
+        'lead_score': final_score,
+        'conversion_probability': np.round(conversion_prob * 100, 1),
+        'estimated_deal_value': rng.integers(5000, 150000, n_leads),
+        'lead_age_days': rng.integers(1, 90, n_leads),
+        'last_contact': now - pd.to_timedelta(contact_days, unit='D'),
+        'email_opens': rng.binomial(14, engagement),
+        'website_visits': rng.binomial(24, engagement),
+        'content_downloads': rng.binomial(7, engagement),
+        'converted': converted,
+        'time_to_close': time_to_close,
+        'actual_deal_value': actual_deal_value,
+    })
+    # Converted leads closed time_to_close days after they were created,
+    # capped at today
+    created = now - pd.to_timedelta(columns['lead_age_days'], unit='D')
+    columns['close_date'] = created + pd.to_timedelta(np.minimum(time_to_close, columns['lead_age_days']), unit='D')
+    # Drawn last so the columns above match datasets generated before it
+    territory_codes = rng.choice(len(TERRITORIES), size=n_leads, p=TERRITORY_WEIGHTS).astype(np.int8)
+    columns['territory'] = pd.Categorical.from_codes(territory_codes, TERRITORIES)
+    return pd.DataFrame(columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a mock lead dataset")
+    parser.add_argument('--n-leads', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-identity', action='store_true', help="skip the per-lead id, name and email strings")
+    parser.add_argument('--output', help="write to .csv or .parquet instead of printing a summary")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = generate_leads(args.n_leads, args.seed, include_identity=not args.no_identity)
+    elapsed = time.perf_counter() - start
+    print(f"Generated {len(df):,} leads in {elapsed:.2f}s ({len(df) / elapsed:,.0f} rows/s)")
+
+    if args.output:
+        if args.output.endswith('.parquet'):
+            df.to_parquet(args.output, index=False)
+        else:
+            df.to_csv(args.output, index=False)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
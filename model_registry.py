@@ -0,0 +1,279 @@
+"""Registry of named, versioned lead-scoring models.
+
+Three scorers share one interface, predict(columns, n_rows) -> int32 scores
+from 0 to 100, where columns maps column name -> Series or sequence as in
+scoring.score_columns:
+
+- rules: the lookup tables of the "Lead Scoring Engine" page
+- logistic: the conversion model (logistic regression on `converted`)
+- gbm: gradient-boosted depth-limited trees on binned features, in numpy
+
+The learned models score a lead as its predicted conversion probability in
+percent. Each model is loaded once per process (from MODEL_DIR when saved
+there, otherwise trained on generated lead history and saved) and kept warm.
+warm() does that in a background thread at startup so a request never pays
+for it; a request for a model still loading waits for that one load.
+
+    python model_registry.py --train-leads 200000
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from conversion_model import ConversionModel
+from lead_features import FEATURE_BINS, FEATURE_COLUMNS, feature_bins
+from mock_data import generate_leads
+from scoring import SCORING_COLUMNS, score_columns
+
+# Learned models are saved here as <name>-v<version>.npz when set
+MODEL_DIR = os.environ.get('MODEL_DIR')
+TRAINING_LEADS = 100_000
+TRAINING_SEED = 7
+DEFAULT_MODEL = 'rules'
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+def _percent(probabilities):
+    return np.rint(probabilities * 100).astype(np.int32)
+
+
+class RuleModel:
+    name = 'rules'
+    version = '1'
+    columns = SCORING_COLUMNS
+
+    def predict(self, columns, n_rows):
+        return score_columns(columns, n_rows)
+
+
+def _fit_tree(bins, grad, hess, depth, l2, min_hess):
+    # Histogram tree grown level by level: every node of a level finds its
+    # best (feature, threshold) from one bincount per feature. Nodes are
+    # numbered heap-style; rows go left when their bin <= threshold
+    n_rows, n_features = bins.shape
+    n_bins = max(FEATURE_BINS)
+    features = np.zeros(2 ** depth - 1, dtype=np.intp)
+    thresholds = np.zeros(2 ** depth - 1, dtype=np.int16)
+    rows = np.arange(n_rows)
+    node = np.zeros(n_rows, dtype=np.intp)
+    for level in range(depth):
+        first, width = 2 ** level - 1, 2 ** level
+        local = node - first
+        best_gain = np.zeros(width)
+        best_feature = np.zeros(width, dtype=np.intp)
+        # No gainful split sends every row left
+        best_threshold = np.full(width, n_bins - 1, dtype=np.int16)
+        for feature in range(n_features):
+            keys = local * n_bins + bins[:, feature]
+            g = np.bincount(keys, weights=grad, minlength=width * n_bins).reshape(width, n_bins)
+            h = np.bincount(keys, weights=hess, minlength=width * n_bins).reshape(width, n_bins)
+            g_left, h_left = np.cumsum(g, axis=1)[:, :-1], np.cumsum(h, axis=1)[:, :-1]
+            g_total, h_total = g.sum(axis=1, keepdims=True), h.sum(axis=1, keepdims=True)
+            g_right, h_right = g_total - g_left, h_total - h_left
+            gain = g_left ** 2 / (h_left + l2) + g_right ** 2 / (h_right + l2) - g_total ** 2 / (h_total + l2)
+            gain[(h_left < min_hess) | (h_right < min_hess)] = 0.0
+            threshold = np.argmax(gain, axis=1)
+            gain = gain[np.arange(width), threshold]
+            better = gain > best_gain
+            best_gain[better] = gain[better]
+            best_feature[better] = feature
+            best_threshold[better] = threshold[better]
+        features[first:first + width] = best_feature
+        thresholds[first:first + width] = best_threshold
+        node = 2 * node + 1 + (bins[rows, features[node]] > thresholds[node])
+    leaf = node - (2 ** depth - 1)
+    n_leaves = 2 ** depth
+    values = -np.bincount(leaf, weights=grad, minlength=n_leaves) / (np.bincount(leaf, weights=hess, minlength=n_leaves) + l2)
+    return features, thresholds, values
+
+
+class GradientBoostedModel:
+    name = 'gbm'
+    version = '1'
+    columns = FEATURE_COLUMNS
+
+    def __init__(self, base, features, thresholds, values):
+        # features/thresholds: (trees, internal nodes); values: (trees, leaves),
+        # already scaled by the learning rate
+        self.base = base
+        self.features = features
+        self.thresholds = thresholds
+        self.values = values
+
+    @classmethod
+    def fit(cls, df, n_trees=60, depth=3, learning_rate=0.2, l2=1.0, min_hess=20.0):
+        bins = feature_bins(df, len(df))
+        y = df['converted'].to_numpy(dtype=np.float64)
+        rate = np.clip(y.mean(), 1e-6, 1 - 1e-6)
+        base = float(np.log(rate / (1 - rate)))
+        raw = np.full(len(y), base)
+        trees = []
+        for _ in range(n_trees):
+            p = _sigmoid(raw)
+            features, thresholds, values = _fit_tree(bins, p - y, p * (1 - p), depth, l2, min_hess)
+            values *= learning_rate
+            raw += _tree_output(bins, features, thresholds, values, depth)
+            trees.append((features, thresholds, values))
+        features, thresholds, values = (np.stack(parts) for parts in zip(*trees))
+        return cls(base, features, thresholds, values)
+
+    @property
+    def depth(self):
+        return int(np.log2(self.values.shape[1]))
+
+    def probabilities(self, columns, n_rows):
+        bins = feature_bins(columns, n_rows)
+        raw = np.full(n_rows, self.base)
+        for tree in range(len(self.values)):
+            raw += _tree_output(bins, self.features[tree], self.thresholds[tree], self.values[tree], self.depth)
+        return _sigmoid(raw)
+
+    def predict(self, columns, n_rows):
+        return _percent(self.probabilities(columns, n_rows))
+
+    def save(self, path):
+        np.savez(path, base=self.base, features=self.features, thresholds=self.thresholds, values=self.values)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(float(data['base']), data['features'], data['thresholds'], data['values'])
+
+
+def _tree_output(bins, features, thresholds, values, depth):
+    rows = np.arange(len(bins))
+    node = np.zeros(len(bins), dtype=np.intp)
+    for _ in range(depth):
+        node = 2 * node + 1 + (bins[rows, features[node]] > thresholds[node])
+    return values[node - (2 ** depth - 1)]
+
+
+def training_history(n_leads=TRAINING_LEADS, seed=TRAINING_SEED):
+    return generate_leads(n_leads, seed=seed, include_identity=False)
+
+
+def trained_loader(model_class, model_dir=None, n_leads=TRAINING_LEADS):
+    # Loads the saved model when there is one; otherwise trains on lead
+    # history and saves the result for the next process
+    def load():
+        path = None
+        if model_dir:
+            path = os.path.join(model_dir, f'{model_class.name}-v{model_class.version}.npz')
+            if os.path.exists(path):
+                return model_class.load(path)
+        model = model_class.fit(training_history(n_leads))
+        if path:
+            os.makedirs(model_dir, exist_ok=True)
+            tmp = path + '.tmp.npz'
+            model.save(tmp)
+            os.replace(tmp, path)
+        return model
+    return load
+
+
+class ModelRegistry:
+    # Loaders by (name, version); each model is loaded at most once, and
+    # concurrent callers share that load. Thread-safe
+    def __init__(self):
+        self._loaders = {}
+        self._latest = {}
+        self._loads = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, version, loader):
+        with self._lock:
+            self._loaders[(name, version)] = loader
+            self._latest[name] = version
+
+    def names(self):
+        return list(self._latest)
+
+    def _key(self, name, version):
+        if name not in self._latest:
+            raise KeyError(f"Unknown scoring model '{name}'; expected one of {', '.join(self._latest)}")
+        key = (name, version if version is not None else self._latest[name])
+        if key not in self._loaders:
+            raise KeyError(f"Scoring model '{name}' has no version '{version}'")
+        return key
+
+    def get(self, name, version=None):
+        key = self._key(name, version)
+        with self._lock:
+            future = self._loads.get(key)
+            owner = future is None
+            if owner:
+                future = self._loads[key] = Future()
+        if owner:
+            try:
+                future.set_result(self._loaders[key]())
+            except BaseException as exc:
+                # A failed load is retried by the next caller
+                with self._lock:
+                    del self._loads[key]
+                future.set_exception(exc)
+        return future.result()
+
+    def is_loaded(self, name, version=None):
+        future = self._loads.get(self._key(name, version))
+        return future is not None and future.done() and future.exception() is None
+
+    def warm(self, names=None):
+        # Loads every model (or those named) in a background thread
+        def load_all():
+            for name in names or self.names():
+                try:
+                    self.get(name)
+                except Exception:
+                    pass  # reported to whoever asks for the model
+        thread = threading.Thread(target=load_all, name='model-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def predict(self, name, columns, n_rows=None, version=None):
+        n_rows = len(columns) if n_rows is None else n_rows
+        return self.get(name, version).predict(columns, n_rows)
+
+
+def default_registry(model_dir=MODEL_DIR):
+    registry = ModelRegistry()
+    registry.register(RuleModel.name, RuleModel.version, RuleModel)
+    for model_class in (ConversionModel, GradientBoostedModel):
+        registry.register(model_class.name, model_class.version, trained_loader(model_class, model_dir))
+    return registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the learned scoring models and compare them")
+    parser.add_argument('--train-leads', type=int, default=TRAINING_LEADS)
+    parser.add_argument('--test-leads', type=int, default=100_000)
+    parser.add_argument('--save', metavar='DIR', help="save the trained models for MODEL_DIR")
+    args = parser.parse_args()
+
+    history = training_history(args.train_leads)
+    test = generate_leads(args.test_leads, seed=TRAINING_SEED + 1, include_identity=False)
+    converted = test['converted'].to_numpy()
+    for model_class in (RuleModel, ConversionModel, GradientBoostedModel):
+        start = time.perf_counter()
+        model = model_class.fit(history) if hasattr(model_class, 'fit') else model_class()
+        fitted = time.perf_counter() - start
+        start = time.perf_counter()
+        scores = model.predict(test, len(test))
+        scored = time.perf_counter() - start
+        # Conversion rate of the top-scored fifth against the overall rate
+        top = scores >= np.quantile(scores, 0.8)
+        print(f"{model_class.name:>8}: fit {fitted:.2f}s, predict {len(test) / scored:,.0f} rows/s, "
+              f"top-20% conversion {converted[top].mean():.1%} vs {converted.mean():.1%} overall")
+        if args.save and hasattr(model, 'save'):
+            os.makedirs(args.save, exist_ok=True)
+            model.save(os.path.join(args.save, f'{model_class.name}-v{model_class.version}.npz'))
+
+
+if __name__ == '__main__':
+    main()
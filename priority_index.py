@@ -0,0 +1,16 @@
+"""Priority score behind the "Daily Lead Prioritization" table.
+
+priority_score = lead_score * 0.5 + (100 - lead_age_days) * 0.3 + email_opens * 2
+
+Every lead ages one day per day, so the age term lowers all priorities by
+the same amount and never changes their order: LeadTable sorts by it once
+per dataset version and pages through that order, with tier filters.
+"""
+SCORE_WEIGHT = 0.5
+AGE_WEIGHT = 0.3
+AGE_CAP = 100
+EMAIL_OPEN_WEIGHT = 2
+
+
+def priority_scores(lead_score, lead_age_days, email_opens):
+    return lead_score * SCORE_WEIGHT + (AGE_CAP - lead_age_days) * AGE_WEIGHT + email_opens * EMAIL_OPEN_WEIGHT
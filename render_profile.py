@@ -0,0 +1,133 @@
+"""Per-section render timings for the app's pages.
+
+Each page times its named sections (KPI metrics, every chart, every table)
+with perf_counter_ns. The last WINDOW durations of each (page, section) are
+kept in a fixed numpy ring, so recording is a few array writes under a lock
+and p50/p95/p99 are only computed when someone looks at them: the sidebar
+debug panel, or an export as Prometheus text or JSON lines for offline
+analysis. One profiler is shared by every session of the process.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# Recent reruns kept per section
+WINDOW = 500
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_NAME = 'sales_app_section_seconds'
+
+
+class _Ring:
+    def __init__(self, size):
+        self.values = np.zeros(size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.values[self.count % len(self.values)] = seconds
+        self.count += 1
+        self.total += seconds
+
+    def recent(self):
+        if self.count <= len(self.values):
+            return self.values[:self.count].copy()
+        # Oldest first
+        return np.roll(self.values, -(self.count % len(self.values)))
+
+
+class SectionTimer:
+    def __init__(self, profiler, page, section):
+        self.profiler = profiler
+        self.page = page
+        self.section = section
+        self._start = time.perf_counter_ns()
+
+    def stop(self):
+        seconds = (time.perf_counter_ns() - self._start) / 1e9
+        self.profiler.record(self.page, self.section, seconds)
+        return seconds
+
+
+class RenderProfiler:
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    def timer(self, page, section):
+        # For spans that do not fit a with block; call stop() at the end
+        return SectionTimer(self, page, section)
+
+    @contextmanager
+    def section(self, page, section):
+        timer = self.timer(page, section)
+        try:
+            yield
+        finally:
+            timer.stop()
+
+    def record(self, page, section, seconds):
+        with self._lock:
+            ring = self._rings.get((page, section))
+            if ring is None:
+                ring = self._rings[(page, section)] = _Ring(self.window)
+            ring.add(seconds)
+
+    def _snapshot(self, page=None):
+        with self._lock:
+            return [
+                (key, ring.recent(), ring.count, ring.total)
+                for key, ring in self._rings.items() if page is None or key[0] == page
+            ]
+
+    def stats(self, page=None):
+        # One row per section, in the order sections were first timed
+        rows = []
+        for (section_page, section), recent, count, total in self._snapshot(page):
+            p50, p95, p99 = np.quantile(recent, QUANTILES) * 1000
+            rows.append({
+                'page': section_page,
+                'section': section,
+                'runs': count,
+                'p50_ms': p50,
+                'p95_ms': p95,
+                'p99_ms': p99,
+                'last_ms': recent[-1] * 1000,
+                'total_s': total,
+            })
+        return pd.DataFrame(rows, columns=['page', 'section', 'runs', 'p50_ms', 'p95_ms', 'p99_ms', 'last_ms', 'total_s'])
+
+    def prometheus_text(self):
+        # Prometheus summary: quantiles over the recent window, with _sum and
+        # _count over every recorded run
+        lines = [
+            f'# HELP {METRIC_NAME} Render time of an app page section over recent reruns',
+            f'# TYPE {METRIC_NAME} summary',
+        ]
+        for (page, section), recent, count, total in self._snapshot():
+            labels = f'page="{_escape(page)}",section="{_escape(section)}"'
+            for quantile, value in zip(QUANTILES, np.quantile(recent, QUANTILES)):
+                lines.append(f'{METRIC_NAME}{{{labels},quantile="{quantile}"}} {value:.9f}')
+            lines.append(f'{METRIC_NAME}_sum{{{labels}}} {total:.9f}')
+            lines.append(f'{METRIC_NAME}_count{{{labels}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def json_lines(self):
+        # One object per section, stamped with the export time
+        timestamp = time.time()
+        return ''.join(
+            json.dumps(dict(row, timestamp=timestamp)) + '\n'
+            for row in self.stats().to_dict(orient='records')
+        )
+
+    def reset(self):
+        with self._lock:
+            self._rings.clear()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,386 @@
+"""Event-driven rescoring: "Re-score after engagement".
+
+Engagement events (email opens, website visits, content downloads) arrive as
+JSON lines, {"lead": <row label>, "type": "open" | "visit" | "download"},
+from an asyncio queue or from a file that is tailed or replayed. They are
+applied in micro-batches:
+
+1. counts per (lead, event type) in the batch, from one np.unique
+2. added into an (leads, 3) int32 counter array for the whole store
+3. only the leads touched by the batch are rescored, through the model
+4. leads whose tier changed (Cold -> Warm -> Hot) are emitted as one frame,
+   e.g. to RouterSink, which assigns upgraded leads to reps
+
+A batch of lines is decoded with one json.loads call, so the per-event
+Python work is a couple of list lookups. The queue is bounded: producers
+awaiting submit() are held back while the pipeline is behind, and a tailed
+file is only read as fast as it is processed. Replaying a file from offset 0
+into fresh counters rebuilds them from the store's own columns plus every
+logged event.
+
+With window_days set, scores use engagement over that many days (as the
+scoring form's "last 30 days" sliders do) from engagement_window, and events
+may carry "ts" in epoch seconds; events more than a few minutes ahead of the
+clock are rejected; events without one count on the current day. The stored
+counts are taken as recorded on each lead's last_contact day. The pipeline
+moves the window to the current day before each batch, rescoring every lead
+when the day changed, since expiring events can lower any score.
+
+    python rescoring_pipeline.py --leads 1000000 --events 2000000
+    python rescoring_pipeline.py --leads 1000000 --tail events.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from engagement_window import WindowedCounters, current_day, day_numbers, event_days, valid_timestamps
+from lead_routing import LeadRouter, generate_roster
+from mock_data import generate_leads
+from model_registry import RuleModel
+from scoring import TIERS, tier_codes
+
+EVENT_TYPES = ['open', 'visit', 'download']
+# Counter column per event type
+EVENT_COLUMNS = ['email_opens', 'website_visits', 'content_downloads']
+_TYPE_CODES = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+
+MAX_BATCH = 8192
+MAX_QUEUE_EVENTS = 65536
+# Bytes read from a file per micro-batch
+READ_BYTES = 1 << 20
+
+
+class EngagementCounters:
+    # Engagement counts and current scores of every lead in df (read-only),
+    # kept as whole-store arrays. counts are lifetime totals; scores come
+    # from model (the rules by default), applied to the stored columns and
+    # the lifetime counts, or the last window_days of them when set
+    def __init__(self, df, model=None, window_days=None, today=None):
+        self.frame = df
+        self.labels = pd.Index(df.index)
+        self.model = model if model is not None else RuleModel()
+        self.counts = np.stack([
+            df[column].to_numpy(dtype=np.int32, na_value=0) if column in df else np.zeros(len(df), dtype=np.int32)
+            for column in EVENT_COLUMNS
+        ], axis=1)
+        self.window = None
+        if window_days:
+            self.window = WindowedCounters(len(df), len(EVENT_COLUMNS), window_days, today)
+            positions = np.arange(len(df))
+            days = day_numbers(df['last_contact']) if 'last_contact' in df else None
+            for code in range(len(EVENT_COLUMNS)):
+                self.window.add(positions, np.full(len(df), code), days, counts=self.counts[:, code])
+        self.scores = self._score(np.arange(len(df)))
+        self.tiers = tier_codes(self.scores)
+
+    def engagement(self, positions):
+        # (len(positions), event types) counts that scoring sees
+        if self.window is None:
+            return self.counts[positions]
+        return self.window.window(positions=positions).T
+
+    def _score(self, positions):
+        columns = {
+            column: self.frame[column].take(positions)
+            for column in self.model.columns if column in self.frame and column not in EVENT_COLUMNS
+        }
+        engagement = self.engagement(positions)
+        for code, column in enumerate(EVENT_COLUMNS):
+            columns[column] = pd.Series(engagement[:, code])
+        return self.model.predict(columns, len(positions))
+
+    def _rescore(self, positions):
+        scores = self._score(positions)
+        tiers = tier_codes(scores)
+        previous = self.tiers[positions]
+        self.scores[positions] = scores
+        self.tiers[positions] = tiers
+        changed = previous != tiers
+        return tier_changes(self.labels[positions[changed]], scores[changed], previous[changed], tiers[changed])
+
+    def advance(self, day=None):
+        # Moves the engagement window to day (default today) and rescores
+        # every lead when it moved; returns the tier changes
+        if self.window is None or not self.window.advance(current_day() if day is None else day):
+            return tier_changes([], [], [], [])
+        return self._rescore(np.arange(len(self.frame)))
+
+    def positions(self, labels):
+        return self.labels.get_indexer(labels)
+
+    def apply(self, positions, types, timestamps=None):
+        # Adds one count per (position, type code) and rescores the leads
+        # touched; returns the frame of tier changes (see tier_changes).
+        # timestamps (epoch seconds, NaN for now) place events in the window
+        keys, counts = np.unique(positions * len(EVENT_TYPES) + types, return_counts=True)
+        self.counts.reshape(-1)[keys] += counts.astype(np.int32)
+        changes = []
+        if self.window is not None:
+            days = None if timestamps is None else event_days(timestamps, self.window.today)
+            if days is not None and len(days) and days.max() > self.window.today:
+                # A new day can lower any lead's score, not just these
+                changes.append(self.advance(int(days.max())))
+            self.window.add(positions, types, days)
+        changes.append(self._rescore(np.unique(keys // len(EVENT_TYPES))))
+        if len(changes) == 1:
+            return changes[0]
+        # A lead changed by both keeps its latest tier change
+        changes = pd.concat(changes)
+        return changes[~changes.index.duplicated(keep='last')]
+
+    def frame_with_counts(self, positions=None):
+        # Rows of the store with their live counts and score
+        positions = np.arange(len(self.frame)) if positions is None else positions
+        rows = self.frame.iloc[positions].copy()
+        engagement = self.engagement(positions)
+        for code, column in enumerate(EVENT_COLUMNS):
+            rows[column] = engagement[:, code]
+        rows['lead_score'] = self.scores[positions]
+        return rows
+
+
+def tier_changes(labels, scores, previous, tiers):
+    return pd.DataFrame({
+        'lead_score': scores,
+        'previous_tier': pd.Categorical.from_codes(previous, TIERS),
+        'tier': pd.Categorical.from_codes(tiers, TIERS),
+    }, index=pd.Index(labels, name='lead'))
+
+
+class RouterSink:
+    # Routes leads whose tier went up (to Warm or Hot) with a LeadRouter;
+    # routed holds one assignment frame per batch that had upgrades
+    def __init__(self, router, leads):
+        self.router = router
+        self.leads = leads
+        self.routed = []
+
+    def __call__(self, changes):
+        upgraded = changes[changes['tier'].cat.codes > changes['previous_tier'].cat.codes]
+        if len(upgraded):
+            rows = self.leads.loc[upgraded.index, [column for column in ('territory', 'industry') if column in self.leads]]
+            self.routed.append(self.router.route(rows.assign(lead_score=upgraded['lead_score'])))
+
+
+def _field(event, name):
+    # A lead id or event type; anything but a str or int (a list, an object)
+    # is invalid and makes the event rejected
+    value = event.get(name) if isinstance(event, dict) else None
+    return value if isinstance(value, (str, int)) and not isinstance(value, bool) else None
+
+
+def _timestamp(event):
+    # NaN (now) when there is no numeric ts. A NaN, infinite or huge ts, e.g.
+    # an integer past float range, comes back as inf and is rejected
+    value = event.get('ts') if isinstance(event, dict) else None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return np.nan
+    return float(value) if abs(value) < 1e300 else np.inf
+
+
+class RescoringPipeline:
+    # Applies event micro-batches to counters and passes every non-empty
+    # frame of tier changes to on_change. Run on one thread or event loop.
+    # With a window, it is moved to clock() (days since the epoch) before
+    # every batch and while a tailed file is idle
+    def __init__(self, counters, on_change=None, max_batch=MAX_BATCH, max_queue=MAX_QUEUE_EVENTS, clock=current_day):
+        self.counters = counters
+        self.clock = clock
+        self.on_change = on_change
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.events = 0
+        self.batches = 0
+        self.tier_changes = 0
+        # Events naming an unknown lead or type, with an invalid ts, or not
+        # valid JSON
+        self.rejected = 0
+        self._queue = None
+
+    def _emit(self, changes):
+        if len(changes):
+            self.tier_changes += len(changes)
+            if self.on_change is not None:
+                self.on_change(changes)
+
+    def advance(self):
+        # Moves the window to today; expiring engagement can lower any lead's
+        # tier, and those changes go to on_change on their own
+        if self.counters.window is None:
+            return tier_changes([], [], [], [])
+        changes = self.counters.advance(self.clock())
+        self._emit(changes)
+        return changes
+
+    def process(self, events):
+        # events: parsed event dicts; returns the tier changes they caused
+        self.advance()
+        positions = self.counters.positions([_field(event, 'lead') for event in events])
+        types = np.fromiter((_TYPE_CODES.get(_field(event, 'type'), -1) for event in events), dtype=np.intp,
+                            count=len(events))
+        valid = (positions >= 0) & (types >= 0)
+        timestamps = None
+        if self.counters.window is not None:
+            timestamps = np.fromiter((_timestamp(event) for event in events), dtype=np.float64, count=len(events))
+            # A far-future or non-finite time would move the window
+            valid &= valid_timestamps(timestamps)
+            timestamps = timestamps[valid]
+        self.rejected += len(events) - int(valid.sum())
+        self.events += int(valid.sum())
+        self.batches += 1
+        changes = self.counters.apply(positions[valid], types[valid], timestamps)
+        self._emit(changes)
+        return changes
+
+    def process_lines(self, lines):
+        # Complete JSON lines (str or bytes), decoded in one call when the
+        # whole batch is valid
+        lines = [line.decode() if isinstance(line, bytes) else line for line in lines]
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            return tier_changes([], [], [], [])
+        try:
+            events = json.loads('[' + ','.join(lines) + ']')
+        except ValueError:
+            events = None
+        # A line holding several comma-separated values would shift the rest
+        if events is None or len(events) != len(lines):
+            events = []
+            for line in lines:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    events.append(None)
+        return self.process(events)
+
+    def _read_batch(self, f):
+        # Complete lines from the current position, at most about
+        # READ_BYTES; a trailing line still being written is left unread
+        start = f.tell()
+        lines = f.readlines(READ_BYTES)
+        if lines and not lines[-1].endswith(b'\n'):
+            f.seek(start + sum(map(len, lines)) - len(lines[-1]))
+            lines.pop()
+        return lines
+
+    def replay(self, path, offset=0):
+        # Applies the file's events from offset to its end; returns the offset
+        # after the last complete line
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            while True:
+                lines = self._read_batch(f)
+                if not lines:
+                    return f.tell()
+                for start in range(0, len(lines), self.max_batch):
+                    self.process_lines(lines[start:start + self.max_batch])
+
+    async def tail(self, path, offset=0, poll_interval=0.5, on_offset=None):
+        # Follows the file like tail -f from offset, yielding to the loop
+        # between batches; on_offset(offset) is called after each applied
+        # batch so the caller can persist where to resume
+        while not os.path.exists(path):
+            await asyncio.sleep(poll_interval)
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            while True:
+                lines = self._read_batch(f)
+                if not lines:
+                    self.advance()
+                    await asyncio.sleep(poll_interval)
+                    continue
+                for start in range(0, len(lines), self.max_batch):
+                    self.process_lines(lines[start:start + self.max_batch])
+                    await asyncio.sleep(0)
+                if on_offset is not None:
+                    on_offset(f.tell())
+
+    async def submit(self, event):
+        # Queues one parsed event; waits while the queue is full
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_queue)
+        await self._queue.put(event)
+
+    async def run(self):
+        # Consumes submitted events: everything queued, up to max_batch,
+        # becomes one micro-batch
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_queue)
+        while True:
+            events = [await self._queue.get()]
+            while len(events) < self.max_batch and not self._queue.empty():
+                events.append(self._queue.get_nowait())
+            self.process(events)
+            await asyncio.sleep(0)
+
+
+def write_events(path, labels, n_events, seed=42):
+    # Random engagement events for the given lead labels, as JSON lines;
+    # opens are the most common, downloads the rarest
+    rng = np.random.default_rng(seed)
+    leads = np.asarray(labels)[rng.integers(0, len(labels), n_events)]
+    types = np.array(EVENT_TYPES)[rng.choice(len(EVENT_TYPES), size=n_events, p=[0.5, 0.4, 0.1])]
+    with open(path, 'w') as f:
+        for start in range(0, n_events, 1 << 20):
+            stop = start + (1 << 20)
+            f.writelines(f'{{"lead": {lead}, "type": "{event_type}"}}\n'
+                         for lead, event_type in zip(leads[start:stop].tolist(), types[start:stop].tolist()))
+
+
+def _report(pipeline, sink, seconds):
+    upgrades = sum(len(routed) for routed in sink.routed)
+    print(f"Applied {pipeline.events:,} events in {pipeline.batches:,} batches: {seconds:.2f}s "
+          f"({pipeline.events / seconds:,.0f} events/s); {pipeline.rejected:,} rejected")
+    print(f"{pipeline.tier_changes:,} tier changes, {upgrades:,} upgraded leads routed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply engagement events to lead counters and rescore the affected leads")
+    parser.add_argument('--leads', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--events', type=int, default=1_000_000, help="random events to generate and replay")
+    parser.add_argument('--replay', metavar='PATH', help="replay this event file instead of generated events")
+    parser.add_argument('--tail', metavar='PATH', help="follow this event file until interrupted")
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--window-days', type=int, help="score engagement over this many days instead of lifetime")
+    args = parser.parse_args()
+
+    leads = generate_leads(args.leads, seed=args.seed, include_identity=False)
+    start = time.perf_counter()
+    counters = EngagementCounters(leads, window_days=args.window_days)
+    print(f"Scored {len(leads):,} leads in {time.perf_counter() - start:.2f}s")
+    router = LeadRouter(generate_roster(max(10, args.leads // 500), seed=args.seed))
+    sink = RouterSink(router, leads)
+    pipeline = RescoringPipeline(counters, sink, args.max_batch)
+
+    if args.tail:
+        start = time.perf_counter()
+        try:
+            asyncio.run(pipeline.tail(args.tail))
+        except KeyboardInterrupt:
+            pass
+        _report(pipeline, sink, time.perf_counter() - start)
+        return
+
+    path = args.replay
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix='events-', suffix='.jsonl')
+        os.close(fd)
+        write_events(path, leads.index, args.events, args.seed)
+    try:
+        start = time.perf_counter()
+        pipeline.replay(path)
+        _report(pipeline, sink, time.perf_counter() - start)
+    finally:
+        if args.replay is None:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
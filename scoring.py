@@ -0,0 +1,112 @@
+"""Batch lead-scoring engine behind the "Lead Scoring Engine" form.
+
+Categorical factors are mapped through precomputed lookup arrays
+(category codes -> numpy take), so a whole DataFrame is scored in a handful
+of array operations. The form scores a batch of one through the same path.
+"""
+import numpy as np
+import pandas as pd
+
+# Company size scoring
+SIZE_SCORES = {'1-10': 10, '11-50': 20, '51-200': 30, '201-1000': 40, '1000+': 50}
+
+# Title scoring
+TITLE_SCORES = {'CEO': 30, 'VP Sales': 25, 'VP Marketing': 25, 'Sales Manager': 20, 'Director': 20, 'IT Manager': 15}
+
+# Budget scoring
+BUDGET_SCORES = {'<$10K': 5, '$10K-$50K': 10, '$50K-$100K': 15, '$100K-$500K': 20, '$500K+': 25}
+
+# Urgency scoring
+URGENCY_SCORES = {'Not urgent': 0, 'Within 6 months': 5, 'Within 3 months': 10, 'Within 1 month': 15, 'Immediate': 20}
+
+# Engagement scoring: (column, points per unit, cap)
+ENGAGEMENT_RULES = [
+    ('email_opens', 2, 20),     # Max 20 points
+    ('website_visits', 1, 15),  # Max 15 points
+]
+
+# Score classifications
+HOT_THRESHOLD = 70
+WARM_THRESHOLD = 40
+TIERS = ['Cold', 'Warm', 'Hot']
+RECOMMENDATIONS = {
+    'Hot': "🚨 **IMMEDIATE ACTION REQUIRED** - Assign to senior sales rep within 1 hour",
+    'Warm': "📞 Contact within 24 hours - High potential for conversion",
+    'Cold': "📧 Add to nurturing campaign - Educational content focus",
+}
+
+
+# Batches up to this size skip the pandas machinery, which has a fixed cost
+# of a few hundred microseconds per call
+SMALL_BATCH = 64
+
+
+class LookupTable:
+    # Category list plus a points array with a trailing 0 slot, so unknown
+    # values (code -1) take the last element and score nothing
+    def __init__(self, column, scores):
+        self.column = column
+        self.categories = list(scores)
+        self.index = pd.Index(self.categories)
+        self._code_of = {category: code for code, category in enumerate(self.categories)}
+        self.points = np.array(list(scores.values()) + [0], dtype=np.int16)
+
+    def codes(self, values):
+        # Categorical input is remapped once per category, not once per row
+        if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+            remap = np.append(self.index.get_indexer(values.cat.categories), -1)
+            return remap.take(values.cat.codes.to_numpy())
+        if len(values) <= SMALL_BATCH:
+            # Plain dict lookups beat building a hash table for a few leads
+            return np.fromiter((self._code_of.get(value, -1) for value in values), dtype=np.intp, count=len(values))
+        return self.index.get_indexer(values)
+
+    def take(self, values):
+        return self.points.take(self.codes(values))
+
+
+LOOKUP_TABLES = [
+    LookupTable('company_size', SIZE_SCORES),
+    LookupTable('job_title', TITLE_SCORES),
+    LookupTable('budget_range', BUDGET_SCORES),
+    LookupTable('urgency', URGENCY_SCORES),
+]
+
+# Input columns the rules read; everything else in a lead record is ignored
+SCORING_COLUMNS = [table.column for table in LOOKUP_TABLES] + [column for column, _, _ in ENGAGEMENT_RULES]
+
+
+def _counts(values):
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype=np.int32, na_value=0)
+    return np.array([0 if value is None else value for value in values], dtype=np.int32)
+
+
+def score_columns(columns, n_rows):
+    # columns maps column name -> Series or sequence. Factors whose column is
+    # absent (e.g. exports without budget or urgency) contribute no points,
+    # matching an unknown category
+    score = np.zeros(n_rows, dtype=np.int32)
+    for table in LOOKUP_TABLES:
+        if table.column in columns:
+            score += table.take(columns[table.column])
+    for column, points, cap in ENGAGEMENT_RULES:
+        if column in columns:
+            score += np.minimum(_counts(columns[column]) * points, cap)
+    return score
+
+
+def score_batch(df):
+    return pd.Series(score_columns(df, len(df)), index=df.index, name='lead_score')
+
+
+def tier_codes(scores):
+    # 0 = Cold, 1 = Warm, 2 = Hot
+    scores = np.asarray(scores)
+    return ((scores >= WARM_THRESHOLD).astype(np.int8) + (scores >= HOT_THRESHOLD)).astype(np.int8)
+
+
+def classify(scores):
+    codes = tier_codes(scores)
+    index = scores.index if isinstance(scores, pd.Series) else None
+    return pd.Series(pd.Categorical.from_codes(codes, TIERS), index=index, name='tier')
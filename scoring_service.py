@@ -0,0 +1,444 @@
+"""Low-latency HTTP scoring service, plus a load generator to measure it.
+
+Runs on asyncio with no dependencies beyond the app's own. Concurrent
+requests are grouped into small batches and scored together with the same
+engine as the "Lead Scoring Engine" page.
+
+    python scoring_service.py serve --port 8502
+    python scoring_service.py loadgen --port 8502 --rate 2000 --duration 10
+
+POST /score takes one lead as a JSON object, or a JSON list of leads, and
+returns score, tier and recommendation for each. POST /score?model=gbm picks
+a model from the registry (rules, logistic, gbm); the rules are the default.
+GET /health reports liveness, batching counters and the models loaded.
+
+With --followups PATH, every scored lead that has a lead_id is scheduled
+for a follow-up (returned as follow_up) by a scheduler running on the same
+event loop and persisted to PATH. GET /followups returns and clears the
+follow-ups that have come due.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+from collections import deque
+from urllib.parse import parse_qs
+
+import numpy as np
+
+from followup_scheduler import FollowUpScheduler
+from lead_features import CATEGORICAL_FEATURES, COUNT_FEATURES
+from model_registry import DEFAULT_MODEL, RuleModel, default_registry
+from scoring import (BUDGET_SCORES, ENGAGEMENT_RULES, LOOKUP_TABLES, RECOMMENDATIONS, SIZE_SCORES, TIERS, TITLE_SCORES,
+                     URGENCY_SCORES, tier_codes)
+
+DEFAULT_PORT = 8502
+MAX_BATCH = 256
+MAX_WAIT_MS = 0.0
+MAX_BODY_BYTES = 1 << 20
+# Counts are scored as int32
+MAX_COUNT = int(np.iinfo(np.int32).max)
+# Due follow-ups kept for GET /followups; the oldest are dropped beyond this
+MAX_DUE_FOLLOWUPS = 100_000
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+            500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+# Fields checked by validate_lead, across every model's input columns
+_STRING_COLUMNS = list(dict.fromkeys([table.column for table in LOOKUP_TABLES + CATEGORICAL_FEATURES]))
+_COUNT_COLUMNS = list(dict.fromkeys([column for column, _, _ in ENGAGEMENT_RULES] + [column for column, _ in COUNT_FEATURES]))
+
+
+class MicroBatcher:
+    # Collects leads from concurrent requests and scores them together. Every
+    # request already queued joins the batch; with max_wait_ms > 0 the batch
+    # also waits that long for stragglers, trading latency for batch size
+    # (max_batch caps it either way). Leads are scored per model, with the
+    # models taken from registry; they must already be loaded
+    def __init__(self, registry, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.registry = registry
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.leads = 0
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def score(self, leads, model=DEFAULT_MODEL):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((leads, future, model))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                if not self._queue.empty():
+                    item = self._queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                pending.append(item)
+                size += len(item[0])
+            self._flush(pending)
+
+    def _flush(self, pending):
+        by_model = {}
+        for item in pending:
+            by_model.setdefault(item[2], []).append(item)
+        for model, group in by_model.items():
+            self._flush_model(model, group)
+        self.batches += 1
+
+    def _flush_model(self, model, pending):
+        leads = [lead for request_leads, _, _ in pending for lead in request_leads]
+        try:
+            results = score_leads(leads, self.registry.get(model))
+        except Exception as exc:
+            if len(pending) > 1:
+                # Score each request alone so a bad lead fails only its own
+                for item in pending:
+                    self._flush_model(model, [item])
+                return
+            future = pending[0][1]
+            if not future.done():
+                future.set_exception(exc)
+            return
+        self.leads += len(leads)
+        start = 0
+        for request_leads, future, _ in pending:
+            if not future.done():
+                future.set_result(results[start:start + len(request_leads)])
+            start += len(request_leads)
+
+
+def score_leads(leads, model=None):
+    # Columns straight from the parsed JSON; a missing field scores zero
+    model = model if model is not None else RuleModel()
+    columns = {column: [lead.get(column) for lead in leads] for column in model.columns}
+    scores = model.predict(columns, len(leads))
+    tiers = tier_codes(scores)
+    results = []
+    for lead, score, tier in zip(leads, scores.tolist(), tiers.tolist()):
+        result = {'score': score, 'tier': TIERS[tier], 'recommendation': RECOMMENDATIONS[TIERS[tier]]}
+        if 'lead_id' in lead:
+            result['lead_id'] = lead['lead_id']
+        results.append(result)
+    return results
+
+
+def validate_lead(lead):
+    # Checked per request, so one malformed lead cannot fail a shared batch
+    if not isinstance(lead, dict):
+        return 'each lead must be a JSON object'
+    for column in _STRING_COLUMNS:
+        value = lead.get(column)
+        if value is not None and not isinstance(value, str):
+            return f"'{column}' must be a string"
+    for column in _COUNT_COLUMNS:
+        value = lead.get(column)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                  or not math.isfinite(value) or not 0 <= value <= MAX_COUNT):
+            return f"'{column}' must be a non-negative number up to {MAX_COUNT}"
+    return None
+
+
+def _response(status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    head = (
+        f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode() + body
+
+
+class ScoringServer:
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, registry=None,
+                 followups=None):
+        self.host = host
+        self.port = port
+        self.registry = registry if registry is not None else default_registry()
+        self.batcher = MicroBatcher(self.registry, max_batch, max_wait_ms)
+        # Optional FollowUpScheduler, run on the server's event loop
+        self.followups = followups
+        self.due_followups = deque(maxlen=MAX_DUE_FOLLOWUPS)
+        self._followup_task = None
+        self._server = None
+
+    async def start(self):
+        # Models load in the background while the server starts accepting
+        self.registry.warm()
+        self.batcher.start()
+        if self.followups is not None:
+            self._followup_task = asyncio.get_running_loop().create_task(self.followups.run(self._on_due))
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        await self.batcher.stop()
+        if self._followup_task is not None:
+            # Cancelling run() saves the scheduler state
+            self._followup_task.cancel()
+            try:
+                await self._followup_task
+            except asyncio.CancelledError:
+                pass
+
+    def _on_due(self, fired):
+        self.due_followups.extend(
+            {'lead_id': lead_id, 'tier': tier, 'due': str(due)}
+            for lead_id, tier, due in zip(fired['lead_id'], fired['tier'], fired['due'].to_numpy())
+        )
+
+    def _schedule_followups(self, leads, results):
+        scheduled = [(lead['lead_id'], result) for lead, result in zip(leads, results) if 'lead_id' in lead]
+        if not scheduled:
+            return
+        due = self.followups.schedule([lead_id for lead_id, _ in scheduled], [result['tier'] for _, result in scheduled])
+        for (_, result), follow_up in zip(scheduled, due):
+            result['follow_up'] = str(follow_up)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                method, path, version = (request_line.split(' ') + ['', '', ''])[:3]
+                headers = {}
+                for line in header_lines:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    writer.write(_response(400, {'error': 'invalid Content-Length'}, keep_alive=False))
+                    break
+                if length > MAX_BODY_BYTES:
+                    writer.write(_response(413, {'error': 'request body too large'}, keep_alive=False))
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload = await self._route(method, path, body)
+                except Exception as exc:
+                    # Report the failure rather than dropping the connection
+                    writer.write(_response(500, {'error': f'internal error: {type(exc).__name__}'}, keep_alive=False))
+                    break
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        path, _, query = path.partition('?')
+        if path == '/health':
+            loaded = [name for name in self.registry.names() if self.registry.is_loaded(name)]
+            health = {'status': 'ok', 'batches': self.batcher.batches, 'leads': self.batcher.leads, 'models': loaded}
+            if self.followups is not None:
+                health['pending_followups'] = len(self.followups)
+            return 200, health
+        if path == '/followups':
+            if self.followups is None:
+                return 404, {'error': 'follow-up scheduling is not enabled'}
+            due = list(self.due_followups)
+            self.due_followups.clear()
+            return 200, due
+        if path != '/score':
+            return 404, {'error': f'unknown path {path}'}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400, {'error': 'body must be JSON'}
+        single = isinstance(payload, dict)
+        leads = [payload] if single else payload
+        if not isinstance(leads, list):
+            return 400, {'error': 'body must be a lead object or a list of lead objects'}
+        if not leads:
+            return 200, []
+        for lead in leads:
+            error = validate_lead(lead)
+            if error:
+                return 400, {'error': error}
+        model = parse_qs(query).get('model', [DEFAULT_MODEL])[0]
+        if model not in self.registry.names():
+            return 400, {'error': f"unknown model '{model}'; expected one of {', '.join(self.registry.names())}"}
+        if not self.registry.is_loaded(model):
+            # Wait for the load off the event loop so other requests keep flowing
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.registry.get, model)
+            except Exception as exc:
+                return 503, {'error': f"model '{model}' failed to load: {exc}"}
+        results = await self.batcher.score(leads, model)
+        if self.followups is not None:
+            self._schedule_followups(leads, results)
+        return 200, results[0] if single else results
+
+
+# Load generator
+
+def random_lead(rng):
+    return {
+        'company_size': rng.choice(list(SIZE_SCORES)),
+        'job_title': rng.choice(list(TITLE_SCORES)),
+        'budget_range': rng.choice(list(BUDGET_SCORES)),
+        'urgency': rng.choice(list(URGENCY_SCORES)),
+        'email_opens': rng.randint(0, 20),
+        'website_visits': rng.randint(0, 30),
+    }
+
+
+async def _client(host, port, interval, stop_at, latencies, errors, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    loop = asyncio.get_running_loop()
+    # Open loop: requests are due on a fixed schedule, and latency is measured
+    # from when a request was due so a stalled server cannot hide queueing
+    due = loop.time() + rng.random() * interval
+    try:
+        while due < stop_at:
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            body = json.dumps(random_lead(rng)).encode()
+            writer.write(
+                b'POST /score HTTP/1.1\r\nHost: loadgen\r\nContent-Type: application/json\r\n'
+                b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body
+            )
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(head.split(b'Content-Length: ', 1)[1].split(b'\r\n', 1)[0])
+            await reader.readexactly(length)
+            if not head.startswith(b'HTTP/1.1 200'):
+                errors.append(head.split(b'\r\n', 1)[0])
+            latencies.append(loop.time() - due)
+            due += interval
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, rate, duration, connections):
+    latencies, errors = [], []
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + duration
+    interval = connections / rate
+    start = loop.time()
+    await asyncio.gather(*[
+        _client(host, port, interval, stop_at, latencies, errors, seed) for seed in range(connections)
+    ])
+    elapsed = loop.time() - start
+    ms = np.asarray(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(ms, 50)) if len(ms) else 0.0,
+        'p99_ms': float(np.percentile(ms, 99)) if len(ms) else 0.0,
+        'max_ms': float(ms.max()) if len(ms) else 0.0,
+    }
+
+
+async def _wait_for_port(host, port, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lead scoring HTTP service")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve = sub.add_parser('serve', help="run the scoring service")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve.add_argument('--max-batch', type=int, default=MAX_BATCH, help="leads per scoring batch")
+    serve.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS, help="how long a batch waits to fill")
+    serve.add_argument('--followups', metavar='PATH', help="schedule follow-ups for scored leads, persisted to this .npz file")
+
+    loadgen = sub.add_parser('loadgen', help="drive a running service at a fixed request rate")
+    loadgen.add_argument('--host', default='127.0.0.1')
+    loadgen.add_argument('--port', type=int, default=DEFAULT_PORT)
+    loadgen.add_argument('--rate', type=float, default=2000, help="requests per second")
+    loadgen.add_argument('--duration', type=float, default=10, help="seconds")
+    loadgen.add_argument('--connections', type=int, default=32)
+    loadgen.add_argument('--spawn', action='store_true', help="start a service subprocess on --port first")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        followups = FollowUpScheduler.open(args.followups) if args.followups else None
+        server = ScoringServer(args.host, args.port, args.max_batch, args.max_wait_ms, followups=followups)
+        print(f"Scoring service on http://{args.host}:{args.port}", file=sys.stderr)
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        return
+
+    child = None
+    if args.spawn:
+        child = subprocess.Popen([sys.executable, __file__, 'serve', '--host', args.host, '--port', str(args.port)])
+    try:
+        if child is not None:
+            asyncio.run(_wait_for_port(args.host, args.port))
+        stats = asyncio.run(run_load(args.host, args.port, args.rate, args.duration, args.connections))
+    finally:
+        if child is not None:
+            child.terminate()
+            child.wait()
+    print(f"{stats['requests']:,} requests, {stats['errors']} errors, {stats['rps']:,.0f} req/s, "
+          f"p50 {stats['p50_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms, max {stats['max_ms']:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
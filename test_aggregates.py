@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from aggregates import IncrementalAggregates
+from mock_data import generate_leads
+
+
+def _leads(n_leads, seed, start):
+    df = generate_leads(n_leads, seed=seed, include_identity=False)
+    df.index = pd.RangeIndex(start, start + n_leads)
+    # Plain strings, so updates can bring new sources and industries
+    return df.astype({'lead_source': object, 'industry': object})
+
+
+def test_random_deltas_match_full_recompute():
+    rng = np.random.default_rng(11)
+    df = _leads(2000, seed=0, start=0)
+    aggregates = IncrementalAggregates.from_frame(df)
+    assert aggregates.mismatches(df) == []
+    next_label = len(df)
+    for step in range(30):
+        action = step % 3
+        if action == 0:
+            new = _leads(int(rng.integers(1, 200)), seed=step + 1, start=next_label)
+            next_label += len(new)
+            aggregates.append(new)
+            df = pd.concat([df, new])
+        elif action == 1:
+            rows = rng.choice(df.index.to_numpy(), int(rng.integers(1, 100)), replace=False)
+            old = df.loc[rows].copy()
+            new = old.copy()
+            new['lead_score'] = rng.integers(0, 101, len(new))
+            new['converted'] = rng.random(len(new)) < 0.5
+            new['estimated_deal_value'] = rng.integers(5000, 500000, len(new))
+            new['lead_source'] = rng.choice(['Website', 'Partner', f'Event {step}'], len(new))
+            new['industry'] = rng.choice(['Technology', 'Energy'], len(new))
+            aggregates.update(old, new)
+            df.loc[rows] = new
+        else:
+            rows = rng.choice(df.index.to_numpy(), int(rng.integers(1, 150)), replace=False)
+            aggregates.delete(df.loc[rows])
+            df = df.drop(rows)
+        assert aggregates.mismatches(df) == [], f"after step {step}"
@@ -0,0 +1,18 @@
+import pandas as pd
+
+from bulk_score import ResultWriter, score_file
+
+
+def test_empty_parquet_result(tmp_path):
+    path = str(tmp_path / 'scored.parquet')
+    ResultWriter(path).close()
+    result = pd.read_parquet(path)
+    assert len(result) == 0 and list(result.columns) == ['lead_id', 'lead_score', 'tier']
+
+
+def test_score_file_without_rows(tmp_path):
+    source = tmp_path / 'leads.csv'
+    source.write_text('lead_id,job_title,email_opens\n')
+    output = str(tmp_path / 'scored.pq')
+    assert score_file(str(source), output)['written'] == 0
+    assert list(pd.read_parquet(output).columns) == ['lead_id', 'lead_score', 'tier']
@@ -0,0 +1,7 @@
+from conversion_model import MAX_ITERATIONS, ConversionModel
+from mock_data import generate_leads
+
+
+def test_fit_converges_before_iteration_cap():
+    model = ConversionModel.fit(generate_leads(20_000, seed=3, include_identity=False))
+    assert model.iterations < MAX_ITERATIONS
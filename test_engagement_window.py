@@ -0,0 +1,45 @@
+import numpy as np
+
+from engagement_window import DAY_SECONDS, MAX_CLOCK_SKEW_SECONDS, WindowedCounters, event_days, valid_timestamps
+
+
+def test_valid_timestamps():
+    now = 1_700_000_000.0
+    timestamps = [np.nan, now, now + MAX_CLOCK_SKEW_SECONDS, now + MAX_CLOCK_SKEW_SECONDS + 1, now * 1000, 1e300,
+                  np.inf, -np.inf, -1.0]
+    assert valid_timestamps(timestamps, now).tolist() == [True, True, True, False, False, False, False, False, False]
+
+
+def test_logged_days_never_overflow():
+    days = event_days([np.nan, 3 * DAY_SECONDS + 5, 1e300, np.inf], today=10)
+    assert days[:2].tolist() == [10, 3] and days[3] == 10 and days[2] > 0
+
+
+def _replayed(log, today, days, n_types, n_leads):
+    # Counts straight from the event log: every event in the last `days` days
+    counts = np.zeros((n_types, n_leads), dtype=np.int64)
+    for positions, types, logged_days in log:
+        for position, event_type, day in zip(positions, types, logged_days):
+            if today - days < day <= today:
+                counts[event_type, position] += 1
+    return counts
+
+
+def test_window_matches_replayed_event_log():
+    rng = np.random.default_rng(0)
+    n_leads, n_types, days = 40, 3, 10
+    counters = WindowedCounters(n_leads, n_types, days, today=100)
+    log = []
+    for batch in range(60):
+        positions = rng.integers(0, n_leads, 150)
+        types = rng.integers(0, n_types, 150)
+        # Mostly recent events, some already expired, some from the next day
+        batch_days = counters.today + rng.integers(-12, 2, 150)
+        if batch % 20 == 19:
+            counters.advance(counters.today + int(rng.integers(1, 15)))
+        counters.add(positions, types, batch_days)
+        log.append((positions, types, batch_days))
+        for window in (days, 3, 1):
+            expected = _replayed(log, counters.today, window, n_types, n_leads)
+            assert np.array_equal(counters.window(window), expected)
+    assert np.array_equal(counters.window(), _replayed(log, counters.today, days, n_types, n_leads))
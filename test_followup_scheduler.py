@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from followup_scheduler import FollowUpScheduler, follow_up_times, next_window_start
+
+# 2024-01-02 was a Tuesday
+TUESDAY = '2024-01-02'
+
+
+def _at(day, time):
+    return np.datetime64(f'{day}T{time}')
+
+
+@pytest.mark.parametrize('ready, expected', [
+    (_at(TUESDAY, '08:00'), _at(TUESDAY, '09:00')),
+    (_at(TUESDAY, '10:15'), _at(TUESDAY, '10:15')),
+    (_at(TUESDAY, '11:00'), _at(TUESDAY, '14:00')),
+    (_at(TUESDAY, '16:00'), _at('2024-01-03', '09:00')),
+    (_at('2024-01-04', '16:30'), _at('2024-01-09', '09:00')),
+    (_at('2024-01-05', '12:00'), _at('2024-01-09', '09:00')),
+    (_at('2024-01-08', '08:00'), _at('2024-01-09', '09:00')),
+])
+def test_next_window_start(ready, expected):
+    assert next_window_start([ready])[0] == expected
+
+
+def test_sla_overrides_window_on_friday():
+    friday = _at('2024-01-05', '12:00')
+    # Cold, Warm, Hot: only Cold can wait for Tuesday's window
+    due = follow_up_times(np.array([0, 1, 2]), friday)
+    assert due.tolist() == [_at('2024-01-09', '09:00').astype('datetime64[s]').item(), friday.item(), friday.item()]
+
+
+@pytest.mark.parametrize('codes', [[3], [-1]])
+def test_out_of_range_tier_codes_are_rejected(codes):
+    with pytest.raises(ValueError):
+        FollowUpScheduler().schedule(['a'], np.array(codes))
+
+
+def test_fire_save_open_round_trip(tmp_path):
+    path = str(tmp_path / 'followups.npz')
+    friday = _at('2024-01-05', '12:00')
+    scheduler = FollowUpScheduler(path)
+    scheduler.schedule(['hot', 'warm', 'cold', 'gone'], ['Hot', 'Warm', 'Cold', 'Cold'], friday)
+    scheduler.cancel(['gone'])
+    scheduler.save()
+
+    reopened = FollowUpScheduler.open(path)
+    assert len(reopened) == 3
+    fired = reopened.fire(friday)
+    assert sorted(fired['lead_id']) == ['hot', 'warm']
+    assert len(reopened) == 1 and reopened.next_due() == _at('2024-01-09', '09:00')
+    assert reopened.fire(_at('2024-01-08', '23:59')).empty
+    fired = reopened.fire(_at('2024-01-09', '09:00'))
+    assert fired['lead_id'].tolist() == ['cold'] and fired['tier'].tolist() == ['Cold']
+    assert len(reopened) == 0
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from bulk_score import score_file
+from lead_dedup import _components, find_duplicates, normalize_email
+
+
+def test_normalize_email():
+    email, domain = normalize_email([' John.Doe+crm@Acme.com ', 'no-at-sign', '@acme.com', None])
+    assert email.tolist()[:1] == ['john.doe@acme.com'] and email.iloc[1:].isna().all()
+    assert domain.tolist()[:1] == ['acme.com'] and domain.iloc[1:].isna().all()
+
+
+def test_normalize_email_all_missing():
+    email, domain = normalize_email(pd.Series([np.nan, None, np.nan]))
+    assert email.isna().all() and domain.isna().all()
+
+
+def test_find_duplicates_without_emails():
+    df = pd.DataFrame({
+        'company_name': ['Acme Inc.', 'ACME', 'Globex'],
+        'contact_name': ['John Doe', 'doe, john', 'John Doe'],
+        'email': [np.nan, np.nan, np.nan],
+    })
+    result = find_duplicates(df)
+    assert result.canonical.tolist() == [0, 0, 2]
+
+
+def test_similar_pair_counted_once_across_bands():
+    df = pd.DataFrame({'company_name': ['Acme', 'Acme'], 'contact_name': ['Jane Smith', 'Jane Smith']})
+    result = find_duplicates(df)
+    # Identical names share every band
+    assert result.matches['similar_name'] == 1
+
+
+def test_score_file_dedup_reports_pipeline_value(tmp_path):
+    source = tmp_path / 'leads.csv'
+    pd.DataFrame({
+        'lead_id': ['a', 'b', 'c'],
+        'company_name': ['Acme', 'ACME, Inc.', 'Globex'],
+        'contact_name': ['Jane Smith', 'Smith, Jane', 'Bob Jones'],
+        'email': [np.nan, np.nan, np.nan],
+        'estimated_deal_value': [1000.0, 1000.0, 500.0],
+    }).to_csv(source, index=False)
+    stats = score_file(str(source), str(tmp_path / 'scored.csv'), dedup=True)
+    assert stats['rows'] == 2
+    assert stats['dedup']['pipeline_value'] == 2500 and stats['dedup']['unique_pipeline_value'] == 1500
+
+
+def _naive_clusters(n_rows, left, right):
+    # Each row's lowest connected row, by relabelling until nothing changes
+    labels = list(range(n_rows))
+    changed = True
+    while changed:
+        changed = False
+        for a, b in zip(left.tolist(), right.tolist()):
+            low = min(labels[a], labels[b])
+            for row in (a, b):
+                if labels[row] != low:
+                    labels[row] = low
+                    changed = True
+    return labels
+
+
+def test_components_match_naive_clustering():
+    rng = np.random.default_rng(1)
+    for n_rows, n_pairs in [(1, 0), (10, 3), (60, 40), (200, 150), (200, 400)]:
+        left = rng.integers(0, n_rows, n_pairs)
+        right = rng.integers(0, n_rows, n_pairs)
+        assert _components(n_rows, left, right).tolist() == _naive_clusters(n_rows, left, right)
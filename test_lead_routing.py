@@ -0,0 +1,55 @@
+import numpy as np
+
+from lead_routing import LeadRouter, generate_roster
+from mock_data import TERRITORIES, generate_leads
+from scoring import tier_codes
+
+# Rules that promise the lead's territory
+TERRITORY_RULES = ['senior', 'expertise', 'territory']
+
+
+def test_random_routing_respects_capacity_tier_and_territory():
+    rng = np.random.default_rng(21)
+    roster = generate_roster(40, seed=3, capacity=6)
+    router = LeadRouter(roster)
+    leads = generate_leads(3000, seed=4, include_identity=False)
+    # Some leads come without a known territory
+    leads['territory'] = leads['territory'].astype(object)
+    leads.loc[leads.index[rng.random(len(leads)) < 0.1], 'territory'] = None
+    territories = np.array([TERRITORIES.index(t) if t in TERRITORIES else -1 for t in leads['territory']])
+    capacity = roster.capacity
+    load = np.zeros(len(roster), dtype=np.int64)
+
+    for batch in np.array_split(np.arange(len(leads)), 60):
+        routes = router.route(leads.iloc[batch])
+        tiers = tier_codes(leads['lead_score'].to_numpy()[batch])
+        reps = routes['rep'].cat.codes.to_numpy()
+        rules = routes['rule'].astype(str).to_numpy()
+        np.add.at(load, reps[reps >= 0], 1)
+        assert np.array_equal(router.load, load) and (load <= capacity).all()
+        # Loads only grow within a batch, so a pool full when a lead skipped
+        # it is still full now
+        full = load >= capacity
+
+        assert (rules[tiers == 0] == 'nurture').all() and (reps[tiers == 0] < 0).all()
+        for rep, rule, tier, territory in zip(reps, rules, tiers, territories[batch]):
+            if tier == 0:
+                continue
+            if rule == 'unassigned':
+                assert full.all()
+                continue
+            if tier == 2 and not roster.senior[rep]:
+                assert full[roster.senior].all()
+            if rule in TERRITORY_RULES:
+                assert territory >= 0 and roster.territories[rep] == territory
+            elif territory >= 0:
+                # Every rep of the lead's territory and kind was taken
+                kind = roster.senior if tier == 2 else ~roster.senior
+                assert full[kind & (roster.territories == territory)].all()
+
+        # Hand some leads back
+        for rep in rng.choice(len(roster), 10):
+            count = int(rng.integers(0, 3))
+            router.release(int(rep), count)
+            load[rep] -= min(count, load[rep])
+        assert np.array_equal(router.load, load)
@@ -0,0 +1,16 @@
+import os
+
+from lead_store import LeadStore
+
+
+def test_save_replaces_existing_store(tmp_path):
+    directory = str(tmp_path / 'store')
+    LeadStore.generate(n_leads=200, seed=1).save(directory)
+    store = LeadStore.generate(n_leads=300, seed=2)
+    store.save(directory)
+
+    reopened = LeadStore.open(directory)
+    assert len(reopened) == 300 and reopened.fingerprint == store.fingerprint
+    assert (reopened.frame['lead_score'].to_numpy() == store.frame['lead_score'].to_numpy()).all()
+    # Neither the staging nor the replaced store is left behind
+    assert os.listdir(tmp_path) == ['store']
@@ -0,0 +1,118 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from mock_data import generate_leads
+from rescoring_pipeline import EVENT_COLUMNS, EVENT_TYPES, EngagementCounters, RescoringPipeline
+from scoring import SCORING_COLUMNS, score_columns, tier_codes
+
+
+def _pipeline(n_leads=200, **kwargs):
+    leads = generate_leads(n_leads, seed=7, include_identity=False)
+    return leads, RescoringPipeline(EngagementCounters(leads, **kwargs))
+
+
+def test_malformed_lead_or_type_is_rejected():
+    leads, pipeline = _pipeline()
+    before = pipeline.counters.counts.copy()
+    lines = [
+        json.dumps({'lead': [1], 'type': 'open'}),
+        json.dumps({'lead': {'id': 1}, 'type': 'open'}),
+        json.dumps({'lead': 1, 'type': ['open']}),
+        json.dumps({'lead': 1, 'type': {'name': 'open'}}),
+        json.dumps({'lead': True, 'type': 'open'}),
+        json.dumps({'lead': 2, 'type': 'visit'}),
+    ]
+    pipeline.process_lines(lines)
+    assert pipeline.rejected == 5 and pipeline.events == 1
+    after = pipeline.counters.counts
+    assert after[2, EVENT_COLUMNS.index('website_visits')] == before[2, EVENT_COLUMNS.index('website_visits')] + 1
+    assert np.array_equal(np.delete(after, 2, axis=0), np.delete(before, 2, axis=0))
+
+    # The pipeline keeps going after a bad batch
+    pipeline.process_lines([json.dumps({'lead': 1, 'type': 'open'})])
+    assert pipeline.events == 2
+
+
+def test_future_or_non_finite_ts_does_not_move_window():
+    leads, pipeline = _pipeline(window_days=30)
+    today = pipeline.counters.window.today
+    now = time.time()
+    lines = [
+        json.dumps({'lead': 1, 'type': 'open', 'ts': now * 1000}),
+        json.dumps({'lead': 1, 'type': 'open', 'ts': 1e300}),
+        '{"lead": 1, "type": "open", "ts": Infinity}',
+        '{"lead": 1, "type": "open", "ts": NaN}',
+        '{"lead": 1, "type": "open", "ts": 1' + '0' * 400 + '}',
+        json.dumps({'lead': 1, 'type': 'open', 'ts': now}),
+    ]
+    pipeline.process_lines(lines)
+    assert pipeline.counters.window.today == today
+    assert pipeline.rejected == 5 and pipeline.events == 1
+
+
+def _full_scores(leads, engagement):
+    # Every lead scored from scratch with the given engagement counts
+    columns = {column: leads[column] for column in SCORING_COLUMNS if column in leads}
+    for code, column in enumerate(EVENT_COLUMNS):
+        columns[column] = pd.Series(engagement[:, code])
+    return score_columns(columns, len(leads))
+
+
+def _random_events(rng, leads, n_events):
+    labels = rng.choice(leads.index.to_numpy(), n_events)
+    types = rng.choice(EVENT_TYPES, n_events)
+    return [json.dumps({'lead': int(label), 'type': str(event_type)}) for label, event_type in zip(labels, types)]
+
+
+def test_rescored_tiers_match_full_scoring():
+    rng = np.random.default_rng(5)
+    leads, pipeline = _pipeline(500)
+    initial = pipeline.counters.tiers.copy()
+    changed = set()
+    for _ in range(20):
+        changes = pipeline.process_lines(_random_events(rng, leads, 300))
+        changed.update(changes.index.tolist())
+    scores = _full_scores(leads, pipeline.counters.counts)
+    assert np.array_equal(pipeline.counters.scores, scores)
+    assert np.array_equal(pipeline.counters.tiers, tier_codes(scores))
+    # Every lead that ended on a new tier was reported on the way
+    assert set(leads.index[tier_codes(scores) != initial].tolist()) <= changed
+
+
+def test_windowed_rescoring_matches_full_scoring():
+    rng = np.random.default_rng(6)
+    leads, pipeline = _pipeline(300, window_days=30)
+    for _ in range(5):
+        pipeline.process_lines(_random_events(rng, leads, 200))
+    pipeline.counters.advance(pipeline.counters.window.today + 10)
+    positions = np.arange(len(leads))
+    scores = _full_scores(leads, pipeline.counters.window.window(positions=positions).T)
+    assert np.array_equal(pipeline.counters.scores, scores)
+    assert np.array_equal(pipeline.counters.tiers, tier_codes(scores))
+
+
+def test_window_follows_the_clock():
+    leads, pipeline = _pipeline(window_days=30)
+    today = pipeline.counters.window.today
+    lead = int(np.flatnonzero(pipeline.counters.window.window().sum(axis=0) > 0)[0])
+    seeded = pipeline.counters.engagement(np.array([lead]))[0]
+    day = [today]
+    pipeline.clock = lambda: day[0]
+    changes = []
+    pipeline.on_change = changes.append
+
+    # Within the window nothing expires
+    pipeline.process_lines([json.dumps({'lead': lead, 'type': 'open'})])
+    assert pipeline.counters.engagement(np.array([lead]))[0].tolist() == (seeded + [1, 0, 0]).tolist()
+
+    # 40 days on, the seeded counts and the earlier event have expired
+    day[0] = today + 40
+    pipeline.process_lines([json.dumps({'lead': lead, 'type': 'visit'})])
+    assert pipeline.counters.window.today == today + 40
+    assert pipeline.counters.engagement(np.array([lead]))[0].tolist() == [0, 1, 0]
+    scores = _full_scores(leads, pipeline.counters.window.window().T)
+    assert np.array_equal(pipeline.counters.scores, scores)
+    assert sum(len(frame) for frame in changes) == pipeline.tier_changes
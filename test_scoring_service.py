@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import pytest
+
+from model_registry import ModelRegistry, RuleModel
+from scoring_service import MAX_COUNT, MicroBatcher, ScoringServer, validate_lead
+
+
+@pytest.mark.parametrize('value', [99999999999, MAX_COUNT + 1, float('nan'), float('inf'), -1, True, '3'])
+def test_validate_lead_rejects_bad_counts(value):
+    assert validate_lead({'email_opens': value}) is not None
+
+
+def test_validate_lead_rejects_json_constants():
+    lead = json.loads('{"email_opens": NaN, "website_visits": Infinity}')
+    assert validate_lead(lead) is not None
+
+
+def test_validate_lead_accepts_counts_in_range():
+    assert validate_lead({'email_opens': MAX_COUNT, 'website_visits': 2.0, 'job_title': 'CEO'}) is None
+
+
+def _registry():
+    registry = ModelRegistry()
+    registry.register('rules', '1', RuleModel)
+    return registry
+
+
+def _exchange(request, route=None):
+    # Sends one raw request to a fresh server and returns the raw response
+    async def run():
+        server = ScoringServer(port=0, registry=_registry())
+        if route is not None:
+            server._route = route
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            writer.write(request)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+        finally:
+            await server.stop()
+
+    return asyncio.run(run())
+
+
+def test_bad_lead_fails_only_its_own_request():
+    registry = _registry()
+
+    async def run():
+        batcher = MicroBatcher(registry, max_wait_ms=50)
+        batcher.start()
+        try:
+            # Unvalidated, a non-numeric count fails the shared batch
+            return await asyncio.gather(
+                batcher.score([{'job_title': 'CEO', 'email_opens': 2}], 'rules'),
+                batcher.score([{'email_opens': {'count': 3}}], 'rules'),
+                batcher.score([{'job_title': 'Manager'}], 'rules'),
+                return_exceptions=True,
+            )
+        finally:
+            await batcher.stop()
+
+    good, bad, other = asyncio.run(run())
+    assert isinstance(bad, Exception)
+    assert good[0]['score'] > 0 and len(other) == 1
+
+
+@pytest.mark.parametrize('length', [b'abc', b'-5'])
+def test_invalid_content_length_is_bad_request(length):
+    response = _exchange(b'POST /score HTTP/1.1\r\nContent-Length: ' + length + b'\r\n\r\n{}')
+    assert response.startswith(b'HTTP/1.1 400 ')
+
+
+def test_unexpected_error_is_internal_error():
+    async def route(method, path, body):
+        raise RuntimeError('boom')
+
+    response = _exchange(b'GET /health HTTP/1.1\r\n\r\n', route)
+    assert response.startswith(b'HTTP/1.1 500 ')